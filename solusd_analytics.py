@@ -0,0 +1,157 @@
+"""
+Cross-symbol analytics over a long kline frame.
+
+align() pivots the frame once into a time x symbol array. Everything else
+is batched matrix work on that array: pairwise statistics for many
+window ends at once come from a few batched matrix products, with
+missing values (symbols listed later, gaps) handled pairwise through a
+presence mask rather than per-pair loops.
+"""
+import numpy as np
+import pandas as pd
+
+BENCHMARK = 'BTCUSDT'
+
+
+def align(df, value='close'):
+    """
+    Long frame -> (times, symbols, wide) where wide[t, s] is value for
+    symbol s at open_time t, NaN where that symbol has no candle.
+    """
+    t_codes, times = pd.factorize(df['open_time'], sort=True)
+    symbols = df['symbol']
+    if isinstance(symbols.dtype, pd.CategoricalDtype):
+        s_codes, labels = symbols.cat.codes.to_numpy(), symbols.cat.categories
+        used = np.unique(s_codes[s_codes >= 0])
+        remap = np.full(len(labels), -1)
+        remap[used] = np.arange(len(used))
+        s_codes, labels = remap[s_codes], labels[used]
+    else:
+        s_codes, labels = pd.factorize(symbols, sort=True)
+    wide = np.full((len(times), len(labels)), np.nan)
+    ok = (t_codes >= 0) & (s_codes >= 0)
+    wide[t_codes[ok], s_codes[ok]] = df[value].to_numpy(dtype=np.float64)[ok]
+    return np.asarray(times), [str(s) for s in labels], wide
+
+
+def log_returns(wide):
+    out = np.full(wide.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[1:] = np.diff(np.log(wide), axis=0)
+    return out
+
+
+def pairwise_moments(windows):
+    """
+    Pairwise statistics over a batch of windows (k, W, S), using for each
+    pair (i, j) only the rows where both are present. Returns (n, mean,
+    var, cov), each (k, S, S): mean[..., i, j] and var[..., i, j] are of
+    symbol i over the rows shared with j.
+    """
+    present = ~np.isnan(windows)
+    x = np.where(present, windows, 0.0)
+    m = present.astype(np.float64)
+    xt = x.transpose(0, 2, 1)
+    n = m.transpose(0, 2, 1) @ m
+    sums = xt @ m  # sums[i, j]: sum of x_i over rows where j is present
+    squares = (xt * xt) @ m
+    cross = xt @ x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = sums / n
+        dof = np.where(n > 1, n - 1, np.nan)
+        var = (squares - sums * mean) / dof
+        cov = (cross - sums * sums.transpose(0, 2, 1) / n) / dof
+    return n, mean, var, cov
+
+
+def window_ends(n_rows, window, max_windows=200):
+    """Evenly spaced window end rows, always including the last one."""
+    first = window  # Row 0 of the returns is NaN
+    if n_rows <= first:
+        return np.array([n_rows - 1]) if n_rows else np.array([], dtype=int)
+    ends = np.unique(np.linspace(first, n_rows - 1, min(max_windows, n_rows - first)).astype(int))
+    return ends
+
+
+class Analytics:
+    """
+    Rolling cross-symbol statistics at each of `ends` (row positions in
+    times). Matrices are (k, S, S), beta is (k, S).
+
+    corr / cov: of log returns over the window.
+    log_spread: log(p_i) - log(p_j) at the window end.
+    spread_z: that spread's z-score against its own mean and std over the window.
+    beta: of each symbol's returns to the benchmark's over the window.
+    """
+
+    def __init__(self, times, symbols, ends, window, corr, cov, log_spread, spread_z, beta, benchmark):
+        self.times = times
+        self.symbols = symbols
+        self.ends = ends
+        self.window = window
+        self.corr = corr
+        self.cov = cov
+        self.log_spread = log_spread
+        self.spread_z = spread_z
+        self.beta = beta
+        self.benchmark = benchmark
+
+    @property
+    def end_times(self):
+        return self.times[self.ends]
+
+    def matrix(self, metric, i=-1):
+        return {'Correlation': self.corr, 'Covariance': self.cov,
+                'Log spread': self.log_spread, 'Spread z-score': self.spread_z}[metric][i]
+
+
+METRICS = ['Correlation', 'Covariance', 'Log spread', 'Spread z-score']
+
+
+def analyze(df, window=30, value='close', benchmark=BENCHMARK, max_windows=200, batch=32, task=None):
+    """
+    Align df (long frame with open_time, symbol and value columns) and
+    compute Analytics for up to max_windows window ends, batch window
+    ends per matrix product to bound memory.
+    """
+    times, symbols, wide = align(df, value)
+    if len(symbols) < 2:
+        raise ValueError("Analytics needs at least two symbols in the view.")
+    if window < 2:
+        raise ValueError("The window must be at least 2 candles.")
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logp = np.log(wide)
+    rets = log_returns(wide)
+    ends = window_ends(len(times), window, max_windows)
+    k, s = len(ends), len(symbols)
+    corr, cov, spread_z, log_spread = (np.full((k, s, s), np.nan) for _ in range(4))
+    beta = np.full((k, s), np.nan)
+    bench = symbols.index(benchmark) if benchmark in symbols else None
+    # Row offsets of each window, relative to its end (inclusive).
+    offsets = np.arange(-window + 1, 1)
+    for lo in range(0, k, batch):
+        if task is not None:
+            task.progress(lo / k, f"Analytics: {lo:,} of {k:,} windows")
+        idx = ends[lo:lo + batch, None] + offsets  # (b, W)
+        idx_ok = idx >= 0
+        idx = np.clip(idx, 0, None)
+        r_win = np.where(idx_ok[..., None], rets[idx], np.nan)
+        _, _, var, c = pairwise_moments(r_win)
+        cov[lo:lo + batch] = c
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr[lo:lo + batch] = c / np.sqrt(var * var.transpose(0, 2, 1))
+            if bench is not None:
+                beta[lo:lo + batch] = c[:, :, bench] / var[:, bench, :]
+            # Spread i - j is linear in the levels: its mean and variance
+            # follow from the pairwise moments of log prices.
+            l_win = np.where(idx_ok[..., None], logp[idx], np.nan)
+            _, mean, lvar, lcov = pairwise_moments(l_win)
+            last = logp[ends[lo:lo + batch]]
+            spread = last[:, :, None] - last[:, None, :]
+            spread_mean = mean - mean.transpose(0, 2, 1)
+            spread_std = np.sqrt(lvar + lvar.transpose(0, 2, 1) - 2 * lcov)
+            log_spread[lo:lo + batch] = spread
+            spread_z[lo:lo + batch] = (spread - spread_mean) / spread_std
+    diag = np.arange(s)
+    spread_z[:, diag, diag] = 0.0
+    return Analytics(times, symbols, ends, window, corr, cov, log_spread, spread_z, beta, benchmark)
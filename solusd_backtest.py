@@ -0,0 +1,440 @@
+"""
+Vectorized backtests over get_binance_data frames.
+
+The long frame is pivoted once into time x symbol arrays (a Panel). A
+Rule turns the panel into target positions (-1, 0 or 1) for every
+symbol at once. A position is decided at the close of the bar its
+signal appears on and held from the next bar, so a rule never trades on
+the bar it looked at. Every change of position pays the fee plus half
+the symbol's bid/ask spread as slippage. The portfolio holds the
+symbols in equal weight.
+
+sweep() runs a grid of rule parameters on a process pool. Each worker
+receives the panel once and keeps every indicator series it computes,
+so a crossover grid of 1,000 (fast, slow) pairs computes each distinct
+moving average once, not 2,000 times.
+
+    python solusd_backtest.py --symbols SOLUSDT BTCUSDT --interval 1h --limit 8760 \\
+        --rule crossover --grid fast=5:50:5 slow=20:200:20
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from solusd_indicators import parse_indicator
+
+PANEL_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'quote_asset_volume', 'bid', 'ask']
+YEAR_MS = 365 * 86_400_000
+DEFAULT_FEE = 0.001  # Binance spot taker fee, per unit of turnover
+
+
+class Panel:
+    """
+    Time x symbol float arrays of a long kline frame, NaN where a symbol
+    has no candle, plus each symbol's relative bid/ask spread.
+    """
+
+    def __init__(self, times, symbols, arrays, spread):
+        self.times = times
+        self.symbols = symbols
+        self.arrays = arrays
+        self.spread = spread
+        self.candles = np.count_nonzero(~np.isnan(arrays['close']), axis=0)  # Per symbol
+        steps = np.diff(times.astype('datetime64[ms]').astype(np.int64))
+        self.interval_ms = int(np.median(steps)) if len(steps) else 86_400_000
+        self._derived = {}  # Indicator and rolling series, computed once per panel
+
+    @classmethod
+    def from_frame(cls, df, columns=PANEL_COLUMNS):
+        t_codes, times = pd.factorize(df['open_time'], sort=True)
+        symbols = df['symbol']
+        if isinstance(symbols.dtype, pd.CategoricalDtype):
+            symbols = symbols.cat.remove_unused_categories()
+            s_codes, labels = symbols.cat.codes.to_numpy(), symbols.cat.categories
+        else:
+            s_codes, labels = pd.factorize(symbols, sort=True)
+        ok = (t_codes >= 0) & (s_codes >= 0)
+        arrays = {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            wide = np.full((len(times), len(labels)), np.nan)
+            wide[t_codes[ok], s_codes[ok]] = df[col].to_numpy(dtype=np.float64)[ok]
+            arrays[col] = wide
+        spread = np.full(len(labels), np.nan)
+        if 'bid' in arrays and 'ask' in arrays:
+            with np.errstate(invalid='ignore'):
+                relative = (arrays['ask'] - arrays['bid']) / ((arrays['ask'] + arrays['bid']) / 2)
+            has_quote = ~np.isnan(relative).all(axis=0)
+            spread[has_quote] = np.nanmean(relative[:, has_quote], axis=0)
+        return cls(np.asarray(times), [str(s) for s in labels], arrays, spread)
+
+    def __getitem__(self, col):
+        return self.arrays[col]
+
+    @property
+    def periods_per_year(self):
+        return YEAR_MS / self.interval_ms
+
+    def values(self, operand):
+        """
+        A (T, S) array for an operand: a panel column ('close'), an
+        indicator ('EMA 20', 'RSI 14') or a number.
+        """
+        if isinstance(operand, (int, float)):
+            return np.full(self.arrays['close'].shape, float(operand))
+        if operand in self.arrays:
+            return self.arrays[operand]
+        if operand not in self._derived:
+            self._derived[operand] = self._indicator(parse_indicator(operand))
+        return self._derived[operand]
+
+    def _indicator(self, indicator):
+        missing = [c for c in indicator.inputs if c not in self.arrays]
+        if missing:
+            raise ValueError(f"{indicator} needs the kline columns; missing: {', '.join(missing)}.")
+        out = np.full(self.arrays['close'].shape, np.nan)
+        for s in range(len(self.symbols)):
+            # Only the symbol's own candles, so gaps do not stall the warm-up
+            rows = np.flatnonzero(~np.isnan(self.arrays['close'][:, s]))
+            if len(rows):
+                values, _ = indicator.compute({c: self.arrays[c][rows, s] for c in indicator.inputs}, 0, None)
+                out[rows, s] = values
+        return out
+
+    def returns(self):
+        """
+        (close-to-close returns, 1.0 where a symbol has a candle else 0.0,
+        1 / number of symbols with a candle per bar), shared by every
+        simulation over the panel.
+        """
+        if 'returns' not in self._derived:
+            close = self.arrays['close']
+            present = ~np.isnan(close)
+            returns = np.zeros_like(close)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                returns[1:] = close[1:] / close[:-1] - 1
+            returns[~np.isfinite(returns)] = 0.0
+            self._derived['returns'] = (returns, present.astype(np.float64), 1 / np.maximum(present.sum(axis=1), 1))
+        return self._derived['returns']
+
+    def rolling(self, col, n, how):
+        """Rolling max/min of a column over the n bars before each bar (excluding it)."""
+        key = (col, n, how)
+        if key not in self._derived:
+            frame = pd.DataFrame(self.arrays[col]).rolling(n)
+            self._derived[key] = getattr(frame, how)().shift(1).to_numpy()
+        return self._derived[key]
+
+
+def _hold(events):
+    """Forward-fill position events (NaN = no change) along time; flat before the first."""
+    return pd.DataFrame(events).ffill().fillna(0.0).to_numpy()
+
+
+class Rule:
+    """
+    Base class. positions(panel) returns a (T, S) array of target
+    positions. params lists the keyword parameters a sweep can vary.
+    """
+    params = ()
+
+    def __init__(self, short=False):
+        self.short = bool(short)
+
+    def valid(self):
+        return True
+
+    def positions(self, panel):
+        raise NotImplementedError
+
+    def describe(self):
+        return {p: getattr(self, p) for p in self.params}
+
+    def __str__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={v}' for k, v in self.describe().items())})"
+
+
+class Crossover(Rule):
+    """Long while the fast moving average is above the slow one (short below, if short)."""
+    params = ('fast', 'slow', 'ma')
+
+    def __init__(self, fast=20, slow=50, ma='EMA', short=False):
+        super().__init__(short)
+        self.fast, self.slow, self.ma = int(fast), int(slow), str(ma).upper()
+
+    def valid(self):
+        return 0 < self.fast < self.slow
+
+    def positions(self, panel):
+        fast, slow = panel.values(f'{self.ma} {self.fast}'), panel.values(f'{self.ma} {self.slow}')
+        # Comparisons with NaN (warm-up, missing candles) are False: flat
+        out = (fast > slow).astype(np.float64)
+        if self.short:
+            out -= fast < slow
+        return out
+
+
+class Threshold(Rule):
+    """
+    Mean reversion on an oscillator: go long when it drops below lower and
+    stay long until it rises above upper (where a short rule goes short).
+    """
+    params = ('indicator', 'n', 'lower', 'upper')
+
+    def __init__(self, indicator='RSI', n=14, lower=30, upper=70, short=False):
+        super().__init__(short)
+        self.indicator, self.n = str(indicator).upper(), int(n)
+        self.lower, self.upper = float(lower), float(upper)
+
+    def valid(self):
+        return self.n > 0 and self.lower < self.upper
+
+    def positions(self, panel):
+        values = panel.values(f'{self.indicator} {self.n}')
+        events = np.full(values.shape, np.nan)
+        with np.errstate(invalid='ignore'):
+            events[values < self.lower] = 1.0
+            events[values > self.upper] = -1.0 if self.short else 0.0
+        return _hold(events)
+
+
+class Breakout(Rule):
+    """Long when the close breaks the high of the last n bars; out (or short) below their low."""
+    params = ('n',)
+
+    def __init__(self, n=20, short=False):
+        super().__init__(short)
+        self.n = int(n)
+
+    def valid(self):
+        return self.n > 0
+
+    def positions(self, panel):
+        close = panel['close']
+        events = np.full(close.shape, np.nan)
+        with np.errstate(invalid='ignore'):
+            events[close > panel.rolling('high', self.n, 'max')] = 1.0
+            events[close < panel.rolling('low', self.n, 'min')] = -1.0 if self.short else 0.0
+        return _hold(events)
+
+
+RULES = {'crossover': Crossover, 'threshold': Threshold, 'breakout': Breakout}
+
+
+def make_rule(name, **params):
+    if name not in RULES:
+        raise ValueError(f"Unknown rule '{name}'. Choose from {', '.join(RULES)}.")
+    return RULES[name](**params)
+
+
+class Simulation:
+    """
+    Per-bar, per-symbol outcome of a position array: held positions, net
+    returns after costs, and the equal-weight portfolio built from them.
+    """
+
+    def __init__(self, panel, positions, fee=DEFAULT_FEE, spread=None):
+        # A sweep runs this once per parameter set, so the portfolio is
+        # reduced straight from held positions and turnover (a row-wise dot
+        # product and a matrix-vector product); the per-symbol net returns
+        # are only built when equity() or stats() ask for them.
+        returns, present, inv_count = panel.returns()
+        held = np.empty_like(positions)
+        held[0] = 0.0
+        np.multiply(positions[:-1], present[1:], out=held[1:])  # Decided at the previous close
+        turnover = np.empty_like(held)
+        turnover[0] = 0.0
+        np.subtract(held[1:], held[:-1], out=turnover[1:])
+        np.abs(turnover, out=turnover)
+        # spread: used for symbols without a quote; the bid/ask spread otherwise
+        half_spread = np.where(np.isnan(panel.spread), 0.0 if spread is None else spread, panel.spread) / 2
+        self.cost_rate = fee + half_spread
+        self.held, self.turnover = held, turnover
+        self.panel = panel
+        self.portfolio = (np.einsum('ts,ts->t', held, returns) - turnover @ self.cost_rate) * inv_count
+
+    @property
+    def costs(self):
+        return self.turnover * self.cost_rate
+
+    @property
+    def net(self):
+        """(T, S) returns of each symbol after costs."""
+        return self.held * self.panel.returns()[0] - self.costs
+
+    def equity(self):
+        """open_time plus the portfolio's and each symbol's equity curve (starting at 1)."""
+        data = {'open_time': self.panel.times, 'portfolio': np.cumprod(1 + self.portfolio)}
+        curves = np.cumprod(1 + self.net, axis=0)
+        for s, symbol in enumerate(self.panel.symbols):
+            data[symbol] = curves[:, s]
+        return pd.DataFrame(data)
+
+    def stats(self):
+        """Performance of the portfolio and of each symbol, one row each."""
+        net, costs = self.net, self.costs
+        rows = [dict(symbol='portfolio', **_metrics(self.portfolio, self.panel.periods_per_year),
+                     trades=np.count_nonzero(self.turnover), exposure=_exposure(self.held, self.panel.candles.sum()),
+                     costs=float(costs.sum() / max(1, len(self.panel.symbols))))]
+        for s, symbol in enumerate(self.panel.symbols):
+            rows.append(dict(symbol=symbol, **_metrics(net[:, s], self.panel.periods_per_year),
+                             trades=np.count_nonzero(self.turnover[:, s]),
+                             exposure=_exposure(self.held[:, s], self.panel.candles[s]),
+                             costs=float(costs[:, s].sum())))
+        return pd.DataFrame(rows)
+
+
+def _metrics(returns, periods_per_year):
+    equity = np.cumprod(1 + returns)
+    std = returns.std()
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    return {
+        'total_return': float(equity[-1] - 1) if len(equity) else 0.0,
+        'sharpe': float(returns.mean() / std * np.sqrt(periods_per_year)) if std > 0 else 0.0,
+        'max_drawdown': float(drawdown.min()) if len(drawdown) else 0.0,
+    }
+
+
+def _exposure(held, candles):
+    # Share of candles with a position; held is -1, 0 or 1, and 0 wherever a symbol has no candle
+    return np.count_nonzero(held) / candles if candles else 0.0
+
+
+def backtest(df, rule, fee=DEFAULT_FEE, spread=None, panel=None):
+    """Simulation of rule over df (a get_binance_data frame, or its Panel)."""
+    panel = Panel.from_frame(df) if panel is None else panel
+    return Simulation(panel, rule.positions(panel), fee, spread)
+
+
+# --- Parameter sweeps ---
+
+def parse_grid(specs):
+    """
+    ['fast=5:50:5', 'slow=100', 'ma=EMA,SMA'] -> {'fast': [5, 10, ..., 50],
+    'slow': [100], 'ma': ['EMA', 'SMA']}. Ranges include their stop.
+    """
+    grid = {}
+    for spec in specs:
+        name, sep, values = spec.partition('=')
+        if not sep or not values:
+            raise ValueError(f"Invalid grid entry '{spec}', e.g. fast=5:50:5 or ma=EMA,SMA.")
+        if ':' in values:
+            parts = [float(v) for v in values.split(':')]
+            start, stop, step = parts[0], parts[1], parts[2] if len(parts) > 2 else 1.0
+            if step <= 0:
+                raise ValueError(f"The step of '{spec}' must be positive.")
+            grid[name] = [_number(v) for v in np.arange(start, stop + step / 2, step)]
+        else:
+            grid[name] = [_number(v) for v in values.split(',')]
+    return grid
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except ValueError:
+        return value
+    return int(value) if value.is_integer() else value
+
+
+def grid_params(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+_WORKER_PANEL = None
+
+
+def _init_worker(panel):
+    global _WORKER_PANEL
+    _WORKER_PANEL = panel
+
+
+def _run_batch(rule_name, batch, fee, spread, short, panel=None):
+    panel = _WORKER_PANEL if panel is None else panel
+    out = []
+    for params in batch:
+        rule = make_rule(rule_name, short=short, **params)
+        sim = Simulation(panel, rule.positions(panel), fee, spread)
+        out.append(dict(params, **_metrics(sim.portfolio, panel.periods_per_year),
+                        trades=np.count_nonzero(sim.turnover), exposure=_exposure(sim.held, panel.candles.sum())))
+    return out
+
+
+def sweep(df, rule_name, grid, fee=DEFAULT_FEE, spread=None, short=False, workers=None, batch_size=25,
+          task=None, panel=None):
+    """
+    Portfolio metrics for every valid combination in grid (see
+    parse_grid), best Sharpe ratio first. Batches of batch_size
+    combinations run on `workers` processes (in this process when
+    workers is 1 or everything fits in one batch).
+    """
+    panel = Panel.from_frame(df) if panel is None else panel
+    params = [p for p in grid_params(grid) if make_rule(rule_name, short=short, **p).valid()]
+    if not params:
+        raise ValueError("The grid has no valid parameter combination.")
+    batches = [params[i:i + batch_size] for i in range(0, len(params), batch_size)]
+    workers = min(workers or os.cpu_count() or 1, len(batches))
+    rows = []
+    if workers <= 1:
+        for i, batch in enumerate(batches):
+            if task is not None:
+                task.progress(i / len(batches), f"Backtesting {len(rows):,}/{len(params):,}")
+            rows.extend(_run_batch(rule_name, batch, fee, spread, short, panel))
+    else:
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker, initargs=(panel,))
+        try:
+            pending = {pool.submit(_run_batch, rule_name, batch, fee, spread, short) for batch in batches}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    rows.extend(future.result())
+                if task is not None:
+                    task.progress(len(rows) / len(params), f"Backtesting {len(rows):,}/{len(params):,}")
+        finally:
+            pool.shutdown(cancel_futures=True)
+    results = pd.DataFrame(rows)
+    return results.sort_values('sharpe', ascending=False, kind='stable', ignore_index=True)
+
+
+def main():
+    from solusd_cache import DEFAULT_CACHE_DIR, KlineCache
+    from solusd_pull import get_binance_data
+
+    parser = argparse.ArgumentParser(description="Backtest a rule, or sweep its parameters, over Binance klines.")
+    parser.add_argument("--symbols", nargs="+", required=True)
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--limit", type=int, default=8760, help="candles per symbol")
+    parser.add_argument("--rule", default="crossover", choices=list(RULES))
+    parser.add_argument("--grid", nargs="*", default=[], metavar="NAME=VALUES",
+                        help="parameter values, e.g. fast=5:50:5 slow=100,200 ma=EMA,SMA")
+    parser.add_argument("--short", action="store_true", help="take short positions too")
+    parser.add_argument("--fee", type=float, default=DEFAULT_FEE)
+    parser.add_argument("--spread", type=float, help="relative spread for symbols without a quote")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--top", type=int, default=20, help="rows of the sweep to print")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    try:
+        grid = parse_grid(args.grid)
+    except ValueError as e:
+        parser.error(str(e))
+    df = get_binance_data(args.symbols, args.interval, args.limit, cache=KlineCache(args.cache_dir))
+    results = sweep(df, args.rule, grid, args.fee, args.spread, args.short, args.workers)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(results.head(args.top).to_string(index=False))
+        best = make_rule(args.rule, short=args.short, **results.iloc[0][list(grid)].to_dict())
+        print(f"\n{best}")
+        print(backtest(df, best, args.fee, args.spread).stats().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
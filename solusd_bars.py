@@ -0,0 +1,224 @@
+"""
+Bars built from aggregated trades: time bars of any width, and tick,
+volume and dollar bars.
+
+BarBuilder consumes trades a chunk at a time (arrays of time, price,
+qty, n_trades and buyer_maker as returned by solusd_pull's aggTrades
+ingestion) and returns the bars each chunk completes; the still-open last
+bar is carried to the next chunk as a single aggregated row, so memory is
+one chunk plus the bars however many trades there are. Bars are returned
+in the get_binance_data schema and load into DataFrameGUI like klines.
+
+Trades are never split: a trade that crosses a volume or dollar
+threshold belongs to the bar it starts in, and the overshoot counts
+toward the next one (bars sit on a fixed grid of cumulative size).
+Time bars without trades are omitted.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from solusd_pivot import WEEK_OFFSET_MS
+from solusd_pull import FRAME_COLUMNS, INTERVAL_MS, KLINE_COLUMNS, _date_column, _finalize, _symbol_column
+
+BAR_KINDS = ('time', 'tick', 'volume', 'dollar')
+UNIT_MS = {'ms': 1, 's': 1_000, 'm': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+# Bar fields that add up when two pieces of one bar are merged (see _merge).
+_SUMS = ('volume', 'quote', 'trades', 'taker_base', 'taker_quote')
+
+
+def parse_size(kind, size):
+    """
+    Bar size for kind: milliseconds for time bars ('1m', '45s', '2h', or a
+    number of ms), a trade count for tick bars, base or quote volume for
+    volume and dollar bars.
+    """
+    if kind not in BAR_KINDS:
+        raise ValueError(f"Unknown bar kind '{kind}'. Choose from {', '.join(BAR_KINDS)}.")
+    if kind == 'time':
+        if isinstance(size, str) and size in INTERVAL_MS and size != '1M':
+            value = INTERVAL_MS[size]
+        else:
+            match = re.fullmatch(r'(\d+)(ms|s|m|h|d|w)?', str(size).strip())
+            if match is None:
+                raise ValueError(f"Invalid time bar width '{size}', e.g. 30s, 7m, 2h or 1d.")
+            value = int(match.group(1)) * UNIT_MS[match.group(2) or 'ms']
+    else:
+        value = float(size)
+        if kind == 'tick':
+            value = int(value)
+    if value <= 0:
+        raise ValueError("The bar size must be positive.")
+    return value
+
+
+class BarBuilder:
+    """
+    Incremental bar builder for one symbol. Feed trade chunks in time order
+    to update(); call flush() at the end for the last, possibly incomplete,
+    bar.
+    """
+
+    def __init__(self, kind='time', size='1m'):
+        self.kind = kind
+        self.size = parse_size(kind, size)
+        # Monday-aligned weeks, like Binance's 1w klines
+        self.offset_ms = WEEK_OFFSET_MS if kind == 'time' and self.size % UNIT_MS['w'] == 0 else 0
+        self._done = 0.0  # Trades, volume or quote volume before the current chunk
+        self._open = None  # The open bar, as a one-row bars dict
+
+    def _bar_ids(self, t, price, qty):
+        if self.kind == 'time':
+            return (t - self.offset_ms) // self.size
+        if self.kind == 'tick':
+            ids = (self._done + np.arange(len(t))) // self.size
+            self._done += len(t)
+            return ids.astype(np.int64)
+        amount = qty if self.kind == 'volume' else price * qty
+        total = self._done + np.cumsum(amount)
+        before = total - amount  # Size done before each trade
+        self._done = float(total[-1])
+        return np.floor(before / self.size).astype(np.int64)
+
+    def update(self, trades):
+        """Bars completed by this chunk of trades, as a kline frame."""
+        t = np.asarray(trades['time'], dtype=np.int64)
+        if not len(t):
+            return self._frame(None)
+        price = np.asarray(trades['price'], dtype=np.float64)
+        qty = np.asarray(trades['qty'], dtype=np.float64)
+        ids = self._bar_ids(t, price, qty)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+        last = np.concatenate((starts[1:], [len(t)])) - 1
+        taker = ~np.asarray(trades['buyer_maker'], dtype=bool)  # The buyer took liquidity
+        quote = price * qty
+        n_trades = trades.get('n_trades')
+        n_trades = np.ones(len(t), dtype=np.int64) if n_trades is None else np.asarray(n_trades, dtype=np.int64)
+        bars = {
+            'id': ids[starts],
+            'first': t[starts], 'last': t[last],
+            'open': price[starts], 'close': price[last],
+            'high': np.maximum.reduceat(price, starts), 'low': np.minimum.reduceat(price, starts),
+            'volume': np.add.reduceat(qty, starts), 'quote': np.add.reduceat(quote, starts),
+            'trades': np.add.reduceat(n_trades, starts),
+            'taker_base': np.add.reduceat(np.where(taker, qty, 0.0), starts),
+            'taker_quote': np.add.reduceat(np.where(taker, quote, 0.0), starts),
+        }
+        if self._open is not None:
+            if self._open['id'][0] == bars['id'][0]:
+                bars = _merge(self._open, bars)
+            else:
+                bars = {k: np.concatenate((self._open[k], v)) for k, v in bars.items()}
+        self._open = {k: v[-1:] for k, v in bars.items()}
+        return self._frame({k: v[:-1] for k, v in bars.items()})
+
+    def flush(self):
+        """The open bar (if any) as a one-row frame; the builder is then empty."""
+        bars, self._open = self._open, None
+        return self._frame(bars)
+
+    def _frame(self, bars):
+        if bars is None or not len(bars['id']):
+            return _empty_klines()
+        if self.kind == 'time':
+            open_ms = bars['id'] * self.size + self.offset_ms
+            close_ms = open_ms + self.size - 1
+        else:
+            open_ms, close_ms = bars['first'], bars['last']
+        df = pd.DataFrame({
+            'open_time': open_ms.astype('datetime64[ms]').astype('datetime64[ns]'),
+            'open': bars['open'], 'high': bars['high'], 'low': bars['low'], 'close': bars['close'],
+            'volume': bars['volume'],
+            'close_time': close_ms.astype('datetime64[ms]').astype('datetime64[ns]'),
+            'quote_asset_volume': bars['quote'],
+            'num_trades': bars['trades'].astype(np.int32),
+            'taker_buy_base': bars['taker_base'], 'taker_buy_quote': bars['taker_quote'],
+            'ignore': np.zeros(len(open_ms), dtype=np.int8),
+        }, copy=False)
+        return df
+
+
+def _merge(open_bar, bars):
+    # The carried open bar and the first bar of the chunk are one bar.
+    first = {
+        'id': open_bar['id'], 'first': open_bar['first'], 'last': bars['last'][:1],
+        'open': open_bar['open'], 'close': bars['close'][:1],
+        'high': np.maximum(open_bar['high'], bars['high'][:1]),
+        'low': np.minimum(open_bar['low'], bars['low'][:1]),
+    }
+    for k in _SUMS:
+        first[k] = open_bar[k] + bars[k][:1]
+    return {k: np.concatenate((first[k], bars[k][1:])) for k in bars}
+
+
+def _empty_klines():
+    return pd.DataFrame({c: pd.Series(dtype='datetime64[ns]' if c.endswith('_time') else np.float64)
+                         for c in KLINE_COLUMNS})
+
+
+def build_bars(chunks, kind='time', size='1m', symbol=None):
+    """
+    Bars from an iterable of trade chunks, in the get_binance_data schema
+    (bid/ask NaN; symbol column when symbol is given).
+    """
+    builder = BarBuilder(kind, size)
+    frames = [builder.update(chunk) for chunk in chunks]
+    frames.append(builder.flush())
+    frames = [f for f in frames if len(f)]
+    df = pd.concat(frames, ignore_index=True) if frames else _empty_klines()
+    df['date'] = _date_column(df['open_time'])
+    df['volatility'] = df['high'] - df['low']
+    df['bid'] = np.nan
+    df['ask'] = np.nan
+    if symbol is not None:
+        df['symbol'] = _symbol_column(symbol, len(df))
+        return df[FRAME_COLUMNS]
+    return df
+
+
+def bar_label(kind, size):
+    """Short description used as the viewer's interval, e.g. 'dollar 1e+06 bars'."""
+    return size if kind == 'time' else f"{kind} {size} bars"
+
+
+def get_trade_bars(symbols, kind='time', size='1m', start=None, end=None, cache_dir=None,
+                   client=None, max_workers=4, offline=False, chunk_trades=2_000_000, task=None):
+    """
+    Bars for each symbol from its aggregated trades between start and end,
+    as one get_binance_data-shaped frame. Trades are ingested into the
+    symbol's on-disk trade store first (only what is missing; nothing with
+    offline=True), then read back chunk_trades at a time.
+    """
+    from solusd_cache import DEFAULT_CACHE_DIR
+    from solusd_pull import NO_QUOTE, BinanceClient, _to_ms, ingest_agg_trades, trade_store
+
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    parse_size(kind, size)  # Fail before any download
+    start_ms = _to_ms(start)
+    end_ms = _to_ms(end)
+    own_client = client is None and not offline
+    if own_client:
+        client = BinanceClient(pool_size=max_workers)
+    try:
+        quotes = {} if offline else client.book_tickers(symbols)
+        frames = []
+        for i, symbol in enumerate(symbols):
+            if task is not None:
+                task.progress(i / len(symbols), f"Trades for {symbol}")
+            if not offline:
+                ingest_agg_trades(symbol, start_ms, end_ms, cache_dir, client=client, max_workers=max_workers)
+            store = trade_store(cache_dir, symbol)
+            if store is None:
+                continue
+            times = store.column('time')
+            lo = 0 if start_ms is None else int(np.searchsorted(times, start_ms))
+            hi = len(store) if end_ms is None else int(np.searchsorted(times, end_ms, side='right'))
+            df = build_bars(store.chunks(chunk_trades, start=lo, stop=hi), kind, size, symbol)
+            df['bid'], df['ask'] = quotes.get(symbol, NO_QUOTE)
+            frames.append(df)
+    finally:
+        if own_client:
+            client.close()
+    return _finalize(frames)
@@ -0,0 +1,988 @@
+"""
+Benchmarks for the data pull and viewer hot paths.
+
+Everything here runs headless against synthetic data or a local mock of
+the Binance REST API, so results are repeatable and never touch the
+network. Run e.g.:
+
+    python solusd_bench.py fetch --symbols 60 --latency 0.05
+    python solusd_bench.py faults --rate 0.3
+    python solusd_bench.py trades --trades 5000000 --kind volume --size 500
+    python solusd_bench.py suite --sizes 10000 1000000 --output run.json
+    python solusd_bench.py compare baseline.json run.json
+    python solusd_bench.py store --rows 20000000
+    python solusd_bench.py server --symbols 20 --rows 50000 --clients 4
+    python solusd_bench.py backtest --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import tempfile
+import threading
+import tracemalloc
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from solusd_export import EXPORT_FORMATS, export_view
+from solusd_filters import Bins, FilterEngine, Include, Like, Range
+from solusd_indicators import EMA, RSI, IndicatorEngine
+from solusd_pivot import PivotEngine, PivotSpec
+from solusd_sort import SortCache
+from solusd_store import ColumnStore
+from solusd_stream import BinanceStream, LiveFrame
+from solusd_view import ViewModel, display_array, format_rows
+from solusd_pull import (
+    FRAME_COLUMNS, INTERVAL_MS, KLINE_COLUMNS, MAX_KLINE_LIMIT, BinanceClient, WeightBudget, _date_column, _klines_to_df,
+    get_binance_data, iter_binance_klines,
+)
+
+SUITE_SIZES = [10_000, 1_000_000, 10_000_000]
+PARSE_CAP = 1_000_000  # Rows parsed per size in the suite; JSON for 10M rows would not fit in memory
+
+
+def make_klines(n, start_ms=1_600_000_000_000, interval_ms=60_000, seed=0):
+    """
+    Build a synthetic /klines payload (list of lists, prices as strings)
+    with the same shape Binance returns.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) * (1 + rng.random(n) * 0.001)
+    low = np.minimum(open_, close) * (1 - rng.random(n) * 0.001)
+    volume = rng.random(n) * 1000
+    trades = rng.integers(1, 5000, n)
+    open_time = start_ms + np.arange(n, dtype=np.int64) * interval_ms
+    rows = []
+    for i in range(n):
+        rows.append([
+            int(open_time[i]), f'{open_[i]:.8f}', f'{high[i]:.8f}', f'{low[i]:.8f}',
+            f'{close[i]:.8f}', f'{volume[i]:.8f}', int(open_time[i] + interval_ms - 1),
+            f'{volume[i] * close[i]:.8f}', int(trades[i]), f'{volume[i] / 2:.8f}',
+            f'{volume[i] * close[i] / 2:.8f}', '0',
+        ])
+    return rows
+
+
+def agg_trades(ids, start_ms=1_600_000_000_000, gap_ms=50):
+    """
+    Synthetic /aggTrades records for aggregate ids: deterministic per id, so
+    any page of the same history agrees with every other.
+    """
+    price = 100 + 5 * np.sin(ids / 50_000) + 0.01 * np.sin(ids * 0.7)
+    qty = 0.001 + (ids * 7919 % 1000) / 100
+    first = ids * 3
+    return [
+        {'a': int(i), 'p': f'{p:.8f}', 'q': f'{q:.8f}', 'f': int(f), 'l': int(f + i % 3),
+         'T': int(start_ms + i * gap_ms), 'm': bool(i % 3 == 0), 'M': True}
+        for i, p, q, f in zip(ids, price, qty, first)
+    ]
+
+
+def make_frame(n, n_symbols=20, interval_ms=60_000, seed=0):
+    """
+    A get_binance_data-shaped frame of n rows split over n_symbols
+    consecutive symbol blocks, generated directly with NumPy.
+    """
+    rng = np.random.default_rng(seed)
+    per = -(-n // n_symbols)
+    sym_codes = np.repeat(np.arange(n_symbols, dtype=np.int16), per)[:n]
+    step = np.arange(n) - sym_codes.astype(np.int64) * per
+    open_ms = 1_600_000_000_000 + step * interval_ms
+    shocks = rng.normal(0, 0.001, n)
+    shocks[step == 0] = 0.0
+    # Random walk restarting at 100 for every symbol
+    log_close = np.cumsum(shocks)
+    log_close -= np.repeat(log_close[np.flatnonzero(step == 0)], np.bincount(sym_codes, minlength=n_symbols)[:n_symbols])
+    close = 100 * np.exp(log_close)
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    open_[step == 0] = close[step == 0]
+    high = np.maximum(open_, close) * (1 + rng.random(n) * 0.001)
+    low = np.minimum(open_, close) * (1 - rng.random(n) * 0.001)
+    volume = rng.random(n) * 1000
+    df = pd.DataFrame({
+        'open_time': open_ms.astype('datetime64[ms]').astype('datetime64[ns]'),
+        'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume,
+        'close_time': (open_ms + interval_ms - 1).astype('datetime64[ms]').astype('datetime64[ns]'),
+        'quote_asset_volume': volume * close,
+        'num_trades': rng.integers(1, 5000, n).astype(np.int32),
+        'taker_buy_base': volume / 2, 'taker_buy_quote': volume * close / 2,
+        'ignore': np.zeros(n, dtype=np.int8),
+    })
+    df['date'] = _date_column(df['open_time'])
+    df['volatility'] = df['high'] - df['low']
+    df['bid'] = np.nan
+    df['ask'] = np.nan
+    df['symbol'] = pd.Categorical.from_codes(sym_codes, categories=[f'S{i:03d}USDT' for i in range(n_symbols)])
+    return df[FRAME_COLUMNS]
+
+
+class MockBinanceServer:
+    """
+    Minimal local stand-in for the Binance REST endpoints used by
+    solusd_pull. Each request sleeps for `latency` seconds to simulate a
+    network round-trip and reports its weight in X-MBX-USED-WEIGHT-1M.
+
+    faults maps a fault to the probability that a request gets it instead
+    of its answer: 'throttle' (429 with Retry-After), 'error' (HTTP 500)
+    and 'drop' (connection closed without a response). Symbols starting
+    with BAD are always rejected with Binance's invalid-symbol payload.
+    """
+
+    def __init__(self, latency=0.05, rows=365, history_end=1_700_000_000_000, faults=None,
+                 retry_after=0, seed=0, trades=1_000_000, trade_start=1_600_000_000_000, trade_gap_ms=50):
+        self.latency = latency
+        self.trades = trades  # aggTrades history: ids 0..trades-1, one every trade_gap_ms
+        self.trade_start = trade_start
+        self.trade_gap_ms = trade_gap_ms
+        self.history_end = history_end
+        self.rows = rows
+        self.faults = faults or {}
+        self.retry_after = retry_after
+        self.requests = 0
+        self.injected = {name: 0 for name in self.faults}
+        self.paths = {}  # path with query -> times requested
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._payload = json.dumps(make_klines(rows)).encode()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True  # Small replies would otherwise wait on delayed ACKs
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body, used, headers=()):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('X-MBX-USED-WEIGHT-1M', str(used))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    used = server.requests
+                    server.paths[self.path] = server.paths.get(self.path, 0) + 1
+                    fault = server._pick_fault()
+                time.sleep(server.latency)
+                if fault == 'drop':
+                    self.close_connection = True
+                    return
+                if fault == 'throttle':
+                    self.reply(429, b'{"code":-1003,"msg":"Too many requests."}', used,
+                               [('Retry-After', str(server.retry_after))])
+                    return
+                if fault == 'error':
+                    self.reply(500, b'Internal Server Error', used)
+                    return
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                symbols = json.loads(query['symbols'][0]) if 'symbols' in query else query.get('symbol', [''])
+                if any(s.startswith('BAD') for s in symbols):
+                    self.reply(400, b'{"code":-1121,"msg":"Invalid symbol."}', used)
+                    return
+                if url.path.endswith('/klines') and 'startTime' in query:
+                    body = server.kline_page(query)
+                elif url.path.endswith('/klines'):
+                    body = server._payload
+                elif url.path.endswith('/aggTrades'):
+                    body = server.agg_trade_page(query)
+                elif url.path.endswith('/ticker/bookTicker'):
+                    quotes = [{'symbol': s, 'bidPrice': '99.5', 'askPrice': '100.5'} for s in symbols]
+                    body = json.dumps(quotes if 'symbols' in query else quotes[0]).encode()
+                else:
+                    self.send_error(404)
+                    return
+                self.reply(200, body, used)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_address[1]}/api/v3'
+
+    def _pick_fault(self):
+        roll = self._rng.random()
+        for name, p in self.faults.items():
+            if roll < p:
+                self.injected[name] += 1
+                return name
+            roll -= p
+        return None
+
+    def agg_trade_page(self, query):
+        if 'fromId' in query:
+            first = int(query['fromId'][0])
+        else:
+            first = -(-(int(query['startTime'][0]) - self.trade_start) // self.trade_gap_ms)
+        first = max(first, 0)
+        ids = np.arange(first, min(first + int(query.get('limit', ['500'])[0]), self.trades))
+        return json.dumps(agg_trades(ids, self.trade_start, self.trade_gap_ms)).encode()
+
+    def kline_page(self, query):
+        step = INTERVAL_MS[query['interval'][0]]
+        start = int(query['startTime'][0])
+        start += -start % step
+        end = min(int(query.get('endTime', [start + step * 1000])[0]), self.history_end)
+        n = min(int(query.get('limit', ['500'])[0]), max(0, (end - start) // step + 1))
+        if n <= 0:
+            return b'[]'  # Past the end of the mock history
+        return json.dumps(make_klines(n, start_ms=start, interval_ms=step, seed=start)).encode()
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class MockStreamServer:
+    """
+    Local WebSocket stand-in for the Binance combined stream endpoint.
+    Streams kline and bookTicker messages for the requested symbols at
+    `rate` messages per second, each stamped with its send time in 'E'.
+    """
+
+    def __init__(self, rate=2000, interval_ms=60_000, candles_per_minute=60):
+        self.rate = rate
+        self.interval_ms = interval_ms
+        # Advance to a new candle every this many messages per symbol
+        self.candle_every = max(1, rate * 60 // candles_per_minute)
+        self.sent = 0
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        import websockets
+
+        asyncio.set_event_loop(self._loop)
+
+        async def handler(ws, *args):
+            path = ws.request.path if hasattr(ws, 'request') else args[0]
+            streams = parse_qs(urlparse(path).query).get('streams', [''])[0].split('/')
+            symbols = sorted({name.split('@')[0].upper() for name in streams if name})
+            await self._emit(ws, symbols)
+
+        async def main():
+            self._server = await websockets.serve(handler, '127.0.0.1', 0)
+            self.url = f'ws://127.0.0.1:{self._server.sockets[0].getsockname()[1]}/stream'
+            self._ready.set()
+            await self._server.wait_closed()
+
+        self._loop.run_until_complete(main())
+
+    async def _emit(self, ws, symbols):
+        start = 1_600_000_000_000
+        batch = max(1, self.rate // 100)
+        i = 0
+        try:
+            while True:
+                for _ in range(batch):
+                    sym = symbols[i % len(symbols)]
+                    step = i // len(symbols)
+                    now = int(time.time() * 1000)
+                    price = 100 + (step % 1000) * 0.01
+                    if step % 2:
+                        data = {'u': i, 's': sym, 'b': f'{price - 0.05:.2f}', 'B': '1', 'a': f'{price + 0.05:.2f}',
+                                'A': '1', 'E': now}
+                        name = f'{sym.lower()}@bookTicker'
+                    else:
+                        t = start + (step // self.candle_every) * self.interval_ms
+                        data = {'e': 'kline', 'E': now, 's': sym, 'k': {
+                            't': t, 'T': t + self.interval_ms - 1, 's': sym, 'i': '1m',
+                            'o': '100.00', 'h': f'{price + 1:.2f}', 'l': '99.00', 'c': f'{price:.2f}',
+                            'v': f'{step:.1f}', 'n': step, 'x': False, 'q': f'{step * price:.2f}',
+                            'V': f'{step / 2:.1f}', 'Q': f'{step * price / 2:.2f}', 'B': '0'}}
+                        name = f'{sym.lower()}@kline_1m'
+                    await ws.send(json.dumps({'stream': name, 'data': data}))
+                    i += 1
+                    self.sent += 1
+                await asyncio.sleep(0.01)
+        except Exception:
+            pass  # Client went away
+
+    def __enter__(self):
+        self._thread.start()
+        self._ready.wait(10)
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._thread.join(5)
+
+
+def bench_fetch(n_symbols=60, latency=0.05, workers=(1, 8, 16), rows=365):
+    symbols = [f'SYM{i}USDT' for i in range(n_symbols)]
+    results = {}
+    with MockBinanceServer(latency=latency, rows=rows) as server:
+        for w in workers:
+            start = time.perf_counter()
+            df = get_binance_data(symbols, '1d', rows, max_workers=w,
+                                  budget=WeightBudget(limit=100_000), base_url=server.base_url)
+            elapsed = time.perf_counter() - start
+            assert len(df) == n_symbols * rows
+            results[f'workers={w}'] = round(elapsed, 4)
+    return results
+
+
+def bench_faults(n_symbols=40, rate=0.2, latency=0.01, rows=365, loads=4):
+    """
+    get_binance_data through one BinanceClient against a mock server that
+    fails a `rate` share of requests (429s, 500s and dropped connections),
+    plus one invalid symbol. Every valid symbol must still arrive intact.
+    Then `loads` identical loads run at once to count coalesced requests.
+    """
+    symbols = [f'SYM{i}USDT' for i in range(n_symbols)] + ['BADUSDT']
+    faults = {'throttle': rate / 3, 'error': rate / 3, 'drop': rate / 3}
+    results = {}
+    with MockBinanceServer(latency=latency, rows=rows, faults=faults) as server:
+        client = BinanceClient(server.base_url, budget=WeightBudget(limit=100_000), backoff=0.01, max_retries=8)
+        start = time.perf_counter()
+        df = get_binance_data(symbols, '1d', rows, client=client)
+        results['seconds'] = round(time.perf_counter() - start, 4)
+        assert len(df) == n_symbols * rows, len(df)
+        assert list(df.attrs.get('errors', {})) == ['BADUSDT'], df.attrs
+        assert (df['bid'] == 99.5).all()
+        results.update(requests=server.requests, injected=dict(server.injected), retries=client.retries)
+        client.close()
+
+    with MockBinanceServer(latency=0.2, rows=rows) as server:
+        client = BinanceClient(server.base_url, budget=WeightBudget(limit=100_000))
+        barrier = threading.Barrier(loads)
+
+        def load():
+            barrier.wait()
+            return get_binance_data(symbols[:-1], '1d', rows, client=client)
+
+        threads = [threading.Thread(target=load) for _ in range(loads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        results['concurrent_loads'] = {
+            'loads': loads, 'requests': server.requests, 'single_load_requests': n_symbols + 1,
+            'coalesced': client.coalesced,
+        }
+        client.close()
+    return results
+
+
+def bench_trades(trades=2_000_000, kind='dollar', size=1e6, latency=0.0, workers=8, chunk_trades=500_000):
+    """
+    aggTrades ingestion from the mock server into a trade store, then bars
+    built chunk by chunk from the memory-mapped store. The bars are checked
+    against a one-shot pandas groupby over the same trades.
+    """
+    from solusd_bars import build_bars
+    from solusd_pull import ingest_agg_trades
+
+    results = {}
+    start = 1_600_000_000_000
+    with tempfile.TemporaryDirectory() as tmp, \
+            MockBinanceServer(latency=latency, trades=trades, trade_start=start) as server:
+        client = BinanceClient(server.base_url, budget=WeightBudget(limit=10_000_000), pool_size=workers)
+        t0 = time.perf_counter()
+        store = ingest_agg_trades('SYMUSDT', start, start + trades * 50, tmp, client=client, max_workers=workers)
+        results['ingest_seconds'] = round(time.perf_counter() - t0, 3)
+        results['trades'] = len(store)
+        results['requests'] = server.requests
+        results['store_bytes_per_trade'] = round(
+            sum(os.path.getsize(store._file(c)) for c in store.columns) / max(1, len(store)), 1)
+        client.close()
+        assert len(store) == trades, len(store)
+        assert (np.diff(store.column('agg_id')) == 1).all()
+
+        bars = {}
+        results['bars'] = _traced(lambda: bars.update(df=build_bars(store.chunks(chunk_trades), kind, size, 'SYMUSDT')))
+        df = bars['df']
+        results['bar_count'] = len(df)
+
+        t, p, q = store.column('time'), store.column('price'), store.column('qty')
+        amount = {'time': None, 'tick': None, 'volume': q, 'dollar': p * q}[kind]
+        if kind == 'time':
+            from solusd_bars import parse_size
+            groups = t // parse_size(kind, size)
+        elif kind == 'tick':
+            groups = np.arange(len(t)) // int(size)
+        else:
+            groups = np.floor((np.cumsum(amount) - amount) / float(size))
+        ref = pd.DataFrame({'g': groups, 'p': p, 'q': q}).groupby('g').agg(
+            open=('p', 'first'), high=('p', 'max'), low=('p', 'min'), close=('p', 'last'), volume=('q', 'sum'))
+        for col in ref.columns:
+            assert np.allclose(df[col].to_numpy(), ref[col].to_numpy()), col
+        assert df['num_trades'].sum() == store.column('n_trades').sum()
+    return results
+
+
+def bench_server(n_symbols=20, rows=50_000, clients=4, workers=2, page_rows=100):
+    """
+    solusd_server against the mock Binance server, all on localhost:
+    `clients` viewers load the same symbols at once (one dataset results),
+    then filter, sort, page and pivot through the server. Every answer is
+    checked against the same operation on a local frame.
+    """
+    from solusd_remote import DataClient, RemotePivotEngine, RemoteView, engines_for
+    from solusd_server import DataServer, DataService
+
+    symbols = [f'SYM{i}USDT' for i in range(n_symbols)]
+    results = {}
+    with MockBinanceServer(rows=rows) as mock:
+        client = BinanceClient(mock.base_url, budget=WeightBudget(limit=10_000_000))
+
+        def fetch(symbols, interval, limit):
+            return get_binance_data(symbols, interval, limit, client=client)
+
+        service = DataService(fetch, workers=workers)
+        try:
+            with DataServer(service) as server:
+                remotes = [DataClient(server.url) for _ in range(clients)]
+                barrier = threading.Barrier(clients)
+                frames = [None] * clients
+
+                def load(i):
+                    barrier.wait()
+                    frames[i] = remotes[i].load(symbols, '1m', rows)
+
+                t0 = time.perf_counter()
+                threads = [threading.Thread(target=load, args=(i,)) for i in range(clients)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                results['load_seconds'] = round(time.perf_counter() - t0, 3)
+                assert len({f.dataset for f in frames}) == 1
+                results['binance_requests'] = mock.requests
+                frame = frames[0]
+                local = get_binance_data(symbols, '1m', rows, client=client)
+
+                engine, sorter = engines_for(frame)
+                local_engine = FilterEngine(local)
+                local_sorter = SortCache(local_engine)
+                predicates = [Include('symbol', symbols[:n_symbols // 2]), Range('close', 95, 105)]
+                remote_rows, local_rows = engine.rows, local_engine.rows
+                timings = {}
+                for predicate in predicates:
+                    timings[str(predicate)] = round(_timed(lambda: engine.evaluate(predicate, remote_rows)), 4)
+                    remote_rows = engine.evaluate(predicate, remote_rows)
+                    local_rows = local_engine.evaluate(predicate, local_rows)
+                    assert len(remote_rows) == len(local_rows)
+                specs = [('close', False)]
+                timings['sort close desc'] = round(_timed(lambda: sorter.order(specs, remote_rows)), 4)
+                remote_rows = sorter.order(specs, remote_rows)
+                local_rows = local_sorter.order(specs, local_rows)
+                results['timings'] = timings
+                results['view_rows'] = len(remote_rows)
+
+                columns = ['open_time', 'symbol', 'close', 'volume']
+                expected = local[columns].take(local_rows)
+                mid = len(remote_rows) // 2
+                page = remote_rows.page(mid, mid + page_rows, columns)
+                pd.testing.assert_frame_equal(
+                    page, expected.iloc[mid:mid + page_rows].reset_index(drop=True), check_categorical=False)
+                results['page_ms'] = round(1000 * _timed(lambda: remote_rows.page(mid, mid + page_rows, columns)), 2)
+
+                spec = PivotSpec(['symbol'], ['volume'], 'sum', '1h')
+                got = RemotePivotEngine().pivot(RemoteView(frame, remote_rows), spec)
+                want = PivotEngine().pivot(ViewModel(local, local_rows), spec)
+                pd.testing.assert_frame_equal(got, want, check_categorical=False, check_dtype=False)
+                results['pivot_rows'] = len(got)
+
+                got, want = engine.index('symbol').pick(remote_rows), local_engine.index('symbol').pick(local_rows)
+                assert list(got[0]) == list(want[0]) and list(got[1]) == list(want[1]) and got[2] == want[2]
+                got, want = engine.index('close').histogram(remote_rows), local_engine.index('close').histogram(local_rows)
+                assert np.allclose(got[0], want[0]) and (got[1] == want[1]).all()
+                for remote in remotes:
+                    remote.close()
+        finally:
+            service.close()
+            client.close()
+    return results
+
+
+def bench_backtest(n_symbols=20, hours=8760, workers=(1,), grid=('fast=2:41:1', 'slow=50:290:10')):
+    """
+    A crossover parameter sweep (1,000 sets by default) over a year of
+    hourly candles for n_symbols, once per worker count. Every run must
+    produce the same table.
+    """
+    from solusd_backtest import Panel, grid_params, parse_grid, sweep
+
+    df = make_frame(hours * n_symbols, n_symbols, 3_600_000)
+    grid = parse_grid(list(grid))
+    results = {'sets': len(grid_params(grid)), 'cells': hours * n_symbols}
+    results['panel_seconds'] = round(_timed(lambda: Panel.from_frame(df)), 4)
+    reference = None
+    for n in workers:
+        out = {}
+        seconds = _timed(lambda: out.update(table=sweep(df, 'crossover', grid, workers=n)))
+        if reference is None:
+            reference = out['table']
+        pd.testing.assert_frame_equal(out['table'], reference)
+        results[f'workers_{n}'] = {'seconds': round(seconds, 3), 'ms_per_set': round(1000 * seconds / len(reference), 2)}
+    results['best'] = reference.iloc[0].to_dict()
+    return results
+
+
+def bench_history(rows=1_000_000, n_symbols=20, budget_mb=256):
+    """
+    Ten chained filter, sort, column and pivot steps recorded in a
+    ViewHistory as DataFrameGUI does, then every step revisited by undo
+    and redo. Revisited views must match a cold replay; their memory is
+    compared with keeping a copy of each step's table.
+    """
+    from solusd_filters import Include, Range
+    from solusd_history import Stage, ViewHistory, ViewState, materialize
+    from solusd_pivot import PivotSpec
+
+    df = make_frame(rows, n_symbols)
+    columns = list(df.columns)
+    moved = ['close'] + [c for c in columns if c != 'close']
+    picked = Include('symbol', list(df['symbol'].cat.categories[:n_symbols // 2]))
+    volume = Range('volume', 100, 900)
+    by_symbol = [('symbol', True), ('open_time', False)]
+    table = [
+        Stage(columns=columns),
+        Stage(predicates=[picked], columns=columns),
+        Stage(predicates=[picked], sort=[('close', False)], columns=columns),
+        Stage(predicates=[picked, volume], sort=[('close', False)], columns=columns),
+        Stage(predicates=[picked, volume], sort=by_symbol, columns=columns),
+        Stage(predicates=[picked, volume], sort=by_symbol, columns=moved),
+    ]
+    spec = PivotSpec(['symbol'], ['volume', 'quote_asset_volume'], 'sum', '1h')
+    states = [ViewState([stage]) for stage in table] + [
+        ViewState([table[-1], Stage(spec)]),
+        ViewState([table[-1], Stage(spec, [Range('volume', 20_000, None)])]),
+        ViewState([table[-1], Stage(spec, [Range('volume', 20_000, None)], [('volume', False)])]),
+        ViewState([Stage(columns=columns)]),  # Back to the original table
+    ]
+
+    history = ViewHistory(budget_mb * 1024 * 1024)
+    record_ms = []
+    for state in states:
+        t0 = time.perf_counter()
+        history.record(state, materialize(state, df, history=history))
+        record_ms.append((time.perf_counter() - t0) * 1000)
+
+    jump_ms, replay_ms, hits = [], [], 0
+    order = [history.undo() for _ in range(len(states) - 1)] + [history.redo() for _ in range(len(states) - 1)]
+    for state in order:
+        t0 = time.perf_counter()
+        snapshot = history.recall(state)
+        hits += snapshot is not None
+        if snapshot is None:
+            snapshot = materialize(state, df, history=history)
+        history.record(state, snapshot)
+        jump_ms.append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        cold = materialize(state, df)
+        replay_ms.append((time.perf_counter() - t0) * 1000)
+        if snapshot.df is not cold.df:  # Pivot stages; the others are df itself
+            pd.testing.assert_frame_equal(snapshot.df, cold.df)
+        assert (snapshot.rows is None) == (cold.rows is None)
+        assert snapshot.rows is None or np.array_equal(snapshot.rows, cold.rows)
+
+    # What a copy per step would hold: the rows shown, in every column
+    copies = 0
+    for state in states:
+        bytes_per_row = df.memory_usage(index=True).sum() / len(df)
+        snapshot = history.recall(state) or materialize(state, df)
+        shown = len(snapshot.df) if snapshot.rows is None else len(snapshot.rows)
+        if state.top.pivot is not None:
+            bytes_per_row = snapshot.df.memory_usage(index=True).sum() / max(1, len(snapshot.df))
+        copies += shown * bytes_per_row
+    return {
+        'rows': rows, 'steps': len(states), 'cache_hits': f'{hits}/{len(order)}',
+        'record_ms': [round(t, 1) for t in record_ms],
+        'jump_ms': {'mean': round(float(np.mean(jump_ms)), 3), 'max': round(float(np.max(jump_ms)), 3)},
+        'replay_ms': {'mean': round(float(np.mean(replay_ms)), 1), 'max': round(float(np.max(replay_ms)), 1)},
+        'history_mb': round(history.nbytes / 2**20, 1),
+        'copies_mb': round(float(copies) / 2**20, 1),
+        'session_bytes': len(json.dumps([state.to_json() for state in states], default=str)),
+    }
+
+
+def bench_backfill(days=30, interval='1m', latency=0.05, workers=(1, 4, 8)):
+    start = 1_600_000_000_000
+    end = start + days * 86_400_000 - 1
+    expected = days * 86_400_000 // INTERVAL_MS[interval]
+    results = {}
+    with MockBinanceServer(latency=latency, history_end=end) as server:
+        for w in workers:
+            t0 = time.perf_counter()
+            rows = 0
+            last = None
+            for page in iter_binance_klines('SYMUSDT', interval, start, end, max_workers=w,
+                                            budget=WeightBudget(limit=100_000), base_url=server.base_url):
+                assert last is None or page['open_time'].iloc[0] > last
+                last = page['open_time'].iloc[-1]
+                rows += len(page)
+            assert rows == expected, (rows, expected)
+            results[f'workers={w}'] = round(time.perf_counter() - t0, 4)
+    return results
+
+
+def bench_stream(n_symbols=40, rate=4000, seconds=5.0, refresh_hz=4, rows_per_symbol=1000):
+    """
+    Stream from the local stand-in into a LiveFrame at refresh_hz, like
+    DataFrameGUI does, and report throughput and delta application cost.
+    """
+    symbols = [f'SYM{i}USDT' for i in range(n_symbols)]
+    base = pd.concat([
+        pd.DataFrame({'symbol': s, 'open_time': pd.to_datetime(
+            1_600_000_000_000 - (rows_per_symbol - np.arange(rows_per_symbol)) * 60_000, unit='ms')})
+        for s in symbols
+    ], ignore_index=True)
+    from solusd_stream import FRAME_COLUMNS
+    for col in FRAME_COLUMNS:
+        if col not in base.columns:
+            base[col] = 0.0
+    base['symbol'] = base['symbol'].astype('category')
+    base['date'] = base['open_time'].dt.strftime('%Y-%m-%d').astype('category')
+    base = base[FRAME_COLUMNS]
+    live = LiveFrame(base)
+    apply_times = []
+    with MockStreamServer(rate=rate) as server:
+        stream = BinanceStream(symbols, url=server.url).start()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            time.sleep(1 / refresh_hz)
+            delta, quotes = stream.drain()
+            t0 = time.perf_counter()
+            live.apply(delta, quotes)
+            apply_times.append(time.perf_counter() - t0)
+        stream.stop()
+    return {
+        'messages': stream.messages,
+        'messages_per_second': round(stream.messages / seconds, 1),
+        'drains': len(apply_times),
+        'apply_ms_mean': round(1000 * float(np.mean(apply_times)), 3),
+        'apply_ms_max': round(1000 * float(np.max(apply_times)), 3),
+        'rows': len(live.df),
+        'error': repr(stream.error) if stream.error else None,
+    }
+
+
+def _legacy_klines_to_df(data):
+    # The original parse path: object frame plus per-column conversions.
+    df = pd.DataFrame(data, columns=KLINE_COLUMNS)
+    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+    df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
+    df['date'] = df['open_time'].dt.strftime('%Y-%m-%d')
+    for col in ('open', 'close', 'high', 'low', 'volume'):
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df['volatility'] = df['high'] - df['low']
+    return df
+
+
+def bench_parse(rows=200_000, repeat=3):
+    payload = json.dumps(make_klines(rows)).encode()
+    results = {}
+    for name, parse in (('legacy', lambda: _legacy_klines_to_df(json.loads(payload))),
+                        ('vectorized', lambda: _klines_to_df(payload))):
+        best = min(_timed(parse) for _ in range(repeat))
+        df = parse()
+        results[name] = {
+            'seconds': round(best, 4),
+            'bytes_per_row': round(df.memory_usage(deep=True).sum() / rows, 1),
+        }
+    results['speedup'] = round(results['legacy']['seconds'] / results['vectorized']['seconds'], 2)
+    return results
+
+
+def bench_export(rows=200_000, formats=('csv', 'parquet', 'feather')):
+    """Streaming export of a shuffled view vs materializing it and writing in one call."""
+    df = _klines_to_df(json.dumps(make_klines(rows)).encode())
+    view = ViewModel(df, np.random.default_rng(0).permutation(rows))
+    one_shot = {
+        'csv': lambda path: view.frame().to_csv(path, index=False),
+        'excel': lambda path: view.frame().to_excel(path, index=False),
+        'parquet': lambda path: view.frame().to_parquet(path, index=False),
+        'feather': lambda path: view.frame().reset_index(drop=True).to_feather(path),
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in formats:
+            path = os.path.join(tmp, 'out' + EXPORT_FORMATS[fmt][1])
+            results[fmt] = {
+                'streaming': _traced(lambda: export_view(view, path, fmt)),
+                'one_shot': _traced(lambda: one_shot[fmt](path)),
+            }
+    return results
+
+
+def bench_store(rows=5_000_000, chunk_rows=1_000_000, n_symbols=20):
+    """
+    Build a ColumnStore chunk by chunk, then time opening it and the table
+    paths over the memory-mapped frame. peak_mb is heap allocation only;
+    mapped pages belong to the OS page cache.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'store')
+        store = ColumnStore.create(path, '1m')
+        start = time.perf_counter()
+        for i, lo in enumerate(range(0, rows, chunk_rows)):
+            store.append(make_frame(min(chunk_rows, rows - lo), n_symbols, seed=i))
+        results['build_seconds'] = round(time.perf_counter() - start, 3)
+        results['store_mb'] = round(sum(os.path.getsize(store._file(c)) for c in store.columns) / 1e6, 1)
+        results['open'] = _traced(lambda: ColumnStore(path).frame())
+        df = ColumnStore(path).frame()
+        lo, hi = np.quantile(df['close'].to_numpy()[::101], [0.25, 0.75])
+        arrays = [display_array(df[c]) for c in df.columns]
+        starts = np.random.default_rng(0).integers(0, max(1, rows - 50), 100)
+        paths = {
+            'table_window_x100': lambda: [format_rows(arrays, None, s, s + 50) for s in starts],
+            'filter_include': lambda: FilterEngine(df).evaluate(Include('symbol', ['S001USDT'])),
+            'filter_range': lambda: FilterEngine(df).evaluate(Range('close', lo, hi)),
+            'sort_cold': lambda: SortCache(FilterEngine(df)).order([('close', True)]),
+        }
+        for name, fn in paths.items():
+            results[name] = _traced(fn)
+        del df, arrays
+    return results
+
+
+def bench_suite(sizes=SUITE_SIZES, trace=True, n_symbols=20):
+    """
+    Time the pull and viewer hot paths, headless, on synthetic data of each
+    size: parsing, the table's visible-window formatting, filters, sorts,
+    filter pick lists, pivots and indicators. With trace, each path also runs once under
+    tracemalloc for its peak allocation.
+    """
+    check_edge_cases()
+    page = json.dumps(make_klines(MAX_KLINE_LIMIT)).encode()
+    results = {}
+    for size in sizes:
+        df = make_frame(size, n_symbols)
+        rng = np.random.default_rng(size)
+        shuffled = rng.permutation(size)
+        lo, hi = np.quantile(df['close'].to_numpy(), [0.25, 0.75])
+        pages = max(1, min(size, PARSE_CAP) // MAX_KLINE_LIMIT)
+        arrays = [display_array(df[c]) for c in df.columns]
+        starts = rng.integers(0, max(1, size - 50), 100)
+
+        def warm_sorter():
+            sorter = SortCache(FilterEngine(df))
+            sorter.order([('close', True)])
+            return sorter
+
+        sorter = warm_sorter()
+        view = ViewModel(df)
+        hourly = PivotSpec(['symbol'], ['open', 'high', 'low', 'close', 'volume'], 'ohlc', '1h')
+        daily = PivotSpec(['symbol'], ['open', 'high', 'low', 'close', 'volume'], 'ohlc', '1d')
+        paths = {
+            'parse_pages': lambda: [_klines_to_df(page) for _ in range(pages)],
+            'table_window_x100': lambda: [format_rows(arrays, shuffled, s, s + 50) for s in starts],
+            'filter_include': lambda: FilterEngine(df).evaluate(Include('symbol', ['S001USDT', 'S002USDT'])),
+            'filter_range': lambda: FilterEngine(df).evaluate(Range('close', lo, hi)),
+            'filter_like': lambda: FilterEngine(df).evaluate(Like('symbol', '00[1-3]')),
+            'sort_cold': lambda: SortCache(FilterEngine(df)).order([('close', True)]),
+            'sort_cached': lambda: sorter.order([('close', False)]),
+            'sort_two_columns': lambda: sorter.order([('symbol', True), ('close', False)]),
+            'pick_list_symbol': lambda: FilterEngine(df).index('symbol').pick(shuffled[:size // 2], 's01'),
+            'pick_list_open_time': lambda: FilterEngine(df).index('open_time').histogram(shuffled[:size // 2]),
+            'pivot_sum': lambda: PivotEngine().pivot(view, PivotSpec(['symbol'], ['volume'], 'sum')),
+            'pivot_ohlc_1h': lambda: PivotEngine().pivot(view, hourly),
+            'pivot_1d_rollup': lambda: _engine_with(hourly_cache).pivot(view, daily),
+            'indicators': lambda: IndicatorEngine().columns(df, [EMA(20), RSI(14)]),
+        }
+        warm = PivotEngine()
+        warm.pivot(view, hourly)
+        hourly_cache = dict(warm._cache)  # 1d is then rolled up from the cached 1h result
+        size_results = {'frame_mb': round(df.memory_usage(deep=True).sum() / 1e6, 1),
+                        'parse_rows': pages * MAX_KLINE_LIMIT}
+        for name, fn in paths.items():
+            entry = {'seconds': round(_timed(fn), 4)}
+            if trace:
+                entry['peak_mb'] = _traced(fn)['peak_mb']
+            size_results[name] = entry
+        results[str(size)] = size_results
+    return {
+        'meta': {
+            'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def check_edge_cases():
+    """Assert the filter and sort results the suite's timings rely on, on small hand-checked columns."""
+    # Picked histogram bins select exactly the rows the histogram counted,
+    # also on integer columns whose bin edges are fractional
+    df = pd.DataFrame({'num_trades': np.arange(121, dtype=np.int32)})
+    engine = FilterEngine(df)
+    edges, counts = engine.index('num_trades').histogram(bins=50)
+    for i in range(len(counts)):
+        rows = engine.evaluate(Bins('num_trades', [[edges[i], edges[i + 1] if i + 1 < len(counts) else None]]))
+        assert len(rows) == counts[i], (edges[i], list(df['num_trades'].iloc[rows]), counts[i])
+    assert list(engine.evaluate(Bins('num_trades', [[2.4, 4.8]]))) == [3, 4]
+    assert list(engine.evaluate(Range('num_trades', 2.5, 4.5))) == [3, 4]
+
+    # Sorts match a stable pandas sort: ties keep their row order and
+    # missing values come last, descending as well as ascending
+    df = pd.DataFrame({
+        'close': [1.0, np.nan, 3.0, 2.0, 3.0, np.nan, 1.0],
+        'open_time': pd.to_datetime([3, None, 1, 2, 1, 5, None], unit='s'),
+        'symbol': pd.Categorical(['B', 'A', None, 'B', 'A', 'C', 'A']),
+        'label': ['x', None, 'y', 'x', 'z', 'y', 'x'],
+    })
+    full, direct = SortCache(FilterEngine(df)), SortCache(FilterEngine(df))
+    direct.SUBSET_FRACTION = 1  # Small views are sorted directly rather than out of the cached order
+    subset = np.array([0, 1, 4, 6])
+    for specs in ([('close', False)], [('close', True)], [('open_time', False)], [('symbol', False)],
+                  [('label', False)], [('symbol', False), ('close', False)], [('label', True), ('open_time', False)]):
+        cols, ascending = [c for c, _ in specs], [a for _, a in specs]
+        for sorter, rows in ((full, None), (full, subset), (direct, subset)):
+            frame = df if rows is None else df.iloc[rows]
+            want = frame.sort_values(cols, ascending=ascending, kind='mergesort', na_position='last').index
+            got = sorter.order(specs, rows)
+            assert list(got) == list(want), (specs, rows, list(got), list(want))
+    assert list(SortCache(FilterEngine(pd.DataFrame({'a': [1, np.nan, 3, 2]}))).order([('a', False)])) == [2, 3, 0, 1]
+
+
+def _engine_with(cache):
+    engine = PivotEngine()
+    engine._cache.update(cache)
+    return engine
+
+
+def compare(baseline, current):
+    """Per (size, path) ratio current / baseline seconds; below 1 is faster."""
+    out = {}
+    for size, paths in current['results'].items():
+        base = baseline['results'].get(size, {})
+        for name, entry in paths.items():
+            if isinstance(entry, dict) and isinstance(base.get(name), dict) and base[name]['seconds']:
+                out.setdefault(size, {})[name] = round(entry['seconds'] / base[name]['seconds'], 3)
+    return out
+
+
+def _traced(fn):
+    tracemalloc.start()
+    try:
+        seconds = _timed(fn)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': round(seconds, 3), 'peak_mb': round(peak / 1e6, 1)}
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='bench', required=True)
+    fetch = sub.add_parser('fetch', help='get_binance_data against a local mock server')
+    fetch.add_argument('--symbols', type=int, default=60)
+    fetch.add_argument('--latency', type=float, default=0.05)
+    fetch.add_argument('--rows', type=int, default=365)
+    fetch.add_argument('--workers', type=int, nargs='+', default=[1, 8, 16])
+    faults = sub.add_parser('faults', help='retries and request coalescing against a fault-injecting mock server')
+    faults.add_argument('--symbols', type=int, default=40)
+    faults.add_argument('--rate', type=float, default=0.2, help='share of requests that fail')
+    faults.add_argument('--loads', type=int, default=4, help='identical loads run at once')
+    trades = sub.add_parser('trades', help='aggTrades ingestion and bar building against a local mock server')
+    trades.add_argument('--trades', type=int, default=2_000_000)
+    trades.add_argument('--kind', default='dollar', choices=['time', 'tick', 'volume', 'dollar'])
+    trades.add_argument('--size', default='1000000', help='e.g. 5m for time bars, 500 for tick bars')
+    trades.add_argument('--latency', type=float, default=0.0)
+    trades.add_argument('--workers', type=int, default=8)
+    backfill = sub.add_parser('backfill', help='iter_binance_klines paging against a local mock server')
+    backfill.add_argument('--days', type=int, default=30)
+    backfill.add_argument('--interval', default='1m')
+    backfill.add_argument('--latency', type=float, default=0.05)
+    backfill.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parse = sub.add_parser('parse', help='legacy vs vectorized /klines parsing on a synthetic payload')
+    parse.add_argument('--rows', type=int, default=200_000)
+    stream = sub.add_parser('stream', help='WebSocket ingestion against a local stand-in server')
+    stream.add_argument('--symbols', type=int, default=40)
+    stream.add_argument('--rate', type=int, default=4000)
+    stream.add_argument('--seconds', type=float, default=5.0)
+    export = sub.add_parser('export', help='streaming vs one-shot export of a shuffled view')
+    export.add_argument('--rows', type=int, default=200_000)
+    export.add_argument('--formats', nargs='+', default=['csv', 'parquet', 'feather'])
+    suite = sub.add_parser('suite', help='headless timings and tracemalloc peaks of the viewer hot paths')
+    suite.add_argument('--sizes', type=int, nargs='+', default=SUITE_SIZES)
+    suite.add_argument('--symbols', type=int, default=20)
+    suite.add_argument('--no-trace', action='store_true', help='skip the tracemalloc runs')
+    suite.add_argument('--output', help='also write the JSON results to this file')
+    store = sub.add_parser('store', help='build a memory-mapped store and time the table paths over it')
+    store.add_argument('--rows', type=int, default=5_000_000)
+    store.add_argument('--chunk-rows', type=int, default=1_000_000)
+    store.add_argument('--symbols', type=int, default=20)
+    server = sub.add_parser('server', help='filter, sort, page and pivot through a local data server')
+    server.add_argument('--symbols', type=int, default=20)
+    server.add_argument('--rows', type=int, default=50_000)
+    server.add_argument('--clients', type=int, default=4)
+    server.add_argument('--workers', type=int, default=2)
+    bt = sub.add_parser('backtest', help='parameter sweep of a crossover rule over a year of hourly candles')
+    bt.add_argument('--symbols', type=int, default=20)
+    bt.add_argument('--hours', type=int, default=8760)
+    bt.add_argument('--workers', type=int, nargs='+', default=[1])
+    bt.add_argument('--grid', nargs='+', default=['fast=2:41:1', 'slow=50:290:10'])
+    hist = sub.add_parser('history', help='undo/redo across ten chained filter, sort and pivot steps')
+    hist.add_argument('--rows', type=int, default=1_000_000)
+    hist.add_argument('--symbols', type=int, default=20)
+    hist.add_argument('--budget-mb', type=int, default=256)
+    sub.add_parser('check', help='assert filter and sort results on small hand-checked columns')
+    comp = sub.add_parser('compare', help='ratio of two suite result files (current / baseline)')
+    comp.add_argument('baseline')
+    comp.add_argument('current')
+    args = parser.parse_args()
+
+    if args.bench == 'fetch':
+        results = bench_fetch(args.symbols, args.latency, args.workers, args.rows)
+    elif args.bench == 'faults':
+        results = bench_faults(args.symbols, args.rate, loads=args.loads)
+    elif args.bench == 'trades':
+        results = bench_trades(args.trades, args.kind, args.size, args.latency, args.workers)
+    elif args.bench == 'backfill':
+        results = bench_backfill(args.days, args.interval, args.latency, args.workers)
+    elif args.bench == 'parse':
+        results = bench_parse(args.rows)
+    elif args.bench == 'stream':
+        results = bench_stream(args.symbols, args.rate, args.seconds)
+    elif args.bench == 'export':
+        results = bench_export(args.rows, args.formats)
+    elif args.bench == 'suite':
+        results = bench_suite(args.sizes, not args.no_trace, args.symbols)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+    elif args.bench == 'store':
+        results = bench_store(args.rows, args.chunk_rows, args.symbols)
+    elif args.bench == 'server':
+        results = bench_server(args.symbols, args.rows, args.clients, args.workers)
+    elif args.bench == 'backtest':
+        results = bench_backtest(args.symbols, args.hours, args.workers, args.grid)
+    elif args.bench == 'history':
+        results = bench_history(args.rows, args.symbols, args.budget_mb)
+    elif args.bench == 'check':
+        check_edge_cases()
+        results = {'check': 'ok'}
+    elif args.bench == 'compare':
+        with open(args.baseline) as f, open(args.current) as g:
+            results = compare(json.load(f), json.load(g))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import os
+import time
+
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'solusd')
+
+# Columns that describe the order book right now rather than the candle;
+# never cached, re-attached by the caller on load.
+TRANSIENT_COLUMNS = ['bid', 'ask']
+
+
+def _write_order(name):
+    # part-<first ms>-<time_ns>.parquet; parts without a write time sort first
+    fields = name[:-len('.parquet')].split('-')
+    return (int(fields[2]) if len(fields) > 2 and fields[2].isdigit() else 0, name)
+
+
+class KlineCache:
+    """
+    On-disk Parquet cache of kline frames, partitioned by symbol and interval:
+
+        <root>/symbol=SOLUSDT/interval=1d/part-<first open_time ms>-<write time ns>.parquet
+
+    Each refresh appends one small part file; once a partition has more than
+    max_parts files they are compacted into one. Parts are read in write
+    order, so where they overlap the most recent fetch wins. Rows older
+    than retention (a pandas Timedelta string such as '365D', or None to
+    keep everything) are dropped during compaction.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_parts=8, retention=None):
+        self.root = root
+        self.max_parts = max_parts
+        self.retention = pd.Timedelta(retention) if retention else None
+
+    def _partition(self, symbol, interval):
+        return os.path.join(self.root, f'symbol={symbol}', f'interval={interval}')
+
+    def _parts(self, symbol, interval):
+        """Part files of a partition, oldest write first."""
+        path = self._partition(symbol, interval)
+        if not os.path.isdir(path):
+            return []
+        names = [name for name in os.listdir(path) if name.endswith('.parquet')]
+        return [os.path.join(path, name) for name in sorted(names, key=_write_order)]
+
+    def symbols(self, interval=None):
+        """Symbols with a partition in the cache (for interval, if given)."""
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for sym_dir in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, sym_dir)
+            if not sym_dir.startswith('symbol=') or not os.path.isdir(path):
+                continue
+            if interval is None or os.path.isdir(os.path.join(path, f'interval={interval}')):
+                found.append(sym_dir.split('=', 1)[1])
+        return found
+
+    def load(self, symbol, interval):
+        """
+        Return the cached frame for (symbol, interval), sorted and unique on
+        open_time, or None if nothing is cached.
+        """
+        parts = self._parts(symbol, interval)
+        if not parts:
+            return None
+        frames = [pd.read_parquet(p) for p in parts]
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        if len(frames) > 1:
+            # Later writes refetched the previously open candle (or a whole
+            # range, or repeat a part an interrupted compaction left); keep the newest.
+            df = df.drop_duplicates('open_time', keep='last').sort_values('open_time', ignore_index=True)
+        return df
+
+    def last_open_time(self, symbol, interval):
+        df = self.load(symbol, interval)
+        if df is None or df.empty:
+            return None
+        return df['open_time'].iloc[-1]
+
+    def append(self, symbol, interval, df):
+        """
+        Write df as a new part of the (symbol, interval) partition and
+        compact the partition if it has grown past max_parts files.
+        """
+        if df is None or df.empty:
+            return
+        df = df.drop(columns=[c for c in TRANSIENT_COLUMNS if c in df.columns])
+        path = self._partition(symbol, interval)
+        os.makedirs(path, exist_ok=True)
+        first_ms = int(df['open_time'].iloc[0].value // 1_000_000)
+        name = f'part-{first_ms:015d}-{time.time_ns()}.parquet'
+        target = os.path.join(path, name)
+        # Written aside and renamed so concurrent readers never see half a file
+        df.to_parquet(target + '.tmp', index=False)
+        os.replace(target + '.tmp', target)
+        if len(self._parts(symbol, interval)) > self.max_parts:
+            self.compact(symbol, interval)
+
+    def compact(self, symbol, interval):
+        """
+        Merge all parts of a partition into one file, applying retention.
+        """
+        parts = self._parts(symbol, interval)
+        if not parts:
+            return
+        df = self.load(symbol, interval)
+        if self.retention is not None:
+            df = df[df['open_time'] >= pd.Timestamp.now() - self.retention]
+        first_ms = int(df['open_time'].iloc[0].value // 1_000_000) if not df.empty else 0
+        target = os.path.join(self._partition(symbol, interval), f'part-{first_ms:015d}-{time.time_ns()}.parquet')
+        tmp = target + '.tmp'
+        df.to_parquet(tmp, index=False)
+        # The merged part is the newest write, so a crash before the old
+        # parts are gone only leaves rows that load() deduplicates.
+        os.replace(tmp, target)
+        for p in parts:
+            os.remove(p)
+
+    def _listed_path(self, symbol, interval):
+        return os.path.join(self._partition(symbol, interval), 'listed')
+
+    def listed(self, symbol, interval):
+        """
+        open_time of the symbol's first candle at this interval if a fetch
+        found nothing older (see set_listed), else None.
+        """
+        try:
+            with open(self._listed_path(symbol, interval)) as f:
+                return pd.Timestamp(int(f.read()), unit='ms')
+        except (OSError, ValueError):
+            return None
+
+    def set_listed(self, symbol, interval, open_time):
+        """Record that the exchange has no candles before open_time."""
+        os.makedirs(self._partition(symbol, interval), exist_ok=True)
+        with open(self._listed_path(symbol, interval), 'w') as f:
+            f.write(str(int(pd.Timestamp(open_time).value // 1_000_000)))
+
+    def evict(self, max_idle_days=30):
+        """
+        Delete whole partitions that have not been written for max_idle_days.
+        Returns the list of (symbol, interval) partitions removed.
+        """
+        removed = []
+        if not os.path.isdir(self.root):
+            return removed
+        cutoff = time.time() - max_idle_days * 86_400
+        for sym_dir in os.listdir(self.root):
+            sym_path = os.path.join(self.root, sym_dir)
+            if not os.path.isdir(sym_path):
+                continue
+            for int_dir in os.listdir(sym_path):
+                path = os.path.join(sym_path, int_dir)
+                files = [os.path.join(path, f) for f in os.listdir(path)]
+                if files and max(os.path.getmtime(f) for f in files) >= cutoff:
+                    continue
+                for f in files:
+                    os.remove(f)
+                os.rmdir(path)
+                removed.append((sym_dir.split('=', 1)[-1], int_dir.split('=', 1)[-1]))
+            if not os.listdir(sym_path):
+                os.rmdir(sym_path)
+        return removed
@@ -0,0 +1,356 @@
+"""
+Chart engine for the viewer: pixel-aware decimation, candlestick/OHLC
+rendering and a reusable chart window.
+
+Nothing here draws more primitives than the axes have pixels. Line and
+bar series are reduced with min/max-per-pixel decimation (first, min,
+max and last point of every pixel column, so the rendered line is
+indistinguishable from the full one). Candles are re-bucketed into at
+most one OHLC bar per few pixels. Zooming or panning re-runs both on
+the visible range only.
+"""
+import tkinter as tk
+
+import numpy as np
+import pandas as pd
+import customtkinter
+from matplotlib import dates as mdates
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+
+UP_COLOR = "#26a69a"
+DOWN_COLOR = "#ef5350"
+
+
+def to_plot_x(values):
+    """Numeric x for matplotlib: datetimes become date numbers, others float."""
+    values = np.asarray(values)
+    if values.dtype.kind == "M":
+        return mdates.date2num(values.astype("datetime64[us]"))
+    return values.astype(np.float64)
+
+
+def _bucket_bounds(x, n_buckets, x0=None, x1=None):
+    # Start index of each non-empty pixel column over sorted x.
+    x0 = x[0] if x0 is None else x0
+    x1 = x[-1] if x1 is None else x1
+    if x1 <= x0:
+        return np.array([0])
+    edges = np.linspace(x0, x1, n_buckets + 1)[1:-1]
+    starts = np.concatenate(([0], np.searchsorted(x, edges, 'left')))
+    return np.unique(starts[starts < len(x)])
+
+
+def minmax_decimate(x, y, n_buckets):
+    """
+    Indices of the points to draw so a line over sorted x looks the same
+    at n_buckets pixels wide: first, min, max and last point of every
+    pixel column. Returns at most 4 * n_buckets indices, in order.
+    """
+    n = len(x)
+    if n <= 4 * n_buckets:
+        return np.arange(n)
+    starts = _bucket_bounds(x, n_buckets)
+    ends = np.append(starts[1:], n) - 1
+    # NaNs would poison reduceat; they are simply never picked.
+    y_lo = np.where(np.isnan(y), np.inf, y)
+    y_hi = np.where(np.isnan(y), -np.inf, y)
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+    mins = np.minimum.reduceat(y_lo, starts)
+    maxs = np.maximum.reduceat(y_hi, starts)
+    # First position in each bucket where y hits that bucket's min / max.
+    hit_min = np.flatnonzero(y_lo == mins[bucket])
+    hit_max = np.flatnonzero(y_hi == maxs[bucket])
+    argmin = hit_min[np.unique(bucket[hit_min], return_index=True)[1]]
+    argmax = hit_max[np.unique(bucket[hit_max], return_index=True)[1]]
+    return np.unique(np.concatenate((starts, ends, argmin, argmax)))
+
+
+def ohlc_resample(t, o, h, l, c, n_buckets):
+    """
+    Merge consecutive candles (sorted by t) into at most n_buckets candles:
+    first open, max high, min low, last close. Returns (t, o, h, l, c).
+    """
+    n = len(t)
+    if n <= n_buckets:
+        return t, o, h, l, c
+    starts = _bucket_bounds(t, n_buckets)
+    ends = np.append(starts[1:], n) - 1
+    return (t[starts], o[starts], np.fmax.reduceat(h, starts), np.fmin.reduceat(l, starts), c[ends])
+
+
+def candle_geometry(t, o, h, l, c, width, style="candlestick"):
+    """
+    Segments and polygons for a candlestick or OHLC chart, built with array
+    operations so they can be pushed into existing collections.
+    Returns (wick_segments, body_vertices, colors).
+    """
+    up = c >= o
+    colors = np.where(up, UP_COLOR, DOWN_COLOR)
+    half = width / 2
+    if style == "ohlc":
+        # Vertical high-low bar, open tick to the left, close tick to the right
+        segs = np.empty((3 * len(t), 2, 2))
+        segs[0::3, :, 0] = t[:, None]
+        segs[0::3, 0, 1], segs[0::3, 1, 1] = l, h
+        segs[1::3, 0] = np.column_stack((t - half, o))
+        segs[1::3, 1] = np.column_stack((t, o))
+        segs[2::3, 0] = np.column_stack((t, c))
+        segs[2::3, 1] = np.column_stack((t + half, c))
+        return segs, np.empty((0, 4, 2)), np.repeat(colors, 3)
+    segs = np.empty((len(t), 2, 2))
+    segs[:, :, 0] = t[:, None]
+    segs[:, 0, 1], segs[:, 1, 1] = l, h
+    lo, hi = np.minimum(o, c), np.maximum(o, c)
+    verts = np.empty((len(t), 4, 2))
+    verts[:, 0] = np.column_stack((t - half, lo))
+    verts[:, 1] = np.column_stack((t - half, hi))
+    verts[:, 2] = np.column_stack((t + half, hi))
+    verts[:, 3] = np.column_stack((t + half, lo))
+    return segs, verts, colors
+
+
+def bar_vertices(x, y, width):
+    verts = np.zeros((len(x), 4, 2))
+    half = width / 2
+    verts[:, 0, 0] = verts[:, 1, 0] = x - half
+    verts[:, 2, 0] = verts[:, 3, 0] = x + half
+    verts[:, 1, 1] = verts[:, 2, 1] = y
+    return verts
+
+
+class ChartWindow:
+    """
+    One chart window whose figure and artists are reused across plots.
+    show_lines() and show_candles() replace the data of the existing
+    artists (set_data / set_segments / set_verts) when the layout matches
+    and only rebuild them when it does not. Zoom and pan re-decimate the
+    visible x range.
+    """
+
+    def __init__(self, master):
+        self.win = customtkinter.CTkToplevel(master)
+        self.win.title("Chart")
+        self.fig = Figure(figsize=(10, 5))
+        self.ax = self.fig.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.win)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, self.win, pack_toolbar=False)
+        self.toolbar.update()
+        self.toolbar.pack(side="bottom", fill="x")
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        customtkinter.CTkButton(self.win, text="Close", command=self.win.destroy).pack(pady=5)
+        self.kind = None
+        self.series = []  # (label, x, y) with x sorted, full resolution
+        self.candles = None  # (t, o, h, l, c) full resolution
+        self.artists = []
+        self._pending = False
+        self._updating = False
+        self.ax.callbacks.connect('xlim_changed', self._on_xlim)
+
+    def exists(self):
+        try:
+            return bool(self.win.winfo_exists())
+        except Exception:
+            return False
+
+    def lift(self):
+        self.win.deiconify()
+        self.win.lift()
+
+    def _pixels(self):
+        return max(50, int(self.ax.bbox.width))
+
+    def _reset(self, kind):
+        self.ax.cla()
+        self.ax.callbacks.connect('xlim_changed', self._on_xlim)
+        self.artists = []
+        self.kind = kind
+
+    def show_lines(self, series, kind="line", xlabel="", ylabel="", title="", x_is_date=False):
+        """series: list of (label, x, y) arrays. kind: 'line' or 'bar'."""
+        prepared = []
+        for label, x, y in series:
+            x = to_plot_x(x)
+            y = np.asarray(y, dtype=np.float64)
+            if len(x) > 1 and np.any(np.diff(x) < 0):
+                order = np.argsort(x, kind='stable')
+                x, y = x[order], y[order]
+            prepared.append((label, x, y))
+        layout = (kind, tuple(label for label, _, _ in prepared), x_is_date)
+        if layout != self.kind:
+            self._reset(layout)
+            for label, _, _ in prepared:
+                if kind == "bar":
+                    artist = PolyCollection([], label=label, alpha=0.8,
+                                            facecolor=self.ax._get_lines.get_next_color())
+                    self.ax.add_collection(artist)
+                else:
+                    (artist,) = self.ax.plot([], [], label=label, linewidth=1)
+                self.artists.append(artist)
+            if x_is_date:
+                self.ax.xaxis_date()
+            self.ax.grid(True)
+            if prepared:
+                self.ax.legend(loc='best')
+        self.series = prepared
+        self.candles = None
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+        self.ax.set_title(title)
+        xs = [x for _, x, _ in prepared if len(x)]
+        if xs:
+            self._set_view(min(x[0] for x in xs), max(x[-1] for x in xs))
+        else:
+            self.canvas.draw_idle()
+
+    def show_candles(self, t, o, h, l, c, style="candlestick", title=""):
+        layout = (style,)
+        if layout != self.kind:
+            self._reset(layout)
+            wicks = LineCollection([], linewidths=1)
+            bodies = PolyCollection([], linewidths=0)
+            self.ax.add_collection(wicks)
+            self.ax.add_collection(bodies)
+            self.artists = [wicks, bodies]
+            self.ax.xaxis_date()
+            self.ax.grid(True)
+        t = to_plot_x(t)
+        order = np.argsort(t, kind='stable')
+        self.candles = tuple(np.asarray(a, dtype=np.float64)[order] for a in (t, o, h, l, c))
+        self.series = []
+        self.ax.set_title(title)
+        self._set_view(self.candles[0][0], self.candles[0][-1])
+
+    def _set_view(self, x0, x1):
+        if x1 <= x0:
+            x0, x1 = x0 - 0.5, x1 + 0.5
+        self._updating = True
+        try:
+            self.ax.set_xlim(x0, x1)
+        finally:
+            self._updating = False
+        self.redraw()
+
+    def _on_xlim(self, ax):
+        if self._updating or self._pending:
+            return
+        # Coalesce the burst of limit changes a drag produces into one redraw.
+        self._pending = True
+        self.win.after_idle(self.redraw)
+
+    def redraw(self):
+        """Decimate the visible range to the current pixel width and draw."""
+        self._pending = False
+        x0, x1 = self.ax.get_xlim()
+        pixels = self._pixels()
+        ys = []
+        if self.candles is not None:
+            t, o, h, l, c = self.candles
+            i0, i1 = np.searchsorted(t, x0, 'left'), np.searchsorted(t, x1, 'right')
+            i0, i1 = max(0, i0 - 1), min(len(t), i1 + 1)
+            # Keep candles at least ~3 pixels wide so bodies stay visible.
+            t, o, h, l, c = ohlc_resample(t[i0:i1], o[i0:i1], h[i0:i1], l[i0:i1], c[i0:i1], max(1, pixels // 3))
+            step = np.median(np.diff(t)) if len(t) > 1 else 1.0
+            segs, verts, colors = candle_geometry(t, o, h, l, c, step * 0.7, self.kind[0])
+            wicks, bodies = self.artists
+            wicks.set_segments(segs)
+            wicks.set_color(colors)
+            bodies.set_verts(verts)
+            bodies.set_facecolor(colors[:len(verts)])
+            ys = [l, h]
+        else:
+            for (label, x, y), artist in zip(self.series, self.artists):
+                i0, i1 = np.searchsorted(x, x0, 'left'), np.searchsorted(x, x1, 'right')
+                i0, i1 = max(0, i0 - 1), min(len(x), i1 + 1)
+                xv, yv = x[i0:i1], y[i0:i1]
+                keep = minmax_decimate(xv, yv, pixels)
+                xv, yv = xv[keep], yv[keep]
+                if isinstance(artist, PolyCollection):
+                    width = (x1 - x0) / max(1, min(len(xv), pixels)) * 0.8
+                    artist.set_verts(bar_vertices(xv, yv, width))
+                    ys.append(np.array([0.0]))
+                else:
+                    artist.set_data(xv, yv)
+                ys.append(yv)
+        finite = [a[np.isfinite(a)] for a in ys]
+        finite = [a for a in finite if len(a)]
+        if finite:
+            lo = min(a.min() for a in finite)
+            hi = max(a.max() for a in finite)
+            pad = (hi - lo) * 0.05 or abs(hi) * 0.05 or 1.0
+            self.ax.set_ylim(lo - pad, hi + pad)
+        self.canvas.draw_idle()
+
+
+class HeatmapWindow:
+    """
+    Heatmaps of solusd_analytics.Analytics matrices with a slider over the
+    window ends, and beta to the benchmark beside them. Moving the slider
+    or switching metric updates the existing image and bars in place.
+    """
+
+    def __init__(self, master, analytics, metrics):
+        self.a = analytics
+        self.win = customtkinter.CTkToplevel(master)
+        self.win.title(f"Analytics ({analytics.window}-candle window, {len(analytics.symbols)} symbols)")
+        controls = customtkinter.CTkFrame(self.win)
+        controls.pack(fill="x", padx=5, pady=5)
+        self.metric_var = tk.StringVar(value=metrics[0])
+        customtkinter.CTkComboBox(
+            controls, variable=self.metric_var, values=metrics, width=140, command=lambda _: self.update()
+        ).pack(side="left", padx=5)
+        k = len(analytics.ends)
+        self.slider = customtkinter.CTkSlider(
+            controls, from_=0, to=max(1, k - 1), number_of_steps=max(1, k - 1), command=lambda _: self.update()
+        )
+        self.slider.set(k - 1)
+        self.slider.pack(side="left", fill="x", expand=True, padx=5)
+        self.end_label = customtkinter.CTkLabel(controls, text="", width=160)
+        self.end_label.pack(side="left", padx=5)
+
+        self.fig = Figure(figsize=(11, 7))
+        has_beta = not np.isnan(analytics.beta).all()
+        grid = self.fig.add_gridspec(1, 2, width_ratios=[4, 1]) if has_beta else self.fig.add_gridspec(1, 1)
+        self.ax = self.fig.add_subplot(grid[0, 0])
+        n = len(analytics.symbols)
+        self.image = self.ax.imshow(np.zeros((n, n)), cmap="RdBu_r", interpolation="nearest", aspect="auto")
+        self.fig.colorbar(self.image, ax=self.ax, fraction=0.046, pad=0.04)
+        step = max(1, n // 40)  # Keep tick labels legible with 100+ symbols
+        ticks = np.arange(0, n, step)
+        labels = [analytics.symbols[i] for i in ticks]
+        self.ax.set_xticks(ticks, labels, rotation=90, fontsize=7)
+        self.ax.set_yticks(ticks, labels, fontsize=7)
+        self.bars = None
+        if has_beta:
+            self.beta_ax = self.fig.add_subplot(grid[0, 1], sharey=self.ax)
+            self.bars = self.beta_ax.barh(np.arange(n), np.zeros(n), color="#1976D2")
+            self.beta_ax.axvline(1.0, color="#888888", linewidth=0.8)
+            self.beta_ax.set_title(f"Beta to {analytics.benchmark}", fontsize=9)
+            self.beta_ax.tick_params(labelleft=False)
+        self.fig.tight_layout()
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.win)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        customtkinter.CTkButton(self.win, text="Close", command=self.win.destroy).pack(pady=5)
+        self.update()
+
+    def update(self):
+        i = int(round(self.slider.get()))
+        metric = self.metric_var.get()
+        matrix = self.a.matrix(metric, i)
+        if metric == "Correlation":
+            lo, hi = -1.0, 1.0
+        else:
+            # Symmetric around zero so the diverging colormap centres on it
+            bound = np.nanmax(np.abs(matrix)) if np.isfinite(matrix).any() else 1.0
+            lo, hi = -bound, bound
+        self.image.set_data(matrix)
+        self.image.set_clim(lo, hi)
+        self.ax.set_title(metric)
+        if self.bars is not None:
+            beta = np.nan_to_num(self.a.beta[i])
+            for bar, value in zip(self.bars, beta):
+                bar.set_width(value)
+            self.beta_ax.set_xlim(min(0.0, beta.min()) - 0.1, max(1.0, beta.max()) + 0.1)
+        self.end_label.configure(text=f"Window end: {pd.Timestamp(self.a.end_times[i])}")
+        self.canvas.draw_idle()
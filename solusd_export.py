@@ -0,0 +1,138 @@
+"""
+Streaming export of a ViewModel to CSV, Excel, Parquet or Feather.
+
+The view is written a chunk of rows at a time, so peak memory is one
+chunk plus the writer's buffers whatever the row count. Every writer
+goes to a temporary file next to the target which replaces it only when
+the export completes; a cancelled or failed export leaves nothing behind.
+Parquet and Feather need pyarrow, Excel needs openpyxl.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+EXCEL_MAX_ROWS = 1_048_576  # Per sheet, including the header row
+TARGET_CHUNK_CELLS = 1_000_000
+
+EXPORT_FORMATS = {
+    'csv': ('CSV files', '.csv'),
+    'excel': ('Excel files', '.xlsx'),
+    'parquet': ('Parquet files', '.parquet'),
+    'feather': ('Feather files', '.feather'),
+}
+
+
+def default_chunk_rows(n_columns):
+    return max(1_000, TARGET_CHUNK_CELLS // max(1, n_columns))
+
+
+def _write_csv(chunks, path, columns):
+    with open(path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+        header = True
+        for chunk in chunks:
+            chunk.to_csv(f, header=header, index=False)
+            header = False
+            yield len(chunk)
+
+
+def _excel_columns(chunk):
+    # Cell values openpyxl understands: Python scalars, datetimes, None for missing.
+    cols = []
+    for name in chunk.columns:
+        s = chunk[name]
+        if pd.api.types.is_datetime64_any_dtype(s.dtype):
+            values = pd.DatetimeIndex(s).to_pydatetime().tolist()
+            cols.append([None if v is pd.NaT else v for v in values])
+        elif isinstance(s.dtype, pd.CategoricalDtype) or s.dtype == object:
+            cols.append(s.astype(object).where(s.notna(), None).tolist())
+        else:
+            values = s.to_numpy()
+            if values.dtype.kind == 'f' and np.isnan(values).any():
+                cols.append([None if v != v else v for v in values.tolist()])
+            else:
+                cols.append(values.tolist())
+    return cols
+
+
+def _write_excel(chunks, path, columns):
+    from openpyxl import Workbook
+
+    # Write-only mode streams rows to disk instead of keeping a cell tree.
+    wb = Workbook(write_only=True)
+    ws, sheet_rows, sheets = None, EXCEL_MAX_ROWS, 0
+    for chunk in chunks:
+        for row in zip(*_excel_columns(chunk)):
+            if sheet_rows >= EXCEL_MAX_ROWS:
+                sheets += 1
+                ws = wb.create_sheet(f'Sheet{sheets}')
+                ws.append(list(columns))
+                sheet_rows = 1
+            ws.append(row)
+            sheet_rows += 1
+        yield len(chunk)
+    if ws is None:
+        wb.create_sheet('Sheet1').append(list(columns))
+    wb.save(path)
+
+
+def _write_arrow(chunks, path, columns, feather=False):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = schema = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = pa.ipc.new_file(path, schema) if feather else pq.ParquetWriter(path, schema)
+            elif not table.schema.equals(schema):
+                table = table.cast(schema)  # e.g. an all-NaN chunk inferred as null
+            writer.write_table(table)
+            yield len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # Nothing to write: still produce a valid, empty file with the columns
+        empty = pa.Table.from_pandas(pd.DataFrame(columns=list(columns)), preserve_index=False)
+        if feather:
+            with pa.ipc.new_file(path, empty.schema) as w:
+                w.write_table(empty)
+        else:
+            pq.write_table(empty, path)
+
+
+WRITERS = {
+    'csv': _write_csv,
+    'excel': _write_excel,
+    'parquet': _write_arrow,
+    'feather': lambda chunks, path, columns: _write_arrow(chunks, path, columns, feather=True),
+}
+
+
+def export_view(view, path, fmt, task=None, chunk_rows=None):
+    """
+    Write view (a ViewModel) to path as fmt ('csv', 'excel', 'parquet' or
+    'feather'). task, a solusd_tasks.Task, receives progress and is
+    checked for cancellation between chunks. Returns the row count.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format '{fmt}'.")
+    chunk_rows = chunk_rows or default_chunk_rows(len(view.columns))
+    total = len(view)
+    tmp = f'{path}.part'
+    done = 0
+    writer = WRITERS[fmt](view.chunks(chunk_rows), tmp, view.columns)
+    try:
+        for n in writer:
+            done += n
+            if task is not None:
+                task.progress(done / total if total else 1.0, f"Exported {done:,} of {total:,} rows")
+        os.replace(tmp, path)
+    finally:
+        writer.close()  # Releases the file handle if we stopped early
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return done
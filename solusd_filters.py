@@ -0,0 +1,434 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class ColumnIndex:
+    """
+    Lazily built lookup structures for one column of a frame.
+
+    codes/labels: integer code per row plus the distinct values as display
+    strings (free for categoricals such as symbol and date, one factorize
+    otherwise). order/sorted_values: stable argsort of numeric and
+    datetime columns, used for range lookups. sort_order/dense_rank: the
+    ascending permutation and tie-aware rank of any column, for sorting;
+    descending_order/descending_rank the same largest first (ties keep
+    their row order and missing values stay last either way).
+    counts/pick/histogram: the value index behind the filter pick list
+    (per-value counts over a set of rows, prefix search, top-N by
+    frequency, and binned counts for numeric columns).
+    """
+
+    def __init__(self, series):
+        self.series = series
+        self.numeric = (pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)) \
+            and not isinstance(series.dtype, pd.CategoricalDtype)
+        self._codes = None
+        self._labels = None
+        self._order = None
+        self._sorted = None
+        self._values = None
+        self._sort_order = None
+        self._dense_rank = None
+        self._descending_order = None
+        self._descending_rank = None
+        self._counts = None  # (rows, counts) of the last counts() call
+        self._prefix = None
+
+    @property
+    def values(self):
+        # Not materialized for categoricals unless a range lookup asks for it.
+        if self._values is None:
+            self._values = self.series.to_numpy()
+        return self._values
+
+    def _factorize(self):
+        if isinstance(self.series.dtype, pd.CategoricalDtype):
+            self._codes = self.series.cat.codes.to_numpy()
+            self._labels = pd.Index(self.series.cat.categories.astype(str))
+        else:
+            codes, uniques = pd.factorize(self.series, sort=True)
+            self._codes = codes
+            self._labels = pd.Index(pd.Series(uniques).astype(str))
+
+    @property
+    def codes(self):
+        if self._codes is None:
+            self._factorize()
+        return self._codes
+
+    @property
+    def labels(self):
+        if self._labels is None:
+            self._factorize()
+        return self._labels
+
+    @property
+    def order(self):
+        if self._order is None:
+            self._order = np.argsort(self.values, kind='stable')
+        return self._order
+
+    @property
+    def sorted_values(self):
+        # NaN/NaT sort to the end; n_valid excludes them from open-ended ranges.
+        if self._sorted is None:
+            self._sorted = self.values[self.order]
+            self.n_valid = len(self._sorted) - int(pd.isna(self._sorted).sum())
+        return self._sorted
+
+    @property
+    def sort_order(self):
+        if self._sort_order is None:
+            if self.numeric:
+                self._sort_order = self.order
+            else:
+                self._sort_order = np.argsort(self._label_keys(), kind='stable')
+        return self._sort_order
+
+    @property
+    def dense_rank(self):
+        """Rank of each row's value with ties sharing a rank (for multi-column sorts)."""
+        if self._dense_rank is None:
+            order = self.sort_order
+            keys = self.values[order] if self.numeric else self._label_keys()[order]
+            changed = np.empty(len(keys), dtype=bool)
+            changed[:1] = False
+            if self.numeric and keys.dtype.kind == 'f':
+                # NaN != NaN would give every missing value its own rank.
+                changed[1:] = (keys[1:] != keys[:-1]) & ~(np.isnan(keys[1:]) & np.isnan(keys[:-1]))
+            else:
+                changed[1:] = keys[1:] != keys[:-1]
+            rank = np.empty(len(keys), dtype=np.int64)
+            rank[order] = np.cumsum(changed)
+            self._dense_rank = rank
+        return self._dense_rank
+
+    @property
+    def descending_rank(self):
+        """dense_rank counted from the largest value, missing values still ranked last."""
+        if self._descending_rank is None:
+            rank = self.dense_rank
+            missing = pd.isna(self.values) if self.numeric else self.codes < 0
+            top = int(rank[~missing].max()) if not missing.all() else 0
+            self._descending_rank = np.where(missing, top + 1, top - rank)
+        return self._descending_rank
+
+    @property
+    def descending_order(self):
+        if self._descending_order is None:
+            self._descending_order = np.argsort(self.descending_rank, kind='stable')
+        return self._descending_order
+
+    def _label_keys(self):
+        # Codes remapped so they order like the labels; missing values last.
+        rank = np.empty(len(self.labels) + 1, dtype=np.int64)
+        rank[:-1] = np.argsort(np.argsort(self.labels.to_numpy(dtype=object), kind='stable'), kind='stable')
+        rank[-1] = len(self.labels)
+        return rank[self.codes]
+
+    def code_table(self, label_mask):
+        """
+        Boolean lookup table over codes for a mask over labels. It has one
+        extra False slot so missing values (code -1) never match.
+        """
+        table = np.zeros(len(self.labels) + 1, dtype=bool)
+        table[:-1] = label_mask
+        return table
+
+    def counts(self, rows=None):
+        """
+        Number of rows per label (aligned with labels) among rows, or in the
+        whole column. The last result is kept while the same rows array is
+        passed again, e.g. while paging through one view's pick list.
+        """
+        cached = self._counts
+        if cached is not None and cached[0] is rows:
+            return cached[1]
+        codes = self.codes if rows is None or len(rows) == len(self.codes) else self.codes[rows]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.labels))
+        self._counts = (rows, counts)
+        return counts
+
+    @property
+    def prefix_index(self):
+        """(sorted lower-cased labels, their codes), for prefix searches."""
+        if self._prefix is None:
+            keys = np.asarray(self.labels.str.lower(), dtype=str)
+            order = np.argsort(keys, kind='stable')
+            self._prefix = (keys[order], order)
+        return self._prefix
+
+    def top(self, n, rows=None, codes=None):
+        """Codes of the n most frequent labels among rows (restricted to codes), most frequent first."""
+        counts = self.counts(rows)
+        codes = np.arange(len(counts)) if codes is None else codes
+        codes = codes[counts[codes] > 0]
+        if n < len(codes):
+            # Partial selection: only the first n are ordered
+            codes = codes[np.argpartition(-counts[codes], n - 1)[:n]]
+        return codes[np.lexsort((codes, -counts[codes]))]
+
+    def pick(self, rows=None, prefix='', offset=0, limit=200):
+        """
+        One page of a filter pick list: (labels, counts, total) for the values
+        among rows that start with prefix (case-insensitive), most frequent
+        first. total counts every match, not just this page.
+        """
+        codes = None
+        if prefix:
+            keys, order = self.prefix_index
+            prefix = prefix.lower()
+            start = np.searchsorted(keys, prefix, 'left')
+            stop = np.searchsorted(keys, prefix + '\U0010ffff', 'left')
+            codes = order[start:stop]
+        counts = self.counts(rows)
+        matches = int((counts > 0).sum()) if codes is None else int((counts[codes] > 0).sum())
+        page = self.top(offset + limit, rows, codes)[offset:]
+        return self.labels[page], counts[page], matches
+
+    def histogram(self, rows=None, bins=50):
+        """
+        (edges, counts) of a numeric or datetime column among rows: edges is
+        an Index of bins + 1 boundaries (a DatetimeIndex for datetimes).
+        Integer columns get at most one bin per integer.
+        """
+        values = self.values if rows is None or len(rows) == len(self.values) else self.values[rows]
+        is_time = values.dtype.kind == 'M'
+        if is_time:
+            valid = values[~np.isnat(values)].astype('datetime64[ns]').view('i8')
+        else:
+            valid = values[~np.isnan(values)] if values.dtype.kind == 'f' else values
+        if not len(valid):
+            return pd.Index([], dtype='datetime64[ns]' if is_time else float), np.zeros(0, dtype=np.int64)
+        lo, hi = valid.min(), valid.max()
+        if valid.dtype.kind in 'iub' and not is_time:
+            bins = max(1, min(bins, int(hi) - int(lo) + 1))
+        counts, edges = np.histogram(valid, bins=bins, range=(lo, hi) if lo < hi else None)
+        if is_time:
+            return pd.DatetimeIndex(edges.astype(np.int64).view('datetime64[ns]')), counts
+        return pd.Index(edges), counts
+
+    def coerce(self, value):
+        """
+        Convert a user-entered string to a value comparable with this
+        column: a datetime64, or a float64 (casting to an integer dtype
+        would truncate fractional bounds such as histogram edges).
+        """
+        if pd.api.types.is_datetime64_any_dtype(self.series):
+            return np.datetime64(pd.Timestamp(value))
+        return np.float64(value)
+
+
+class Predicate:
+    """One filter step. evaluate() returns a mask over the given rows."""
+
+    def __init__(self, column):
+        self.column = column
+
+    def evaluate(self, index, rows, n_total):
+        raise NotImplementedError
+
+    @staticmethod
+    def _take(values, rows, n_total):
+        # rows is every position in order when nothing is filtered yet.
+        return values if len(rows) == n_total else values[rows]
+
+
+class Include(Predicate):
+    def __init__(self, column, values):
+        super().__init__(column)
+        self.values = [str(v) for v in values]
+
+    def evaluate(self, index, rows, n_total):
+        table = index.code_table(index.labels.isin(self.values))
+        return table[self._take(index.codes, rows, n_total)]
+
+    def __str__(self):
+        return f"{self.column} in [{', '.join(self.values[:3])}{', ...' if len(self.values) > 3 else ''}]"
+
+
+class Exclude(Include):
+    def evaluate(self, index, rows, n_total):
+        return ~super().evaluate(index, rows, n_total)
+
+    def __str__(self):
+        return "not " + super().__str__()
+
+
+class Like(Predicate):
+    """Case-insensitive pattern match (regular expression, as str.contains)."""
+
+    def __init__(self, column, pattern):
+        super().__init__(column)
+        self.pattern = pattern
+
+    def evaluate(self, index, rows, n_total):
+        # Matched once per distinct value, then broadcast through the codes.
+        table = index.code_table(index.labels.str.contains(self.pattern, case=False, na=False, regex=True))
+        return table[self._take(index.codes, rows, n_total)]
+
+    def __str__(self):
+        return f"{self.column} like '{self.pattern}'"
+
+
+class Range(Predicate):
+    """Inclusive lo <= value <= hi; either bound may be None."""
+
+    def __init__(self, column, lo=None, hi=None):
+        super().__init__(column)
+        self.lo = lo
+        self.hi = hi
+
+    def evaluate(self, index, rows, n_total):
+        if not index.numeric:
+            raise ValueError(f"Column '{self.column}' is not numeric; use Include or Is Like.")
+        lo = index.coerce(self.lo) if self.lo not in (None, "") else None
+        hi = index.coerce(self.hi) if self.hi not in (None, "") else None
+        if len(rows) < n_total:
+            values = index.values[rows]
+            mask = np.ones(len(rows), dtype=bool)
+            if lo is not None:
+                mask &= values >= lo
+            if hi is not None:
+                mask &= values <= hi
+            return mask
+        # Unfiltered: two binary searches on the sorted column.
+        order = index.order
+        sorted_values = index.sorted_values[:index.n_valid]
+        start = np.searchsorted(sorted_values, lo, 'left') if lo is not None else 0
+        stop = np.searchsorted(sorted_values, hi, 'right') if hi is not None else len(sorted_values)
+        mask = np.zeros(n_total, dtype=bool)
+        mask[order[start:stop]] = True
+        return mask
+
+    def __str__(self):
+        return f"{self.lo if self.lo not in (None, '') else '-inf'} <= {self.column} <= " \
+               f"{self.hi if self.hi not in (None, '') else 'inf'}"
+
+
+class Bins(Predicate):
+    """
+    Any of several half-open ranges lo <= value < hi (hi None: no upper
+    bound), e.g. the histogram bins picked in the viewer's value list.
+    """
+
+    def __init__(self, column, ranges):
+        super().__init__(column)
+        self.ranges = [[lo, hi] for lo, hi in ranges]
+
+    def evaluate(self, index, rows, n_total):
+        if not index.numeric:
+            raise ValueError(f"Column '{self.column}' is not numeric; use Include or Is Like.")
+        values = self._take(index.values, rows, n_total)
+        mask = np.zeros(len(values), dtype=bool)
+        for lo, hi in self.ranges:
+            part = values >= index.coerce(lo)
+            if hi not in (None, ""):
+                part &= values < index.coerce(hi)
+            mask |= part
+        return mask
+
+    def __str__(self):
+        shown = [f"[{lo}, {hi if hi not in (None, '') else 'inf'})" for lo, hi in self.ranges[:3]]
+        return f"{self.column} in {' or '.join(shown)}{' or ...' if len(self.ranges) > 3 else ''}"
+
+
+PREDICATES = {'include': Include, 'exclude': Exclude, 'like': Like, 'range': Range, 'bins': Bins}
+
+
+def predicate_to_json(predicate):
+    """A filter predicate as a JSON object (server requests, saved sessions)."""
+    if isinstance(predicate, Exclude):
+        return {'op': 'exclude', 'column': predicate.column, 'values': predicate.values}
+    if isinstance(predicate, Include):
+        return {'op': 'include', 'column': predicate.column, 'values': predicate.values}
+    if isinstance(predicate, Like):
+        return {'op': 'like', 'column': predicate.column, 'pattern': predicate.pattern}
+    if isinstance(predicate, Range):
+        return {'op': 'range', 'column': predicate.column, 'lo': predicate.lo, 'hi': predicate.hi}
+    if isinstance(predicate, Bins):
+        return {'op': 'bins', 'column': predicate.column, 'ranges': predicate.ranges}
+    raise ValueError(f"Unsupported filter {predicate!r}")
+
+
+def predicate_from_json(spec):
+    spec = dict(spec)
+    op = spec.pop('op', None)
+    if op not in PREDICATES:
+        raise ValueError(f"Unknown filter op '{op}'.")
+    return PREDICATES[op](**spec)
+
+
+class FilterEngine:
+    """
+    Stack of predicates over one base frame. Each step keeps the row
+    positions that passed so far, so a new predicate is only evaluated
+    against the current result, and popping the last one is free.
+
+    evaluate() has no side effects and can run on a worker thread;
+    push() records the result and belongs on the UI thread.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.predicates = []
+        self._rows = [np.arange(len(df))]
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def index(self, column):
+        with self._lock:
+            if column not in self._indexes:
+                self._indexes[column] = ColumnIndex(self.df[column])
+            return self._indexes[column]
+
+    def invalidate(self, columns):
+        """Drop the indexes (and sort orders) of columns whose values were rewritten in place."""
+        with self._lock:
+            for column in columns:
+                self._indexes.pop(column, None)
+
+    @property
+    def rows(self):
+        return self._rows[-1]
+
+    def evaluate(self, predicate, rows=None):
+        rows = self.rows if rows is None else rows
+        mask = predicate.evaluate(self.index(predicate.column), rows, len(self.df))
+        if len(rows) == len(self.df):
+            return np.flatnonzero(mask)
+        return rows[mask]
+
+    @property
+    def all_rows(self):
+        return self._rows[0]
+
+    @property
+    def steps(self):
+        """(predicate, rows after it) for each predicate on the stack."""
+        return list(zip(self.predicates, self._rows[1:]))
+
+    def push(self, predicate, rows):
+        self.predicates.append(predicate)
+        self._rows.append(rows)
+
+    def pop(self):
+        if self.predicates:
+            self.predicates.pop()
+            self._rows.pop()
+        return self.rows
+
+    def clear(self):
+        del self.predicates[:]
+        del self._rows[1:]
+
+    def frame(self, rows=None):
+        rows = self.rows if rows is None else rows
+        if len(rows) == len(self.df):
+            return self.df
+        return self.df.take(rows)
+
+    def describe(self):
+        return " AND ".join(str(p) for p in self.predicates)
@@ -0,0 +1,282 @@
+"""
+Undo/redo for the viewer's table: each step (filter, sort, column move,
+pivot, return to the original table) is kept as an operation record
+rather than a copy of the frame.
+
+A ViewState is a chain of Stages. The first stage is the loaded frame;
+each later one is a pivot (PivotSpec) of the stage below it as that
+stage was filtered. A stage records its filter predicates, sort keys and
+column order, so a state costs a few hundred bytes however large the
+data is, can be saved to JSON, and replays on freshly loaded data.
+
+Running a state's pivots, filters and sort is what takes time, so
+ViewHistory also keeps the most recently used results (Snapshots: row
+position arrays and pivot tables, never copies of the base frame) in an
+LRU cache under a byte budget. Stepping between recent states is a
+lookup; older ones are replayed, reusing the deepest cached stage.
+
+    history = ViewHistory()
+    history.record(state, snapshot)
+    state = history.undo()
+    snapshot = history.recall(state) or materialize(state, df, history=history)
+"""
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from solusd_filters import predicate_from_json, predicate_to_json
+from solusd_pivot import PivotEngine, PivotSpec
+from solusd_remote import engines_for
+from solusd_view import ViewModel
+
+DEFAULT_BUDGET = 256 * 1024 * 1024  # Bytes of cached row positions and pivot tables
+MAX_STATES = 200
+SESSION_VERSION = 1
+
+
+class Stage:
+    """One frame of a view: how it was made (pivot, None for the loaded frame) and how it is shown."""
+
+    def __init__(self, pivot=None, predicates=(), sort=(), columns=()):
+        self.pivot = pivot
+        self.predicates = tuple(predicates)
+        self.sort = tuple((c, bool(a)) for c, a in sort)
+        self.columns = tuple(columns)
+
+    @property
+    def key(self):
+        filters = tuple(json.dumps(predicate_to_json(p), sort_keys=True, default=str) for p in self.predicates)
+        return (self.pivot.key if self.pivot is not None else None, filters, self.sort, self.columns)
+
+    def to_json(self):
+        pivot = self.pivot
+        return {
+            'pivot': None if pivot is None else {'index': pivot.index, 'values': pivot.values, 'agg': pivot.agg,
+                                                 'bucket': pivot.bucket, 'columns': pivot.columns},
+            'filters': [predicate_to_json(p) for p in self.predicates],
+            'sort': [[c, a] for c, a in self.sort],
+            'columns': list(self.columns),
+        }
+
+    @classmethod
+    def from_json(cls, spec):
+        pivot = spec.get('pivot')
+        if pivot is not None:
+            pivot = PivotSpec(pivot['index'], pivot['values'], pivot.get('agg', 'sum'),
+                              pivot.get('bucket'), pivot.get('columns'))
+        return cls(pivot, [predicate_from_json(p) for p in spec.get('filters', [])],
+                   spec.get('sort', []), spec.get('columns', []))
+
+
+class ViewState:
+    """What the table shows, as the chain of Stages that produces it."""
+
+    def __init__(self, stages):
+        self.stages = tuple(stages)
+        self.key = tuple(stage.key for stage in self.stages)
+
+    @property
+    def top(self):
+        return self.stages[-1]
+
+    @property
+    def parent(self):
+        """The state the top stage was pivoted from (None for the loaded frame)."""
+        return ViewState(self.stages[:-1]) if len(self.stages) > 1 else None
+
+    def to_json(self):
+        return [stage.to_json() for stage in self.stages]
+
+    @classmethod
+    def from_json(cls, spec):
+        return cls(Stage.from_json(s) for s in spec)
+
+
+class Snapshot:
+    """
+    A materialized ViewState: the top stage's frame, its filter engine and
+    sorter, the rows after each predicate (to restore the engine's stack)
+    and the sorted rows the table shows.
+    """
+
+    def __init__(self, df, engine, sorter, steps, rows):
+        self.df, self.engine, self.sorter = df, engine, sorter
+        self.steps = list(steps)
+        self.rows = rows
+        self._parts = None
+
+    def parts(self, pivoted):
+        """{id: bytes} of the row arrays (and, if pivoted, the pivot table) this snapshot holds."""
+        if self._parts is None:
+            arrays = [rows for _, rows in self.steps] + [self.rows]
+            self._parts = {id(a): a.nbytes for a in arrays if isinstance(a, np.ndarray)}
+            if pivoted and hasattr(self.df, 'memory_usage'):
+                self._parts[id(self.df)] = int(self.df.memory_usage(index=True).sum())
+        return self._parts
+
+    def restore(self):
+        """Put the engine's predicate stack back to this snapshot's."""
+        self.engine.clear()
+        for predicate, rows in self.steps:
+            self.engine.push(predicate, rows)
+
+
+def materialize(state, base, pivot=None, history=None, task=None):
+    """
+    Run state against base (the loaded frame) and return its Snapshot.
+    pivot(df, rows, spec, task) computes a pivot stage (a local
+    PivotEngine by default). Stages cached in history are reused, as are
+    the filter engines (and their indexes) of frames it still holds.
+    """
+    if history is not None:
+        hit = history.recall(state)
+        if hit is not None:
+            return hit
+    if pivot is None:
+        engine = PivotEngine()
+        pivot = lambda df, rows, spec, task=None: engine.pivot(ViewModel(df, rows), spec, task)  # noqa: E731
+    stage = state.top
+    if stage.pivot is None:
+        df = base
+    else:
+        source = materialize(state.parent, base, pivot, history, task)
+        if task is not None:
+            task.check()
+        df = pivot(source.df, source.rows, stage.pivot, task)
+    engine, sorter = history.engines(df) if history is not None else engines_for(df)
+    steps = []
+    rows = engine.all_rows
+    for predicate in stage.predicates:
+        if task is not None:
+            task.check()
+        rows = engine.evaluate(predicate, rows)
+        steps.append((predicate, rows))
+    return Snapshot(df, engine, sorter, steps, sorter.order(list(stage.sort), rows))
+
+
+class ViewHistory:
+    """
+    Undo/redo stack of ViewStates plus an LRU cache of their Snapshots,
+    evicted oldest-first once the row arrays and pivot tables it holds
+    exceed budget bytes (the newest one and the current state's are
+    always kept).
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, max_states=MAX_STATES):
+        self.budget = budget
+        self.max_states = max_states
+        self.states = []
+        self.position = -1
+        self._snapshots = OrderedDict()  # state key -> Snapshot
+        self._lock = threading.Lock()  # materialize() reads the cache from worker threads
+        self.nbytes = 0
+
+    @property
+    def current(self):
+        return self.states[self.position] if self.states else None
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self.states) - 1
+
+    def record(self, state, snapshot=None):
+        """Make state the current step (dropping the redo tail), unless it already is."""
+        current = self.current
+        if current is None or current.key != state.key:
+            del self.states[self.position + 1:]
+            self.states.append(state)
+            if len(self.states) > self.max_states:
+                del self.states[0]
+            self.position = len(self.states) - 1
+        if snapshot is not None:
+            self.remember(state, snapshot)
+
+    def undo(self):
+        if not self.can_undo():
+            return None
+        self.position -= 1
+        return self.current
+
+    def redo(self):
+        if not self.can_redo():
+            return None
+        self.position += 1
+        return self.current
+
+    # --- Snapshot cache ---
+
+    def recall(self, state):
+        with self._lock:
+            snapshot = self._snapshots.get(state.key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(state.key)
+            return snapshot
+
+    def remember(self, state, snapshot):
+        with self._lock:
+            self._snapshots[state.key] = snapshot
+            self._snapshots.move_to_end(state.key)
+            keep = {state.key, self.current.key if self.current is not None else None}
+            self.nbytes = self._footprint()
+            for key in [k for k in self._snapshots if k not in keep]:  # Least recently used first
+                if self.nbytes <= self.budget:
+                    break
+                del self._snapshots[key]
+                self.nbytes = self._footprint()
+
+    def _footprint(self):
+        # Arrays and pivot tables shared between snapshots (a filter
+        # prefix, a pivot under several states) are counted once. The
+        # loaded frame is not counted: it is held either way.
+        parts = {}
+        for key, snapshot in self._snapshots.items():
+            parts.update(snapshot.parts(pivoted=key[-1][0] is not None))
+        return sum(parts.values())
+
+    def engines(self, df):
+        """(filter engine, sorter) for df, shared with a cached snapshot of the same frame if any."""
+        with self._lock:
+            for snapshot in reversed(self._snapshots.values()):
+                if snapshot.df is df:
+                    return snapshot.engine, snapshot.sorter
+        return engines_for(df)
+
+    def forget_views(self):
+        """Drop cached snapshots (the data changed); the states replay on the new data."""
+        with self._lock:
+            self._snapshots.clear()
+            self.nbytes = 0
+
+    def clear(self):
+        self.forget_views()
+        self.states = []
+        self.position = -1
+
+    # --- Sessions ---
+
+    def save(self, path, **extra):
+        """Write the states and position as JSON; extra (e.g. symbols, interval) is stored alongside."""
+        session = dict(extra, version=SESSION_VERSION, position=self.position,
+                       states=[state.to_json() for state in self.states])
+        with open(path, 'w') as f:
+            json.dump(session, f, indent=1, default=str)
+
+    def load(self, path):
+        """Replace the history with a saved session; returns the session's extra fields."""
+        with open(path) as f:
+            session = json.load(f)
+        if session.get('version') != SESSION_VERSION:
+            raise ValueError(f"Unsupported session version {session.get('version')!r}.")
+        states = [ViewState.from_json(s) for s in session.pop('states')]
+        if not states:
+            raise ValueError("The session has no views.")
+        position = session.pop('position', len(states) - 1)
+        self.clear()
+        self.states = states
+        self.position = min(max(position, 0), len(states) - 1)
+        session.pop('version')
+        return session
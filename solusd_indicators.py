@@ -0,0 +1,275 @@
+"""
+Rolling technical indicators over kline frames, computed per symbol.
+
+Each indicator is vectorized over a symbol's full history the first
+time, then updated incrementally: IndicatorEngine memoizes the result
+per (symbol, interval, indicator) and, when the frame has only grown or
+its newest candle changed, recomputes just the tail. Window indicators
+(SMA, VWAP, returns, realized volatility) re-read `lookback` rows before
+the tail; recursive ones (EMA, ATR, RSI) continue from the smoothing
+state saved for the row before the last.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+def _smooth(x, alpha, n=None, prev=None):
+    """
+    y[t] = y[t-1] + alpha * (x[t] - y[t-1]). Continues from prev when given;
+    otherwise the first n-1 outputs are NaN and y[n-1] is the mean of the
+    first n values (the seeding used by Wilder and for the classic EMA).
+    """
+    out = np.full(len(x), np.nan)
+    if prev is None:
+        if len(x) < n:
+            return out
+        seed, rest, at = x[:n].mean(), x[n:], n - 1
+    else:
+        seed, rest, at = prev, x, -1
+    # A leading seed value makes pandas' adjust=False EWM start exactly there.
+    y = pd.Series(np.concatenate(([seed], rest))).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    if prev is None:
+        out[at:] = y
+    else:
+        out[:] = y[1:]
+    return out
+
+
+def _before_last(prev, values):
+    # Smoothing state at the row before the last one, or None if not warmed up.
+    state = values[-2] if len(values) >= 2 else prev
+    return None if state is None or np.isnan(state) else float(state)
+
+
+def _rolling(x, n, how='mean'):
+    return getattr(pd.Series(x).rolling(n), how)().to_numpy()
+
+
+class Indicator:
+    """
+    Base class. compute(a, start, state) gets the input columns for a
+    symbol's rows from some base row on, and returns the values for rows
+    a[start:] plus the state to resume from next time (recursive
+    indicators only). state is None for a full computation.
+    """
+    inputs = ('close',)
+    recursive = False
+
+    def __init__(self, n):
+        self.n = int(n)
+
+    @property
+    def lookback(self):
+        return self.n - 1
+
+    @property
+    def key(self):
+        return (type(self).__name__, self.n)
+
+    @property
+    def name(self):
+        return f'{self.label}_{self.n}'
+
+    def compute(self, a, start, state):
+        raise NotImplementedError
+
+    def __str__(self):
+        return f'{type(self).__name__} {self.n}'
+
+
+class SMA(Indicator):
+    label = 'sma'
+
+    def compute(self, a, start, state):
+        return _rolling(a['close'], self.n)[start:], None
+
+
+class EMA(Indicator):
+    label = 'ema'
+    recursive = True
+    lookback = 0
+
+    def compute(self, a, start, state):
+        alpha = 2 / (self.n + 1)
+        x = a['close'][start:]
+        values = _smooth(x, alpha, self.n) if state is None else _smooth(x, alpha, prev=state)
+        return values, _before_last(state, values)
+
+
+class ATR(Indicator):
+    """Average true range with Wilder smoothing."""
+    label = 'atr'
+    inputs = ('high', 'low', 'close')
+    recursive = True
+    lookback = 1  # The previous close
+
+    def compute(self, a, start, state):
+        h, l, c = a['high'], a['low'], a['close']
+        prev_close = np.concatenate(([np.nan], c[:-1]))
+        tr = np.fmax(h - l, np.fmax(np.abs(h - prev_close), np.abs(l - prev_close)))[start:]
+        values = _smooth(tr, 1 / self.n, self.n) if state is None else _smooth(tr, 1 / self.n, prev=state)
+        return values, _before_last(state, values)
+
+
+class RSI(Indicator):
+    """Relative strength index with Wilder smoothing of gains and losses."""
+    label = 'rsi'
+    recursive = True
+    lookback = 1
+
+    def compute(self, a, start, state):
+        c = a['close']
+        delta = np.diff(c)  # delta[i] belongs to row i + 1
+        gains, losses = np.clip(delta, 0, None), np.clip(-delta, 0, None)
+        if state is None:
+            avg_gain = np.concatenate(([np.nan], _smooth(gains, 1 / self.n, self.n)))
+            avg_loss = np.concatenate(([np.nan], _smooth(losses, 1 / self.n, self.n)))
+            prev = (None, None)
+        else:
+            avg_gain = _smooth(gains[start - 1:], 1 / self.n, prev=state[0])
+            avg_loss = _smooth(losses[start - 1:], 1 / self.n, prev=state[1])
+            prev = state
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = 100 * avg_gain / (avg_gain + avg_loss)
+        if state is None:
+            values = values[start:]
+        g, l = _before_last(prev[0], avg_gain), _before_last(prev[1], avg_loss)
+        return values, (None if g is None or l is None else (g, l))
+
+
+class VWAP(Indicator):
+    """Rolling volume-weighted average price: sum(quote volume) / sum(volume)."""
+    label = 'vwap'
+    inputs = ('quote_asset_volume', 'volume')
+
+    def compute(self, a, start, state):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = _rolling(a['quote_asset_volume'], self.n, 'sum') / _rolling(a['volume'], self.n, 'sum')
+        return values[start:], None
+
+
+class Returns(Indicator):
+    """Simple return of the close over n candles."""
+    label = 'ret'
+
+    @property
+    def lookback(self):
+        return self.n
+
+    def compute(self, a, start, state):
+        c = a['close']
+        values = np.full(len(c), np.nan)
+        values[self.n:] = c[self.n:] / c[:-self.n] - 1
+        return values[start:], None
+
+
+class RealizedVol(Indicator):
+    """Realized volatility: sqrt of the sum of squared log returns over n candles."""
+    label = 'rvol'
+
+    @property
+    def lookback(self):
+        return self.n
+
+    def compute(self, a, start, state):
+        c = a['close']
+        r2 = np.full(len(c), np.nan)
+        r2[1:] = np.log(c[1:] / c[:-1]) ** 2
+        return np.sqrt(_rolling(r2, self.n, 'sum'))[start:], None
+
+
+INDICATORS = {'SMA': SMA, 'EMA': EMA, 'ATR': ATR, 'RSI': RSI, 'VWAP': VWAP, 'Return': Returns, 'RVol': RealizedVol}
+DEFAULT_PERIODS = {'SMA': 20, 'EMA': 20, 'ATR': 14, 'RSI': 14, 'VWAP': 20, 'Return': 1, 'RVol': 20}
+
+
+def parse_indicator(text):
+    """'EMA 50' -> EMA(50); the period defaults per indicator."""
+    parts = text.split()
+    if not parts or parts[0] not in INDICATORS:
+        raise ValueError(f"Unknown indicator '{text}'. Choose from {', '.join(INDICATORS)}.")
+    n = int(parts[1]) if len(parts) > 1 else DEFAULT_PERIODS[parts[0]]
+    if n < 1:
+        raise ValueError("The indicator period must be at least 1.")
+    return INDICATORS[parts[0]](n)
+
+
+def symbol_positions(df):
+    """Yield (symbol, row positions in open_time order) for each symbol in df."""
+    if 'symbol' not in df.columns:
+        yield None, np.arange(len(df))
+        return
+    s = df['symbol']
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes, labels = s.cat.codes.to_numpy(), s.cat.categories
+    else:
+        codes, labels = pd.factorize(s)
+    order = np.argsort(codes, kind='stable')  # Radix sort for small int codes
+    sorted_codes = codes[order]
+    bounds = np.flatnonzero(np.diff(sorted_codes)) + 1
+    times = df['open_time'].to_numpy()
+    for pos in np.split(order, bounds):
+        if not len(pos) or codes[pos[0]] < 0:
+            continue
+        t = times[pos]
+        if len(t) > 1 and (t[1:] < t[:-1]).any():
+            pos = pos[np.argsort(t, kind='stable')]
+        yield labels[codes[pos[0]]], pos
+
+
+class _Memo:
+    __slots__ = ('first', 'last', 'n', 'values', 'state')
+
+    def __init__(self, first, last, n, values, state):
+        self.first, self.last, self.n, self.values, self.state = first, last, n, values, state
+
+
+class IndicatorEngine:
+    """
+    Memoized per-symbol indicator columns for frames of one interval.
+    column() recomputes only what changed since the last call for the
+    same symbol and indicator: nothing but the newest candle when a live
+    refresh updated it, or the new tail when candles were appended.
+    """
+
+    def __init__(self, interval='1d'):
+        self.interval = interval
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def columns(self, df, indicators):
+        """{indicator.name: values aligned with df's rows (NaN during warm-up)}."""
+        out = {ind.name: np.full(len(df), np.nan) for ind in indicators}
+        times = df['open_time'].to_numpy()
+        with self._lock:
+            for symbol, pos in symbol_positions(df):
+                for ind in indicators:
+                    out[ind.name][pos] = self._series(df, times, symbol, pos, ind)
+        return out
+
+    def column(self, df, indicator):
+        return self.columns(df, [indicator])[indicator.name]
+
+    def _series(self, df, times, symbol, pos, indicator):
+        key = (symbol, self.interval, indicator.key)
+        memo = self._memo.get(key)
+        start = 0
+        if memo is not None and 2 <= memo.n <= len(pos) and times[pos[0]] == memo.first \
+                and times[pos[memo.n - 1]] == memo.last and (memo.state is not None or not indicator.recursive):
+            # Same history; its last candle may have been the open one.
+            start = memo.n - 1
+        base = max(0, start - indicator.lookback)
+        arrays = {col: df[col].to_numpy()[pos[base:]] for col in indicator.inputs}
+        tail, state = indicator.compute(arrays, start - base, memo.state if start else None)
+        values = tail if start == 0 else np.concatenate((memo.values[:start], tail))
+        self._memo[key] = _Memo(times[pos[0]], times[pos[-1]], len(pos), values, state)
+        return values
+
+    def forget(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._memo.clear()
+            else:
+                for key in [k for k in self._memo if k[0] == symbol]:
+                    del self._memo[key]
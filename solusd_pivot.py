@@ -0,0 +1,239 @@
+"""
+Pivot engine for the viewer: grouped aggregations over a ViewModel with
+optional time buckets on open_time and wide (one column per symbol)
+layouts, plus a cache of results.
+
+Results are cached per (view fingerprint, spec). A time-bucketed pivot
+whose aggregation can be rolled up (everything but mean) is built from
+a cached finer bucket of the same view when there is one, e.g. 1d from
+1h, instead of going back to the raw rows.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from solusd_pull import INTERVAL_MS
+from solusd_view import DATA_VERSION
+
+AGGREGATIONS = ['sum', 'mean', 'min', 'max', 'first', 'last', 'count', 'ohlc']
+BUCKETS = ['1m', '5m', '15m', '1h', '4h', '1d', '1w']
+
+# How each kline column combines when candles are merged ('ohlc').
+# volatility (high - low) is recomputed from the merged high and low;
+# 'max' only stands in when those columns are not available.
+CANDLE_AGG = {
+    'open_time': 'first', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+    'volume': 'sum', 'close_time': 'last', 'quote_asset_volume': 'sum', 'num_trades': 'sum',
+    'taker_buy_base': 'sum', 'taker_buy_quote': 'sum', 'volatility': 'max',
+}
+RANGE_COLUMNS = ['high', 'low']
+# Aggregation that combines already-aggregated values of the same kind.
+ROLLUP = {'sum': 'sum', 'min': 'min', 'max': 'max', 'first': 'first', 'last': 'last', 'count': 'sum'}
+
+WEEK_OFFSET_MS = 4 * 86_400_000  # Binance weeks start on Monday; 1970-01-01 was a Thursday
+
+
+def _bucket_ms(bucket):
+    return INTERVAL_MS[bucket], WEEK_OFFSET_MS if bucket == '1w' else 0
+
+
+def bucket_floor(times, bucket):
+    """Start of the bucket each datetime64 value falls in."""
+    width, offset = (v * 1_000_000 for v in _bucket_ms(bucket))
+    ns = np.asarray(times, dtype='datetime64[ns]').view('i8')
+    return (((ns - offset) // width) * width + offset).view('datetime64[ns]')
+
+
+def divides(finer, coarser):
+    """True when every coarser bucket is an exact union of finer buckets."""
+    (fw, fo), (cw, co) = _bucket_ms(finer), _bucket_ms(coarser)
+    return fw < cw and cw % fw == 0 and (co - fo) % fw == 0
+
+
+def view_fingerprint(view):
+    """
+    Identifies the set of rows a view covers, and the version of their
+    values (frames written in place, e.g. by live ticks, count up
+    attrs[DATA_VERSION]); the order does not matter for a pivot, so
+    re-sorting the table keeps its cached pivots.
+    """
+    df = view.df
+    version = df.attrs.get(DATA_VERSION, 0)
+    if view.rows is None:
+        return (id(df), version, len(df), len(df))
+    mixed = view.rows.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    mixed ^= mixed >> np.uint64(29)
+    return (id(df), version, len(df), len(view.rows), int(mixed.sum()), int(np.bitwise_xor.reduce(mixed)))
+
+
+class PivotSpec:
+    """
+    index: group-by columns. values: aggregated columns. agg: one of
+    AGGREGATIONS. bucket: optional BUCKETS entry; open_time is floored to
+    it and grouped on. columns: optional column (e.g. symbol) whose values
+    become result columns.
+    """
+
+    def __init__(self, index, values, agg='sum', bucket=None, columns=None):
+        self.index = [c for c in index if c != columns and not (bucket and c == 'open_time')]
+        self.values = [c for c in values if c not in self.index and c != columns and not (bucket and c == 'open_time')]
+        self.agg = agg
+        self.bucket = bucket or None
+        self.columns = columns or None
+
+    @property
+    def key(self):
+        return (tuple(self.index), tuple(self.values), self.agg, self.bucket, self.columns)
+
+    @property
+    def group_keys(self):
+        keys = list(self.index)
+        if self.bucket:
+            keys.append('open_time')
+        if self.columns:
+            keys.append(self.columns)
+        return keys
+
+    def finer(self, bucket):
+        return PivotSpec(self.index, self.values, self.agg, bucket, self.columns)
+
+    def validate(self, df):
+        if self.agg not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation '{self.agg}'.")
+        if self.bucket and self.bucket not in BUCKETS:
+            raise ValueError(f"Unknown time bucket '{self.bucket}'.")
+        if self.bucket and 'open_time' not in df.columns:
+            raise ValueError("Time buckets need an open_time column.")
+        if not self.values:
+            raise ValueError("Select at least one value column that is not a group column.")
+        if not self.group_keys:
+            raise ValueError("Select at least one group column, a time bucket or a wide column.")
+        missing = [c for c in self.group_keys + self.values if c not in df.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    def __str__(self):
+        parts = [f"{self.agg}({', '.join(self.values)})"]
+        if self.index:
+            parts.append(f"by {', '.join(self.index)}")
+        if self.bucket:
+            parts.append(f"per {self.bucket}")
+        if self.columns:
+            parts.append(f"across {self.columns}")
+        return " ".join(parts)
+
+
+def _range_columns(spec, columns):
+    """high/low to aggregate alongside spec.values so a merged candle's volatility can be recomputed."""
+    if spec.agg != 'ohlc' or 'volatility' not in spec.values or not set(RANGE_COLUMNS) <= set(columns):
+        return []
+    return [c for c in RANGE_COLUMNS if c not in spec.values]
+
+
+def _aggregate(frame, spec, keys, rollup=False):
+    if spec.agg == 'ohlc':
+        values = spec.values + _range_columns(spec, frame.columns)
+        grouped = frame.groupby(keys, observed=True, sort=True)[values]
+        long = grouped.agg({c: CANDLE_AGG.get(c, 'last') for c in values})
+        if 'volatility' in spec.values and set(RANGE_COLUMNS) <= set(values):
+            # The merged candle's range, not its largest child range
+            long['volatility'] = long['high'] - long['low']
+        return long[spec.values]
+    grouped = frame.groupby(keys, observed=True, sort=True)[spec.values]
+    return grouped.agg(ROLLUP[spec.agg] if rollup else spec.agg)
+
+
+def _widen(long, spec):
+    """Long result (group keys as index) -> final table, unstacking spec.columns."""
+    if spec.columns:
+        wide = long.unstack(spec.columns)
+        if len(spec.values) == 1:
+            wide.columns = [str(c) for c in wide.columns.get_level_values(-1)]
+        else:
+            wide.columns = [f"{v}_{c}" for v, c in wide.columns]
+        return wide.reset_index()
+    return long.reset_index()
+
+
+class PivotEngine:
+    """
+    Computes PivotSpecs over ViewModels and keeps the most recent
+    max_entries long-form results for reuse.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()  # (fingerprint, spec key) -> (weakref to base frame, long result)
+        self._lock = threading.Lock()
+        self.hits = self.rollups = self.misses = 0
+
+    def _get(self, fingerprint, view, spec):
+        with self._lock:
+            entry = self._cache.get((fingerprint, spec.key))
+            if entry is None or entry[0]() is not view.df:
+                return None  # id() of a freed frame may have been reused
+            self._cache.move_to_end((fingerprint, spec.key))
+            return entry[1]
+
+    def _put(self, fingerprint, view, spec, long):
+        with self._lock:
+            self._cache[(fingerprint, spec.key)] = (weakref.ref(view.df), long)
+            self._cache.move_to_end((fingerprint, spec.key))
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def pivot(self, view, spec, task=None):
+        """The pivot table for view (a ViewModel) as a DataFrame."""
+        spec.validate(view.df)
+        fingerprint = view_fingerprint(view)
+        long = self._get(fingerprint, view, spec)
+        if long is not None:
+            self.hits += 1
+            return _widen(long, spec)
+        long = self._from_finer(fingerprint, view, spec)
+        if long is not None:
+            self.rollups += 1
+        else:
+            self.misses += 1
+            long = self._from_rows(view, spec, task)
+        self._put(fingerprint, view, spec, long)
+        return _widen(long, spec)
+
+    def _from_rows(self, view, spec, task=None):
+        needed = list(dict.fromkeys(spec.group_keys + spec.values + _range_columns(spec, view.df.columns)))
+        ordered = spec.agg in ('first', 'last', 'ohlc') and 'open_time' in view.df.columns
+        if ordered and 'open_time' not in needed:
+            needed.append('open_time')
+        frame = view.frame(needed)
+        if task is not None:
+            task.check()
+        if ordered:
+            # first/last follow time, not the table's current sort
+            frame = frame.sort_values('open_time', kind='stable')
+        if spec.bucket:
+            frame = frame.assign(open_time=bucket_floor(frame['open_time'].to_numpy(), spec.bucket))
+        return _aggregate(frame, spec, spec.group_keys)
+
+    def _from_finer(self, fingerprint, view, spec):
+        if not spec.bucket or spec.agg == 'mean':
+            return None
+        if spec.agg == 'ohlc' and 'volatility' in spec.values and not set(RANGE_COLUMNS) <= set(spec.values):
+            return None  # Finer results do not keep the high/low that volatility needs
+        for finer in reversed(BUCKETS[:BUCKETS.index(spec.bucket)]):
+            if not divides(finer, spec.bucket):
+                continue
+            long = self._get(fingerprint, view, spec.finer(finer))
+            if long is None:
+                continue
+            frame = long.reset_index()
+            frame['open_time'] = bucket_floor(frame['open_time'].to_numpy(), spec.bucket)
+            if spec.agg in ('first', 'last', 'ohlc'):
+                frame = frame.sort_values('open_time', kind='stable')
+            return _aggregate(frame, spec, spec.group_keys, rollup=True)
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
@@ -1,54 +1,786 @@
+import functools
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 import requests
+from requests.adapters import HTTPAdapter
+
+from solusd_cache import DEFAULT_CACHE_DIR, KlineCache
+from solusd_store import ColumnStore
+
+BASE_URL = 'https://api.binance.us/api/v3'
+
+# Binance allows 1200 request weight per rolling minute per IP (klines and
+# single-symbol bookTicker both cost weight 1-2 at our limits).
+DEFAULT_WEIGHT_LIMIT = 1200
+
+# Answers worth retrying: rate limits (418 is the ban that follows ignored
+# 429s) and server-side failures.
+RETRY_STATUS = {418, 429, 500, 502, 503, 504}
+
+KLINE_COLUMNS = [
+    'open_time', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_asset_volume', 'num_trades',
+    'taker_buy_base', 'taker_buy_quote', 'ignore'
+]
+
+# Column order of every frame get_binance_data returns.
+FRAME_COLUMNS = KLINE_COLUMNS + ['date', 'volatility', 'bid', 'ask', 'symbol']
+
+# Milliseconds per kline interval. '1M' is variable on the exchange side;
+# 31 days is only used to size backfill windows, never to label rows.
+INTERVAL_MS = {
+    '1s': 1_000, '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000,
+    '30m': 1_800_000, '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000,
+    '6h': 21_600_000, '8h': 28_800_000, '12h': 43_200_000, '1d': 86_400_000,
+    '3d': 259_200_000, '1w': 604_800_000, '1M': 2_678_400_000,
+}
+
+# Largest page /klines will return in one call.
+MAX_KLINE_LIMIT = 1000
 
+# Largest page /aggTrades will return in one call, and the payload's fields:
+# aggregate id, price, qty, first and last trade id, time, buyer is maker,
+# best price match.
+MAX_TRADE_LIMIT = 1000
+AGG_TRADE_KEYS = [b'a', b'p', b'q', b'f', b'l', b'T', b'm', b'M']
+_AGG_TRADE_KEY = re.compile(rb'"(\w+)":')
 
-def get_binance_data(symbols, interval='1d', limit=365):
+# Columns of the on-disk trade stores (see ingest_agg_trades).
+TRADE_COLUMNS = ['agg_id', 'time', 'price', 'qty', 'n_trades', 'buyer_maker']
+
+log = logging.getLogger(__name__)
+
+
+class BinanceAPIError(Exception):
     """
-    Fetch historical data for multiple cryptocurrencies from Binance US.
-    Returns a single DataFrame with an added 'symbol' column.
+    An error answer from the API, e.g. HTTP 400 with
+    {"code": -1121, "msg": "Invalid symbol."}, or a retryable status that
+    was still failing after the last retry.
+    """
+
+    def __init__(self, status, code=None, msg=None, url=None):
+        self.status = status
+        self.code = code
+        self.msg = msg
+        self.url = url
+        detail = f"{code}: {msg}" if code is not None else (msg or "")
+        super().__init__(f"HTTP {status} {detail}".strip())
+
+
+def _api_error(response):
+    try:
+        payload = response.json()
+    except ValueError:
+        payload = None
+    if isinstance(payload, dict) and 'msg' in payload:
+        return BinanceAPIError(response.status_code, payload.get('code'), payload['msg'], response.url)
+    return BinanceAPIError(response.status_code, msg=response.text[:200], url=response.url)
+
+
+def _retry_after(response):
+    try:
+        return max(0.0, float(response.headers['Retry-After']))
+    except (KeyError, ValueError):
+        return None
+
+
+class WeightBudget:
+    """
+    Shared request-weight budget for one client minute window.
+    Reads the X-MBX-USED-WEIGHT-1M header Binance sends back on every
+    response and makes callers wait for the next minute once the
+    configured headroom is used up, or until a pause() (after a 429)
+    has passed.
+    """
+
+    def __init__(self, limit=DEFAULT_WEIGHT_LIMIT, headroom=0.9):
+        self.limit = int(limit * headroom)
+        self.used = 0
+        self.window = int(time.time() // 60)
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, weight=1):
+        while True:
+            with self.lock:
+                now = time.time()
+                window = int(now // 60)
+                if window != self.window:
+                    self.window = window
+                    self.used = 0
+                if now >= self.resume_at and self.used + weight <= self.limit:
+                    self.used += weight
+                    return
+                if now < self.resume_at:
+                    wait = self.resume_at - now
+                else:
+                    wait = (self.window + 1) * 60 - now
+            time.sleep(max(wait, 0.05))
+
+    def pause(self, seconds):
+        """Hold every caller back for seconds, e.g. a 429's Retry-After."""
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.time() + seconds)
+
+    def update(self, response):
+        used = response.headers.get('X-MBX-USED-WEIGHT-1M') or response.headers.get('X-MBX-USED-WEIGHT')
+        if used is None:
+            return
+        try:
+            used = int(used)
+        except ValueError:
+            return
+        with self.lock:
+            # The server count is authoritative; never lower our own estimate
+            # below it (other processes may share the same IP).
+            self.used = max(self.used, used)
+
+
+def make_session(pool_size=10):
+    """
+    Create a keep-alive requests.Session whose connection pool is large
+    enough for pool_size concurrent workers.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = self.error = None
+
+
+class BinanceClient:
     """
-    all_dfs = []
-    for symbol in symbols:
-        url = f'https://api.binance.us/api/v3/klines?symbol={symbol}&interval={interval}&limit={limit}'
-        response = requests.get(url)
-        data = response.json()
-
-        df = pd.DataFrame(data, columns=[
-            'open_time', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_asset_volume', 'num_trades',
-            'taker_buy_base', 'taker_buy_quote', 'ignore'
-        ])
-
-        df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-        df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
-        # Short date format (YYYY-MM-DD)
-        df['date'] = df['open_time'].dt.strftime('%Y-%m-%d')
-        # Convert numeric columns to float64 (double)
-        df['open'] = pd.to_numeric(df['open'], errors='coerce')
-        df['close'] = pd.to_numeric(df['close'], errors='coerce')
-        df['high'] = pd.to_numeric(df['high'], errors='coerce')
-        df['low'] = pd.to_numeric(df['low'], errors='coerce')
-        df['volume'] = pd.to_numeric(df['volume'], errors='coerce')
-        df['volatility'] = df['high'] - df['low']
-
-        # Optionally, fetch bid/ask for each symbol (current only, not historical)
+    HTTP layer for the Binance REST API, safe to share between threads and
+    between loads:
+
+    - one pooled keep-alive session with explicit (connect, read) timeouts
+    - connection errors, timeouts, 429/418 and 5xx answers are retried with
+      exponential backoff and full jitter; a Retry-After header sets the
+      minimum wait, and a 429/418 pauses the whole budget, not just the
+      request that got it
+    - requests wait on a WeightBudget kept in sync with X-MBX-USED-WEIGHT
+    - identical GETs in flight at the same time (same path and parameters,
+      i.e. symbol, interval and range for klines) go out once and every
+      caller gets the same response
+
+    Other error answers raise BinanceAPIError.
+    """
+
+    def __init__(self, base_url=BASE_URL, session=None, budget=None, pool_size=10,
+                 timeout=(3.05, 10), max_retries=5, backoff=0.5, max_backoff=30.0):
+        self.base_url = base_url
+        self._own_session = session is None
+        self.session = make_session(pool_size) if session is None else session
+        self.budget = WeightBudget() if budget is None else budget
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.retries = self.coalesced = 0
+
+    def get(self, path, params=None, weight=1):
+        """Response body of GET base_url/path as bytes."""
+        key = (path, tuple(sorted((params or {}).items())))
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
         try:
-            ticker_url = f'https://api.binance.us/api/v3/ticker/bookTicker?symbol={symbol}'
-            ticker_resp = requests.get(ticker_url)
-            bid_ask = ticker_resp.json()
-            df['bid'] = pd.to_numeric(bid_ask.get('bidPrice', None), errors='coerce')
-            df['ask'] = pd.to_numeric(bid_ask.get('askPrice', None), errors='coerce')
-        except Exception:
-            df['bid'] = None
-            df['ask'] = None
-
-        df['symbol'] = symbol
-        all_dfs.append(df)
-
-    if all_dfs:
-        return pd.concat(all_dfs, ignore_index=True)
+            call.result = self._request(path, params, weight)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+    def get_json(self, path, params=None, weight=1):
+        return json.loads(self.get(path, params, weight))
+
+    def _request(self, path, params, weight):
+        url = f'{self.base_url}/{path}'
+        for attempt in range(self.max_retries + 1):
+            self.budget.acquire(weight)
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                log.debug("GET %s failed (%s), retrying in %.2fs", path, e, delay)
+            else:
+                self.budget.update(response)
+                if response.status_code < 400:
+                    return response.content
+                if response.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                    raise _api_error(response)
+                delay = self._backoff(attempt)
+                retry_after = _retry_after(response)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                if response.status_code in (418, 429):
+                    self.budget.pause(delay)
+                log.debug("GET %s answered %s, retrying in %.2fs", path, response.status_code, delay)
+            with self._lock:
+                self.retries += 1
+            time.sleep(delay)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def book_tickers(self, symbols):
+        """
+        {symbol: (bid, ask)} for symbols from a single ticker/bookTicker
+        call. If the batch is rejected (e.g. one invalid symbol) each symbol
+        is asked for on its own. Quotes are optional extras on a load, so
+        failures are logged and the symbol is left out rather than raised.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+        if len(symbols) == 1:
+            params, weight = {'symbol': symbols[0]}, 1
+        else:
+            params, weight = {'symbols': json.dumps(symbols, separators=(',', ':'))}, 2
+        try:
+            data = self.get_json('ticker/bookTicker', params, weight)
+        except BinanceAPIError as e:
+            if len(symbols) == 1:
+                log.warning("No book ticker for %s: %s", symbols[0], e)
+                return {}
+            quotes = {}
+            for symbol in symbols:
+                quotes.update(self.book_tickers([symbol]))
+            return quotes
+        except requests.RequestException as e:
+            log.warning("Book ticker request failed: %s", e)
+            return {}
+        if isinstance(data, dict):
+            data = [data]
+        return {
+            d['symbol']: (pd.to_numeric(d.get('bidPrice'), errors='coerce'),
+                          pd.to_numeric(d.get('askPrice'), errors='coerce'))
+            for d in data if isinstance(d, dict) and 'symbol' in d
+        }
+
+    def close(self):
+        if self._own_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_client(client, session, budget, base_url, pool_size):
+    # (client, owned): a client made here is closed by the caller when done.
+    if client is not None:
+        return client, False
+    return BinanceClient(base_url, session, budget, pool_size), True
+
+
+def _kline_array(data):
+    """
+    Parse a /klines payload into an (n, 12) float64 array in one pass.
+    Raw response bytes are parsed directly by numpy: the payload is only
+    numbers, optionally quoted, so dropping brackets and quotes leaves a
+    flat comma-separated list. Epoch milliseconds and trade counts are
+    well below 2**53 and survive the float64 round-trip exactly.
+    """
+    if isinstance(data, (bytes, bytearray)):
+        text = bytes(data).strip()
+        if not text.startswith(b'['):
+            # Error payloads such as {"code": -1121, "msg": "Invalid symbol."}
+            raise ValueError(f"Unexpected klines payload: {text[:200]!r}")
+        text = text.translate(None, b'"[] \t\r\n')
+        if not text:
+            return np.empty((0, len(KLINE_COLUMNS)))
+        flat = np.fromstring(text, sep=',')
+    else:
+        flat = np.array(data, dtype=object).astype(np.float64)
+    return flat.reshape(-1, len(KLINE_COLUMNS))
+
+
+def _date_column(open_time):
+    """
+    Short date (YYYY-MM-DD) as a categorical. Only the distinct days are
+    formatted; rows just carry an integer code.
+    """
+    days = np.asarray(open_time, dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
+    codes, uniques = pd.factorize(days, sort=True)
+    labels = pd.Index(uniques.astype('datetime64[D]')).strftime('%Y-%m-%d')
+    return pd.Categorical.from_codes(codes, categories=labels)
+
+
+def _symbol_column(symbol, n):
+    return pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), categories=[symbol])
+
+
+def _klines_to_df(data):
+    arr = _kline_array(data)
+    open_ms = arr[:, 0].astype(np.int64)
+    high = arr[:, 2]
+    low = arr[:, 3]
+    df = pd.DataFrame({
+        'open_time': open_ms.astype('datetime64[ms]').astype('datetime64[ns]'),
+        'open': arr[:, 1],
+        'high': high,
+        'low': low,
+        'close': arr[:, 4],
+        'volume': arr[:, 5],
+        'close_time': arr[:, 6].astype(np.int64).astype('datetime64[ms]').astype('datetime64[ns]'),
+        'quote_asset_volume': arr[:, 7],
+        'num_trades': arr[:, 8].astype(np.int32),
+        'taker_buy_base': arr[:, 9],
+        'taker_buy_quote': arr[:, 10],
+        'ignore': arr[:, 11].astype(np.int8),
+    }, copy=False)
+    df['date'] = _date_column(df['open_time'])
+    df['volatility'] = high - low
+    return df
+
+
+def _finalize(frames):
+    """
+    Concatenate per-symbol frames, rebuilding the symbol and date
+    categoricals once over the whole result (per-frame categories differ,
+    which would otherwise make concat fall back to object columns).
+    """
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    names = [str(f['symbol'].iloc[0]) for f in frames]
+    categories = list(dict.fromkeys(names))
+    codes = np.repeat([categories.index(n) for n in names], [len(f) for f in frames]).astype(np.int16)
+    df['symbol'] = pd.Categorical.from_codes(codes, categories=categories)
+    df['date'] = _date_column(df['open_time'])
+    return df
+
+
+def merge_symbols(base, new):
+    """
+    Replace (or add) the symbols present in new within base, keeping
+    base's other symbols and any extra columns (NaN for the new rows).
+    The symbol categorical is the union of both, in order of appearance.
+    """
+    if base is None or base.empty:
+        return new
+    if new is None or new.empty:
+        return base
+    keep = base[~base['symbol'].isin(new['symbol'].unique())]
+    symbol = union_categoricals([keep['symbol'], new['symbol']], ignore_order=True)
+    df = pd.concat([keep, new.reindex(columns=base.columns.union(new.columns, sort=False))],
+                   ignore_index=True)
+    df['symbol'] = symbol.remove_unused_categories()
+    df['date'] = _date_column(df['open_time'])
+    return df
+
+
+NO_QUOTE = (np.nan, np.nan)
+
+
+def _fetch_symbol(client, symbol, interval, limit, quote):
+    data = client.get('klines', {'symbol': symbol, 'interval': interval, 'limit': limit})
+    df = _klines_to_df(data)
+    df['bid'], df['ask'] = quote
+    df['symbol'] = _symbol_column(symbol, len(df))
+    return df
+
+
+def _to_ms(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(pd.Timestamp(value).value // 1_000_000)
+
+
+def _fetch_page(client, symbol, interval, start_ms, end_ms):
+    data = client.get('klines', {
+        'symbol': symbol, 'interval': interval, 'startTime': start_ms,
+        'endTime': end_ms, 'limit': MAX_KLINE_LIMIT,
+    }, weight=2)
+    # Parse on the worker so the raw JSON page is dropped as soon as possible.
+    df = _klines_to_df(data)
+    return df if len(df) else None
+
+
+def iter_binance_klines(symbol, interval, start, end=None, max_workers=4,
+                        session=None, budget=None, base_url=BASE_URL, client=None, quote=None):
+    """
+    Backfill klines for one symbol between start and end (ms epoch,
+    datetime or anything pd.Timestamp accepts; end defaults to now).
+
+    The range is split into MAX_KLINE_LIMIT-candle startTime/endTime windows
+    fetched up to max_workers at a time. Pages are yielded in time order as
+    DataFrames with the get_binance_data schema, de-duplicated on
+    open_time, so only about max_workers pages are held in memory at once.
+
+    client is a BinanceClient to share (session, budget and base_url are
+    only used to build one otherwise); quote is the (bid, ask) to stamp on
+    the rows, fetched when not given.
+    """
+    start_ms = _to_ms(start)
+    end_ms = _to_ms(end) if end is not None else int(time.time() * 1000)
+    step = INTERVAL_MS[interval] * MAX_KLINE_LIMIT
+    if start_ms > end_ms:
+        return
+    windows = ((t, min(t + step - 1, end_ms)) for t in range(start_ms, end_ms + 1, step))
+
+    max_workers = max(1, max_workers)
+    client, own_client = _open_client(client, session, budget, base_url, max_workers)
+
+    try:
+        if quote is None:
+            quote = client.book_tickers([symbol]).get(symbol, NO_QUOTE)
+        bid, ask = quote
+        last_open = None
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = []
+            for window in windows:
+                pending.append(pool.submit(_fetch_page, client, symbol, interval, *window))
+                if len(pending) >= max_workers:
+                    break
+            while pending:
+                df = pending.pop(0).result()
+                window = next(windows, None)
+                if window is not None:
+                    pending.append(pool.submit(_fetch_page, client, symbol, interval, *window))
+                if df is None or df.empty:
+                    continue
+                if last_open is not None:
+                    df = df[df['open_time'] > last_open]
+                df = df.drop_duplicates('open_time')
+                if df.empty:
+                    continue
+                last_open = df['open_time'].iloc[-1]
+                df = df.reset_index(drop=True)
+                df['bid'] = bid
+                df['ask'] = ask
+                df['symbol'] = _symbol_column(symbol, len(df))
+                yield df
+    finally:
+        if own_client:
+            client.close()
+
+
+def _fetch_symbol_cached(client, symbol, interval, limit, start, end, page_workers, quote, cache, offline):
+    cached = cache.load(symbol, interval)
+    start_ts = pd.Timestamp(_to_ms(start), unit='ms') if start is not None else None
+    end_ts = pd.Timestamp(_to_ms(end), unit='ms') if end is not None else None
+
+    if not offline:
+        fresh = None
+        if cached is None or cached.empty:
+            cold = True
+        else:
+            # Short of the requested history, unless the cache already
+            # reaches back to the symbol's listing
+            listed = cache.listed(symbol, interval)
+            complete = listed is not None and cached['open_time'].iloc[0] <= listed
+            if start_ts is not None:
+                cold = cached['open_time'].iloc[0] > start_ts and not complete
+            else:
+                cold = len(cached) < limit and not complete
+        if cold and start_ts is None:
+            fresh = _fetch_symbol(client, symbol, interval, limit, quote)
+            if fresh is not None and 0 < len(fresh) < limit:
+                cache.set_listed(symbol, interval, fresh['open_time'].iloc[0])
+        elif cold:
+            pages = list(iter_binance_klines(symbol, interval, start, end, page_workers,
+                                             client=client, quote=quote))
+            fresh = pd.concat(pages, ignore_index=True) if pages else None
+            step = pd.Timedelta(INTERVAL_MS[interval], unit='ms')
+            if fresh is not None and not fresh.empty and fresh['open_time'].iloc[0] >= start_ts + step:
+                cache.set_listed(symbol, interval, fresh['open_time'].iloc[0])
+        elif end_ts is None or cached['close_time'].iloc[-1] < end_ts:
+            # Refetch from the last cached candle: it may still have been open.
+            pages = list(iter_binance_klines(symbol, interval, cached['open_time'].iloc[-1], end,
+                                             page_workers, client=client, quote=quote))
+            fresh = pd.concat(pages, ignore_index=True) if pages else None
+        if fresh is not None and not fresh.empty:
+            cache.append(symbol, interval, fresh)
+            fresh = fresh.drop(columns=['bid', 'ask'])
+            if cached is None or cached.empty:
+                cached = fresh
+            else:
+                cached = pd.concat([cached, fresh], ignore_index=True)
+                cached = cached.drop_duplicates('open_time', keep='last').sort_values('open_time', ignore_index=True)
+
+    if cached is None or cached.empty:
+        return pd.DataFrame(columns=FRAME_COLUMNS)
+    if start_ts is not None:
+        keep = cached['open_time'] >= start_ts
+        if end_ts is not None:
+            keep &= cached['open_time'] <= end_ts
+        df = cached[keep].reset_index(drop=True)
     else:
+        df = cached.tail(limit).reset_index(drop=True)
+    df['bid'], df['ask'] = NO_QUOTE if offline else quote
+    df['symbol'] = _symbol_column(symbol, len(df))
+    return df[FRAME_COLUMNS]
+
+
+def _fetch_backfill(client, symbol, interval, start, end, page_workers, quote):
+    pages = list(iter_binance_klines(symbol, interval, start, end, page_workers, client=client, quote=quote))
+    return pd.concat(pages, ignore_index=True) if pages else pd.DataFrame(columns=FRAME_COLUMNS)
+
+
+def get_binance_data(symbols, interval='1d', limit=365, max_workers=8,
+                     session=None, budget=None, base_url=BASE_URL,
+                     start=None, end=None, cache=None, offline=False, client=None):
+    """
+    Fetch historical data for multiple cryptocurrencies from Binance US.
+    Returns a single DataFrame with an added 'symbol' column.
+
+    When start is given, limit is ignored and each symbol is backfilled
+    page by page from start to end with iter_binance_klines.
+
+    Symbols are fetched concurrently on up to max_workers threads through
+    one BinanceClient (pooled keep-alive session, retries, shared
+    request-weight budget). Pass client to share one across calls, which
+    also coalesces duplicate requests of overlapping loads; otherwise one
+    is built from session, budget and base_url. Rows keep the order of the
+    symbols argument. Pass max_workers=1 for the old sequential behaviour.
+    Bid/ask for all symbols come from a single batched bookTicker call.
+
+    A symbol the API rejects (e.g. an invalid name) or that still fails
+    after retries is left out, and its error recorded in the result's
+    attrs['errors'] ({symbol: message}); the error is raised only when
+    every symbol failed.
+
+    cache may be a KlineCache or a directory path. Cached symbols then only
+    fetch candles from the last cached open_time onward (the last cached
+    candle may have been open) and new candles are appended to the cache.
+    offline=True serves purely from the cache without any HTTP traffic;
+    bid/ask are NaN in that case.
+
+    Prices and volumes are float64, num_trades int32, open/close times
+    datetime64, and symbol and date are categoricals.
+    """
+    symbols = list(symbols)
+    if not symbols:
         return pd.DataFrame()
+    if isinstance(cache, str):
+        cache = KlineCache(cache)
+    if offline and cache is None:
+        raise ValueError("offline=True requires a cache")
+    page_workers = max(1, max_workers)
+    max_workers = max(1, min(max_workers, len(symbols)))
+
+    client, own_client = _open_client(client, session, budget, base_url, max(max_workers, page_workers))
+    try:
+        quotes = {} if offline else client.book_tickers(symbols)
+        if cache is not None:
+            fetch = functools.partial(_fetch_symbol_cached, client, interval=interval, limit=limit, start=start,
+                                      end=end, page_workers=page_workers, cache=cache, offline=offline)
+        elif start is not None:
+            # Symbols one after another; each backfill pages on page_workers threads
+            fetch = functools.partial(_fetch_backfill, client, interval=interval, start=start, end=end,
+                                      page_workers=page_workers)
+            max_workers = 1
+        else:
+            fetch = functools.partial(_fetch_symbol, client, interval=interval, limit=limit)
+
+        def fetch_one(symbol):
+            try:
+                return fetch(symbol, quote=quotes.get(symbol, NO_QUOTE)), None
+            except (BinanceAPIError, requests.RequestException, ValueError) as e:
+                # ValueError: a 200 answer whose body is not a klines payload
+                return None, e
+
+        if max_workers == 1:
+            results = [fetch_one(s) for s in symbols]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(fetch_one, symbols))
+    finally:
+        if own_client:
+            client.close()
+
+    errors = {s: e for s, (_, e) in zip(symbols, results) if e is not None}
+    if errors and len(errors) == len(symbols):
+        raise next(iter(errors.values()))
+    for symbol, e in errors.items():
+        log.warning("Skipped %s: %s", symbol, e)
+    df = _finalize([df for df, _ in results if df is not None])
+    if errors:
+        df.attrs['errors'] = {s: str(e) for s, e in errors.items()}
+    return df
+
+
+def _agg_trade_arrays(data):
+    """
+    Parse an /aggTrades payload into compact arrays (TRADE_COLUMNS; time in
+    epoch ms). Like _kline_array, the raw bytes go straight to numpy once
+    the keys, quotes and brackets are dropped; a payload whose fields come
+    in an unexpected order is parsed as JSON instead.
+    """
+    text = bytes(data).strip()
+    if not text.startswith(b'['):
+        raise ValueError(f"Unexpected aggTrades payload: {text[:200]!r}")
+    first = text[:text.find(b'}') + 1]
+    if first and _AGG_TRADE_KEY.findall(first) != AGG_TRADE_KEYS:
+        keys = [k.decode() for k in AGG_TRADE_KEYS]
+        arr = np.array([[r[k] for k in keys] for r in json.loads(text)], dtype=np.float64).reshape(-1, len(keys))
+    else:
+        flat = _AGG_TRADE_KEY.sub(b'', text).replace(b'true', b'1').replace(b'false', b'0')
+        flat = flat.translate(None, b'"{}[] \t\r\n')
+        arr = np.fromstring(flat, sep=',').reshape(-1, len(AGG_TRADE_KEYS)) if flat else np.empty((0, 8))
+    return {
+        'agg_id': arr[:, 0].astype(np.int64),
+        'time': arr[:, 5].astype(np.int64),
+        'price': arr[:, 1],
+        'qty': arr[:, 2],
+        'n_trades': (arr[:, 4] - arr[:, 3] + 1).astype(np.int32),
+        'buyer_maker': arr[:, 6].astype(bool),
+    }
+
+
+def _fetch_trade_page(client, symbol, from_id=None, start_ms=None):
+    params = {'symbol': symbol, 'limit': MAX_TRADE_LIMIT}
+    if from_id is not None:
+        params['fromId'] = from_id
+    else:
+        params['startTime'] = start_ms
+    return _agg_trade_arrays(client.get('aggTrades', params, weight=2))
+
+
+def iter_agg_trades(symbol, start, end=None, max_workers=4, session=None, budget=None,
+                    base_url=BASE_URL, client=None, from_id=None):
+    """
+    Aggregated trades for one symbol between start and end (as for
+    iter_binance_klines), yielded page by page in id order as dicts of
+    arrays (TRADE_COLUMNS).
+
+    The first id comes from one startTime lookup, or from_id to resume.
+    Aggregate trade ids are sequential, so the following pages are
+    requested by fromId up to max_workers at a time; the run stops at the
+    first page that passes end or comes back short (the latest trades).
+    """
+    start_ms = _to_ms(start)
+    end_ms = _to_ms(end) if end is not None else int(time.time() * 1000)
+    max_workers = max(1, max_workers)
+    client, own_client = _open_client(client, session, budget, base_url, max_workers)
+    try:
+        if from_id is None:
+            page = _fetch_trade_page(client, symbol, start_ms=start_ms)
+            if not len(page['agg_id']):
+                return
+            from_id = int(page['agg_id'][0])
+        ids = itertools.count(from_id, MAX_TRADE_LIMIT)
+        last_id = from_id - 1
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = deque(pool.submit(_fetch_trade_page, client, symbol, next(ids)) for _ in range(max_workers))
+            while pending:
+                page = pending.popleft().result()
+                n = len(page['agg_id'])
+                if n == MAX_TRADE_LIMIT and page['time'][-1] <= end_ms:
+                    pending.append(pool.submit(_fetch_trade_page, client, symbol, next(ids)))
+                else:
+                    for future in pending:
+                        future.cancel()
+                    pending.clear()
+                keep = (page['agg_id'] > last_id) & (page['time'] <= end_ms)
+                if start_ms is not None:
+                    keep &= page['time'] >= start_ms
+                if keep.any():
+                    page = {k: v[keep] for k, v in page.items()}
+                    last_id = int(page['agg_id'][-1])
+                    yield page
+    finally:
+        if own_client:
+            client.close()
+
+
+def trade_store_path(cache_dir, symbol):
+    return os.path.join(cache_dir, f'symbol={symbol}', 'aggTrades')
+
+
+def trade_store(cache_dir, symbol):
+    """The symbol's ColumnStore of aggregated trades, or None."""
+    path = trade_store_path(cache_dir, symbol)
+    return ColumnStore(path) if os.path.exists(os.path.join(path, 'meta.json')) else None
+
+
+def ingest_agg_trades(symbol, start, end=None, cache_dir=DEFAULT_CACHE_DIR, client=None, max_workers=4,
+                      flush_trades=1_000_000):
+    """
+    Bring the symbol's on-disk trade store up to end (default now) and
+    return it. A store is one contiguous run of trades: it resumes from
+    its last aggregate id, and is rebuilt if start is earlier than its
+    first trade. Pages are appended flush_trades at a time, so memory stays
+    bounded however long the range.
+    """
+    start_ms = _to_ms(start)
+    end_ms = _to_ms(end) if end is not None else int(time.time() * 1000)
+    path = trade_store_path(cache_dir, symbol)
+    store = trade_store(cache_dir, symbol)
+    from_id = None
+    if store is not None and len(store):
+        times = store.column('time')
+        if start_ms is not None and start_ms < times[0]:
+            shutil.rmtree(path)
+            store = None
+        elif times[-1] >= end_ms:
+            return store
+        else:
+            from_id = int(store.column('agg_id')[-1]) + 1
+    if store is None:
+        if start_ms is None:
+            raise ValueError(f"No trades stored for {symbol}; give a start time.")
+        store = ColumnStore.create(path, 'aggTrades')
+
+    pages, n = [], 0
+    for page in iter_agg_trades(symbol, start_ms, end_ms, max_workers, client=client, from_id=from_id):
+        pages.append(page)
+        n += len(page['agg_id'])
+        if n >= flush_trades:
+            store.append(_trade_frame(pages))
+            pages, n = [], 0
+    if pages:
+        store.append(_trade_frame(pages))
+    return store
+
+
+def _trade_frame(pages):
+    return pd.DataFrame({c: np.concatenate([p[c] for p in pages]) for c in TRADE_COLUMNS}, copy=False)
 
 
 # if __name__ == "__main__":
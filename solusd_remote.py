@@ -0,0 +1,271 @@
+"""
+Client side of solusd_server: stand-ins for the frame, ViewModel,
+FilterEngine, SortCache and PivotEngine that DataFrameGUI uses, backed
+by a DataServer. The viewer's code paths stay the same; filters, sorts
+and pivots run on the server's worker processes and the table fetches
+only the rows it is about to draw, as Arrow pages.
+
+    client = DataClient('http://127.0.0.1:8765')
+    frame = client.load(['SOLUSDT', 'BTCUSDT'], '1h', 1000)
+    engine, sorter = engines_for(frame)
+    rows = sorter.order([('close', False)], engine.evaluate(Include('symbol', ['SOLUSDT'])))
+    rows.page(0, 50)
+"""
+import numpy as np
+import pandas as pd
+
+from solusd_filters import FilterEngine, predicate_to_json
+from solusd_pull import make_session
+from solusd_server import ARROW_STREAM, MAX_PAGE_ROWS
+from solusd_sort import SortCache
+
+
+class DataServerError(RuntimeError):
+    def __init__(self, status, msg, url):
+        super().__init__(f"Data server error {status}: {msg}")
+        self.status, self.msg, self.url = status, msg, url
+
+
+class DataClient:
+    """HTTP calls to one DataServer over a keep-alive session."""
+
+    def __init__(self, url, timeout=(3.05, 300)):
+        self.url = url.rstrip('/')
+        self.session = make_session(4)
+        self.timeout = timeout
+
+    def _call(self, method, path, **kwargs):
+        url = f'{self.url}/{path}'
+        r = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        if r.status_code != 200:
+            try:
+                msg = r.json().get('error', r.text)
+            except ValueError:
+                msg = r.text
+            if r.status_code == 400:
+                raise ValueError(msg)
+            raise DataServerError(r.status_code, msg, url)
+        if r.headers.get('Content-Type') == ARROW_STREAM:
+            return _read_arrow(r.content)
+        return r.json()
+
+    def load(self, symbols, interval='1d', limit=365):
+        """A RemoteFrame for the symbols' klines, loaded by the server (or reused)."""
+        info = self._call('POST', 'datasets', json={'symbols': list(symbols), 'interval': interval, 'limit': limit})
+        return RemoteFrame(self, info, interval)
+
+    def view(self, parent, filter_spec=None, sort_specs=None):
+        return self._call('POST', 'views', json={'parent': parent, 'filter': filter_spec, 'sort': sort_specs})
+
+    def page(self, view, offset, limit, columns=None):
+        params = {'offset': offset, 'limit': limit}
+        if columns:
+            params['columns'] = ','.join(columns)
+        return self._call('GET', f'views/{view}/rows', params=params)
+
+    def values(self, view, column, prefix='', offset=0, limit=200):
+        params = {'column': column, 'prefix': prefix, 'offset': offset, 'limit': limit}
+        return self._call('GET', f'views/{view}/values', params=params)
+
+    def histogram(self, view, column, bins=50):
+        return self._call('GET', f'views/{view}/histogram', params={'column': column, 'bins': bins})
+
+    def pivot(self, view, spec):
+        return self._call('POST', 'pivot', json={'view': view, 'index': spec.index, 'values': spec.values,
+                                                 'agg': spec.agg, 'bucket': spec.bucket, 'columns': spec.columns})
+
+    def close(self):
+        self.session.close()
+
+
+def _read_arrow(data):
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(data).read_pandas()
+
+
+class RemoteRows:
+    """The row positions of one server-side view: its length, and its rows page by page."""
+
+    def __init__(self, client, view, n):
+        self.client, self.view, self.n = client, view, n
+
+    def __len__(self):
+        return self.n
+
+    def page(self, start, stop, columns=None):
+        """View positions start:stop as a DataFrame."""
+        stop = min(stop, self.n)
+        if stop <= start:
+            return self.client.page(self.view, 0, 0, columns)
+        return self.client.page(self.view, start, stop - start, columns)
+
+    def frame(self, columns=None):
+        """Every row of the view; the server caps a page at MAX_PAGE_ROWS, so large views take several."""
+        pages = [self.page(start, start + MAX_PAGE_ROWS, columns) for start in range(0, self.n, MAX_PAGE_ROWS)]
+        if not pages:
+            return self.page(0, 0, columns)
+        return pages[0] if len(pages) == 1 else pd.concat(pages, ignore_index=True)
+
+
+class RemoteFrame:
+    """
+    A dataset held by the server, in the role of the viewer's base frame.
+    Only the schema lives here; rows are fetched through RemoteRows.
+    """
+
+    def __init__(self, client, info, interval=None):
+        self.client = client
+        self.dataset = info['dataset']
+        self.interval = interval
+        self.columns = pd.Index(info['columns'])
+        self.symbols = info.get('symbols', [])
+        self.attrs = {'errors': info.get('errors', {})}
+        self.rows = RemoteRows(client, info['view'], info['rows'])
+        self.dtypes = self.rows.page(0, 0).dtypes  # From an empty page: the schema only
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def empty(self):
+        return not len(self) or not len(self.columns)
+
+
+class RemoteView:
+    """ViewModel over a RemoteFrame; see solusd_view.ViewModel."""
+
+    def __init__(self, df, rows=None, columns=None):
+        self.df = df
+        self.rows = df.rows if rows is None else rows
+        self.columns = list(df.columns) if columns is None else list(columns)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def with_rows(self, rows):
+        return RemoteView(self.df, rows, self.columns)
+
+    def with_columns(self, columns):
+        return RemoteView(self.df, self.rows, columns)
+
+    def dtype(self, col):
+        return self.df.dtypes[col]
+
+    def column(self, col):
+        return self.rows.frame([col])[col].to_numpy()
+
+    def value(self, position, col):
+        return self.rows.page(position, position + 1, [col])[col].iat[0]
+
+    def frame(self, columns=None):
+        return self.rows.frame(self.columns if columns is None else list(columns))
+
+    def chunks(self, chunk_rows=100_000, columns=None):
+        columns = self.columns if columns is None else list(columns)
+        chunk_rows = min(chunk_rows, MAX_PAGE_ROWS)
+        for start in range(0, len(self), chunk_rows):
+            yield self.rows.page(start, start + chunk_rows, columns)
+
+
+class _RemoteIndex:
+    """The value index part of ColumnIndex (pick and histogram), answered by the server."""
+
+    def __init__(self, df, column):
+        self.df, self.column = df, column
+        dtype = df.dtypes[column]
+        self.is_time = pd.api.types.is_datetime64_any_dtype(dtype)
+        self.numeric = (pd.api.types.is_numeric_dtype(dtype) or self.is_time) \
+            and not isinstance(dtype, pd.CategoricalDtype)
+
+    def pick(self, rows=None, prefix='', offset=0, limit=200):
+        rows = self.df.rows if rows is None else rows
+        result = self.df.client.values(rows.view, self.column, prefix, offset, limit)
+        return pd.Index(result['values'], dtype=object), np.asarray(result['counts'], dtype=np.int64), result['total']
+
+    def histogram(self, rows=None, bins=50):
+        rows = self.df.rows if rows is None else rows
+        result = self.df.client.histogram(rows.view, self.column, bins)
+        edges = pd.DatetimeIndex(result['edges']) if self.is_time else pd.Index(result['edges'], dtype=float)
+        return edges, np.asarray(result['counts'], dtype=np.int64)
+
+
+class RemoteFilters:
+    """FilterEngine whose predicates are evaluated by the server."""
+
+    def __init__(self, df):
+        self.df = df
+        self.predicates = []
+        self._rows = [df.rows]
+        self._indexes = {}
+
+    def index(self, column):
+        if column not in self._indexes:
+            self._indexes[column] = _RemoteIndex(self.df, column)
+        return self._indexes[column]
+
+    @property
+    def rows(self):
+        return self._rows[-1]
+
+    def evaluate(self, predicate, rows=None):
+        rows = self.rows if rows is None else rows
+        result = self.df.client.view(rows.view, filter_spec=predicate_to_json(predicate))
+        return RemoteRows(self.df.client, result['view'], result['rows'])
+
+    @property
+    def all_rows(self):
+        return self._rows[0]
+
+    @property
+    def steps(self):
+        """(predicate, rows after it) for each predicate on the stack."""
+        return list(zip(self.predicates, self._rows[1:]))
+
+    def push(self, predicate, rows):
+        self.predicates.append(predicate)
+        self._rows.append(rows)
+
+    def pop(self):
+        if self.predicates:
+            self.predicates.pop()
+            self._rows.pop()
+        return self.rows
+
+    def clear(self):
+        del self.predicates[:]
+        del self._rows[1:]
+
+    def describe(self):
+        return " AND ".join(str(p) for p in self.predicates)
+
+
+class RemoteSorter:
+    """SortCache for RemoteFilters: sorted views are computed (and cached) by the server."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def order(self, specs, rows=None):
+        rows = self.engine.rows if rows is None else rows
+        if not specs:
+            return rows
+        result = self.engine.df.client.view(rows.view, sort_specs=[[c, bool(a)] for c, a in specs])
+        return RemoteRows(self.engine.df.client, result['view'], result['rows'])
+
+
+class RemotePivotEngine:
+    """PivotEngine for RemoteViews; the server keeps the result cache."""
+
+    def pivot(self, view, spec, task=None):
+        spec.validate(view.df)
+        return view.df.client.pivot(view.rows.view, spec)
+
+
+def engines_for(df):
+    """(filter engine, sort cache) for a local DataFrame or a RemoteFrame."""
+    if isinstance(df, RemoteFrame):
+        engine = RemoteFilters(df)
+        return engine, RemoteSorter(engine)
+    engine = FilterEngine(df)
+    return engine, SortCache(engine)
@@ -0,0 +1,435 @@
+"""
+Headless local data service: loads kline datasets once with
+get_binance_data, keeps them in a shared memory-mapped store, runs
+filters, sorts and pivots on a pool of worker processes, and serves
+result pages as Arrow IPC streams. Several viewers (see solusd_remote and
+solusd_viewer.py --server) can share one instance:
+
+    python solusd_server.py --port 8765
+
+Every dataset is written once to a ColumnStore in the server's work
+directory. Worker processes map the same files, so the data sits in the
+OS page cache once however many processes read it; a view's row
+positions travel between processes as .npy files, never pickled.
+
+Endpoints (JSON bodies; pages and pivots answer application/vnd.apache.arrow.stream):
+
+    POST /datasets             {"symbols": [...], "interval": "1d", "limit": 365}
+    POST /views                {"parent": view id, "filter": {...}} or {"parent": id, "sort": [[col, asc], ...]}
+    GET  /views/<id>/rows      ?offset=0&limit=100&columns=open_time,close
+    GET  /views/<id>/values    ?column=symbol&prefix=s&offset=0&limit=200   pick list page, most frequent first
+    GET  /views/<id>/histogram ?column=close&bins=50
+    POST /pivot                {"view": id, "index": [...], "values": [...], "agg": "sum", "bucket": null, "columns": null}
+
+A dataset's base view has the dataset's id. Identical requests from
+different clients get the same dataset or view back.
+"""
+import argparse
+import functools
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from solusd_filters import FilterEngine, predicate_from_json
+from solusd_pivot import PivotEngine, PivotSpec
+from solusd_sort import SortCache
+from solusd_store import ColumnStore
+from solusd_view import ViewModel
+
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+MAX_PAGE_ROWS = 1_000_000
+
+log = logging.getLogger(__name__)
+
+def to_arrow(df):
+    """DataFrame -> Arrow IPC stream bytes."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+# --- Worker processes ---
+# Each worker keeps the frames it has mapped, with their filter indexes,
+# sort permutations and pivot cache, until the service drops the dataset.
+
+_WORKER_DATA = {}
+
+
+def _in_worker(live, fn, *args):
+    # live: store paths of the service's current datasets; whatever else
+    # this worker still holds was dropped (see DataService._drop_stale).
+    dropped = [path for path in _WORKER_DATA if path not in live]
+    for path in dropped:
+        del _WORKER_DATA[path]
+    if dropped:
+        _load_rows.cache_clear()
+    return fn(*args)
+
+
+def _worker_state(store_path):
+    state = _WORKER_DATA.get(store_path)
+    if state is None:
+        df = ColumnStore(store_path).frame()
+        engine = FilterEngine(df)
+        state = _WORKER_DATA[store_path] = (df, engine, SortCache(engine), PivotEngine())
+    return state
+
+
+def _map_rows(path):
+    # Mapped, not read: a page touches only the positions it shows.
+    return None if path is None else np.load(path, mmap_mode='r')
+
+
+@functools.lru_cache(maxsize=16)
+def _load_rows(path):
+    # Workers only. View files never change, so the same mapped array comes
+    # back and the value index reuses its counts while a client pages
+    # through one view's pick list.
+    return _map_rows(path)
+
+
+def _work_view(store_path, parent_rows, filter_spec, sort_specs, out_path):
+    df, engine, sorter, _ = _worker_state(store_path)
+    rows = _load_rows(parent_rows)
+    if filter_spec is not None:
+        rows = engine.evaluate(predicate_from_json(filter_spec), np.arange(len(df)) if rows is None else rows)
+    if sort_specs:
+        rows = sorter.order([(c, bool(a)) for c, a in sort_specs], rows)
+    np.save(out_path, np.asarray(rows, dtype=np.int64))
+    return len(rows)
+
+
+def _work_values(store_path, rows_path, column, prefix, offset, limit):
+    _, engine, _, _ = _worker_state(store_path)
+    labels, counts, total = engine.index(column).pick(_load_rows(rows_path), prefix, offset, limit)
+    return {'values': labels.tolist(), 'counts': counts.tolist(), 'total': total}
+
+
+def _work_histogram(store_path, rows_path, column, bins):
+    _, engine, _, _ = _worker_state(store_path)
+    edges, counts = engine.index(column).histogram(_load_rows(rows_path), bins)
+    edges = edges.astype(str) if isinstance(edges, pd.DatetimeIndex) else edges
+    return {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+
+def _work_pivot(store_path, rows_path, spec):
+    df, _, _, pivots = _worker_state(store_path)
+    rows = _load_rows(rows_path)
+    view = ViewModel(df, rows)
+    spec = PivotSpec(spec.get('index', []), spec.get('values', []), spec.get('agg', 'sum'),
+                     spec.get('bucket'), spec.get('columns'))
+    return to_arrow(pivots.pivot(view, spec))
+
+
+class _View:
+    __slots__ = ('dataset', 'rows_path', 'n')
+
+    def __init__(self, dataset, rows_path, n):
+        self.dataset, self.rows_path, self.n = dataset, rows_path, n
+
+
+class DataService:
+    """
+    The service's state, independent of HTTP: datasets (ColumnStores in
+    workdir), views (row position files) and the worker pool. fetch is
+    called as fetch(symbols, interval, limit) to load a dataset.
+    """
+
+    def __init__(self, fetch, workdir=None, workers=None, ttl=60.0):
+        self.fetch = fetch
+        self._own_workdir = workdir is None
+        self.workdir = tempfile.mkdtemp(prefix='solusd-server-') if workdir is None else workdir
+        os.makedirs(os.path.join(self.workdir, 'views'), exist_ok=True)
+        # spawn: forking a process that runs HTTP threads is not safe
+        self.pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                        mp_context=multiprocessing.get_context('spawn'))
+        self.ttl = ttl
+        self.datasets = {}  # id -> (store path, frame, loaded at)
+        self.views = {}  # id -> _View
+        self._dataset_keys = {}  # request key -> dataset id
+        self._superseded = set()  # datasets a reload replaced, dropped once idle for ttl
+        self._used = {}  # dataset id -> last request time
+        self._view_keys = {}  # (parent, filter, sort) -> view id
+        self._loading = {}  # request key -> lock, so identical loads run once
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def _next_id(self, prefix):
+        with self._lock:
+            self._counter += 1
+            return f'{prefix}{self._counter}'
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            live = frozenset(path for path, _, _ in self.datasets.values())
+        return self.pool.submit(_in_worker, live, fn, *args).result()
+
+    def _view(self, view_id):
+        view = self.views[view_id]
+        self._used[view.dataset] = time.time()
+        return view
+
+    def _drop_stale(self):
+        """
+        Forget superseded datasets no client has used for ttl seconds: their
+        views, store and view files, and (on their next task) the workers'
+        copies. Clients still holding one get 404s.
+        """
+        now = time.time()
+        with self._lock:
+            stale = {d for d in self._superseded if now - self._used.get(d, 0) > self.ttl}
+            if not stale:
+                return
+            self._superseded -= stale
+            paths = [self.datasets.pop(d)[0] for d in stale]
+            views = [v for v, view in self.views.items() if view.dataset in stale]
+            files = [self.views.pop(v).rows_path for v in views]
+            gone = set(views)
+            for key in [k for k, v in self._view_keys.items() if v in gone]:
+                del self._view_keys[key]
+            for d in stale:
+                self._used.pop(d, None)
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+        for path in files:
+            if path is not None:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def load(self, symbols, interval='1d', limit=365):
+        """Dataset info for (symbols, interval, limit), loading it unless a fresh copy exists."""
+        self._drop_stale()
+        key = json.dumps([sorted(symbols), interval, int(limit)])
+        with self._lock:
+            lock = self._loading.setdefault(key, threading.Lock())
+        with lock:
+            dataset = self._dataset_keys.get(key)
+            if dataset is not None and time.time() - self.datasets[dataset][2] < self.ttl:
+                return self.dataset_info(dataset)
+            df = self.fetch(list(symbols), interval, int(limit))
+            if df is None or df.empty:
+                raise ValueError(f"No data for {', '.join(symbols)}.")
+            dataset = 'd' + hashlib.sha1(f'{key}{time.time()}'.encode()).hexdigest()[:12]
+            path = os.path.join(self.workdir, dataset)
+            store = ColumnStore.create(path, interval)
+            store.append(df)
+            frame = store.frame()
+            frame.attrs['errors'] = df.attrs.get('errors', {})
+            with self._lock:
+                self.datasets[dataset] = (path, frame, time.time())
+                self.views[dataset] = _View(dataset, None, len(frame))
+                previous = self._dataset_keys.get(key)
+                if previous is not None:
+                    self._superseded.add(previous)
+                self._dataset_keys[key] = dataset
+                self._used[dataset] = time.time()
+            return self.dataset_info(dataset)
+
+    def dataset_info(self, dataset):
+        _, frame, _ = self.datasets[dataset]
+        return {'dataset': dataset, 'view': dataset, 'rows': len(frame), 'columns': list(frame.columns),
+                'symbols': [str(s) for s in frame['symbol'].cat.categories] if 'symbol' in frame.columns else [],
+                'errors': frame.attrs.get('errors', {})}
+
+    def view(self, parent, filter_spec=None, sort_specs=None):
+        """Id and length of the view that filters or sorts parent."""
+        base = self._view(parent)
+        if filter_spec is not None:
+            predicate_from_json(filter_spec)  # Reject bad filters before queueing them
+        key = (parent, json.dumps(filter_spec, sort_keys=True), json.dumps(sort_specs))
+        with self._lock:
+            existing = self._view_keys.get(key)
+        if existing is not None:
+            return {'view': existing, 'rows': self.views[existing].n}
+        view_id = self._next_id('v')
+        out = os.path.join(self.workdir, 'views', f'{view_id}.npy')
+        store_path = self.datasets[base.dataset][0]
+        n = self._submit(_work_view, store_path, base.rows_path, filter_spec, sort_specs, out)
+        with self._lock:
+            self.views[view_id] = _View(base.dataset, out, n)
+            self._view_keys[key] = view_id
+        return {'view': view_id, 'rows': n}
+
+    def _check_column(self, view, column):
+        if column not in self.datasets[view.dataset][1].columns:
+            raise ValueError(f"Unknown column '{column}'")
+        return self.datasets[view.dataset][0]
+
+    def values(self, view_id, column, prefix='', offset=0, limit=200):
+        """One pick list page of column's values in a view (see ColumnIndex.pick)."""
+        view = self._view(view_id)
+        store_path = self._check_column(view, column)
+        return self._submit(_work_values, store_path, view.rows_path, column, prefix, offset, limit)
+
+    def histogram(self, view_id, column, bins=50):
+        view = self._view(view_id)
+        store_path = self._check_column(view, column)
+        return self._submit(_work_histogram, store_path, view.rows_path, column, bins)
+
+    def page(self, view_id, offset=0, limit=100, columns=None):
+        """Rows offset:offset+limit of a view as a DataFrame (served from this process)."""
+        view = self._view(view_id)
+        frame = self.datasets[view.dataset][1]
+        columns = list(frame.columns) if not columns else columns
+        missing = [c for c in columns if c not in frame.columns]
+        if missing:
+            raise ValueError(f"Unknown columns: {', '.join(missing)}")
+        if offset < 0 or limit < 0:
+            raise ValueError("offset and limit must not be negative")
+        stop = min(view.n, offset + min(limit, MAX_PAGE_ROWS))
+        offset = min(offset, stop)
+        if view.rows_path is None:
+            return frame[columns].iloc[offset:stop]
+        return frame[columns].take(_map_rows(view.rows_path)[offset:stop])
+
+    def pivot(self, view_id, spec):
+        view = self._view(view_id)
+        return self._submit(_work_pivot, self.datasets[view.dataset][0], view.rows_path, spec)
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        if self._own_workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class DataServer:
+    """
+    HTTP front end of a DataService on host:port (port 0 picks a free one).
+    Use as a context manager, or call serve_forever().
+    """
+
+    def __init__(self, service, host='127.0.0.1', port=0):
+        self.service = service
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, fmt, *args):
+                log.debug(fmt, *args)
+
+            def reply(self, status, body, content_type='application/json'):
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def handle_request(self, method):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                try:
+                    body = {}
+                    if method == 'POST':
+                        length = int(self.headers.get('Content-Length') or 0)
+                        body = json.loads(self.rfile.read(length) or b'{}')  # Malformed JSON is a ValueError
+                    status, payload, content_type = server.route(method, url.path.strip('/').split('/'), query, body)
+                except KeyError as e:
+                    status, payload, content_type = 404, {'error': f"Unknown {e}"}, 'application/json'
+                except (ValueError, TypeError) as e:
+                    status, payload, content_type = 400, {'error': str(e)}, 'application/json'
+                except Exception as e:
+                    log.exception("Request %s failed", self.path)
+                    status, payload, content_type = 500, {'error': str(e)}, 'application/json'
+                self.reply(status, payload, content_type)
+
+            def do_GET(self):
+                self.handle_request('GET')
+
+            def do_POST(self):
+                self.handle_request('POST')
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f'http://{host}:{self.httpd.server_address[1]}'
+
+    def route(self, method, parts, query, body):
+        service = self.service
+        json_type = 'application/json'
+        if method == 'POST' and parts == ['datasets']:
+            return 200, service.load(body['symbols'], body.get('interval', '1d'), body.get('limit', 365)), json_type
+        if method == 'POST' and parts == ['views']:
+            return 200, service.view(body['parent'], body.get('filter'), body.get('sort')), json_type
+        if method == 'GET' and len(parts) == 3 and parts[0] == 'views' and parts[2] == 'rows':
+            columns = [c for c in query.get('columns', '').split(',') if c]
+            page = service.page(parts[1], int(query.get('offset', 0)), int(query.get('limit', 100)), columns)
+            return 200, to_arrow(page), ARROW_STREAM
+        if method == 'GET' and len(parts) == 3 and parts[0] == 'views' and parts[2] == 'values':
+            result = service.values(parts[1], query['column'], query.get('prefix', ''),
+                                    int(query.get('offset', 0)), int(query.get('limit', 200)))
+            return 200, result, json_type
+        if method == 'GET' and len(parts) == 3 and parts[0] == 'views' and parts[2] == 'histogram':
+            return 200, service.histogram(parts[1], query['column'], int(query.get('bins', 50))), json_type
+        if method == 'POST' and parts == ['pivot']:
+            return 200, service.pivot(body['view'], body), ARROW_STREAM
+        raise KeyError('/'.join(parts))
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    from solusd_cache import DEFAULT_CACHE_DIR, KlineCache
+    from solusd_pull import BASE_URL, BinanceClient, get_binance_data
+
+    parser = argparse.ArgumentParser(description="Local data service for solusd viewers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="query worker processes")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Parquet kline cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="always fetch from the API")
+    parser.add_argument("--ttl", type=float, default=60.0, help="seconds before a dataset is refetched")
+    parser.add_argument("--base-url", default=BASE_URL, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    cache = None if args.no_cache else KlineCache(args.cache_dir)
+    client = BinanceClient(args.base_url)
+
+    def fetch(symbols, interval, limit):
+        return get_binance_data(symbols, interval, limit, cache=cache, client=client)
+
+    service = DataService(fetch, workers=args.workers, ttl=args.ttl)
+    server = DataServer(service, args.host, args.port)
+    log.info("Serving on %s with %d workers", server.url, args.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        service.close()
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import numpy as np
+
+
+class SortCache:
+    """
+    Sorted row orders for the frame behind a FilterEngine.
+
+    Each column's ascending permutation is computed once (a stable argsort
+    of the typed values, or of label-ordered codes for text and
+    categoricals) and kept on the engine's ColumnIndex, so it lives exactly
+    as long as the data it was computed from. Descending order is a stable
+    sort of the descending ranks, so ties keep their row order and missing
+    values stay last as in an ascending sort; multi-column sorts lexsort
+    the columns' cached dense ranks, and a filtered view is sorted by
+    selecting its rows out of the cached order rather than copying the
+    frame.
+    """
+
+    # Below this fraction of the frame, sorting the subset directly is
+    # cheaper than scanning the full cached permutation.
+    SUBSET_FRACTION = 1 / 16
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def order(self, specs, rows=None):
+        """
+        Row positions sorted by specs, a list of (column, ascending) pairs
+        (first is the primary key). rows restricts the result to those
+        positions, e.g. the current filter result.
+        """
+        n = len(self.engine.df)
+        if rows is not None and len(rows) == n:
+            rows = None
+        if not specs:
+            return np.arange(n) if rows is None else rows
+
+        if len(specs) == 1:
+            col, ascending = specs[0]
+            index = self.engine.index(col)
+            if rows is not None and len(rows) < n * self.SUBSET_FRACTION:
+                rank = index.dense_rank if ascending else index.descending_rank
+                return rows[np.argsort(rank[rows], kind='stable')]
+            perm = index.sort_order if ascending else index.descending_order
+            if rows is None:
+                return perm
+            member = np.zeros(n, dtype=bool)
+            member[rows] = True
+            return perm[member[perm]]
+
+        if rows is None:
+            rows = np.arange(n)
+        keys = []
+        for col, ascending in specs:
+            index = self.engine.index(col)
+            keys.append((index.dense_rank if ascending else index.descending_rank)[rows])
+        # np.lexsort treats the last key as primary.
+        return rows[np.lexsort(keys[::-1])]
@@ -0,0 +1,207 @@
+"""
+Memory-mapped columnar store for histories larger than RAM.
+
+A store is a directory with one raw binary file per column and a
+meta.json describing them:
+
+    <path>/meta.json        rows, interval and per-column dtype / categories
+    <path>/<column>.bin     the values; categoricals store int16 codes
+
+ColumnStore.frame() returns a DataFrame whose numeric and datetime
+columns are read-only views of np.memmap files, so opening a store costs
+next to nothing and pages are only read from disk when a filter, sort or
+the visible table window touches them. Stores are built by appending
+frames chunk by chunk (e.g. one cached symbol at a time):
+
+    python solusd_store.py build ~/solusd-1m --interval 1m --symbols SOLUSDT BTCUSDT
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+CODE_DTYPE = np.dtype(np.int16)  # pandas' own width for 128..32767 categories
+
+
+class ColumnStore:
+    """One directory of memory-mapped columns. See the module docstring."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+
+    @classmethod
+    def create(cls, path, interval=None):
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, 'meta.json')):
+            raise FileExistsError(f"A store already exists at {path}")
+        meta = {'rows': 0, 'interval': interval, 'columns': []}
+        _write_meta(path, meta)
+        return cls(path)
+
+    def __len__(self):
+        return self.meta['rows']
+
+    @property
+    def interval(self):
+        return self.meta.get('interval')
+
+    @property
+    def columns(self):
+        return [c['name'] for c in self.meta['columns']]
+
+    def _file(self, name):
+        return os.path.join(self.path, f'{name}.bin')
+
+    def append(self, df):
+        """
+        Append df's rows. The first append fixes the columns; later frames
+        must have the same ones (in any order). Categorical or string columns
+        grow their category list as needed.
+        """
+        if df is None or df.empty:
+            return
+        meta = self.meta
+        if not meta['columns']:
+            meta['columns'] = [_column_meta(name, df[name]) for name in df.columns]
+        missing = [c for c in self.columns if c not in df.columns]
+        if missing:
+            raise ValueError(f"Frame is missing store columns: {', '.join(missing)}")
+        for col in meta['columns']:
+            values = df[col['name']]
+            if col['kind'] == 'categorical':
+                data = _encode(values, col['categories'])
+            else:
+                data = np.ascontiguousarray(values.to_numpy(dtype=np.dtype(col['dtype'])))
+            offset = meta['rows'] * data.dtype.itemsize
+            with open(self._file(col['name']), 'ab') as f:
+                # Bytes past meta's row count are an interrupted append's;
+                # cut them so every column resumes at the same row
+                if f.seek(0, os.SEEK_END) < offset:
+                    raise ValueError(f"{self._file(col['name'])} holds fewer than the store's {meta['rows']} rows")
+                f.truncate(offset)
+                f.write(data.tobytes())
+        meta['rows'] += len(df)
+        _write_meta(self.path, meta)
+
+    def column(self, name):
+        """A column as a read-only array (an np.memmap for plain columns)."""
+        col = next(c for c in self.meta['columns'] if c['name'] == name)
+        dtype = CODE_DTYPE if col['kind'] == 'categorical' else np.dtype(col['dtype'])
+        if not len(self):
+            data = np.empty(0, dtype=dtype)
+        else:
+            data = np.memmap(self._file(name), dtype=dtype, mode='r', shape=(len(self),))
+        if col['kind'] == 'categorical':
+            return pd.Categorical.from_codes(data, categories=col['categories'])
+        return data
+
+    def frame(self, columns=None):
+        """A DataFrame over the store without reading the column files."""
+        names = self.columns if columns is None else list(columns)
+        # copy=False keeps each column a view of its memmap (no consolidation)
+        return pd.DataFrame({name: self.column(name) for name in names}, copy=False)
+
+    def chunks(self, chunk_rows=1_000_000, columns=None, start=0, stop=None):
+        """Yield {column: array} for rows start:stop, chunk_rows at a time."""
+        names = self.columns if columns is None else list(columns)
+        arrays = {name: self.column(name) for name in names}
+        stop = len(self) if stop is None else min(stop, len(self))
+        for lo in range(start, stop, chunk_rows):
+            yield {name: a[lo:min(lo + chunk_rows, stop)] for name, a in arrays.items()}
+
+    def symbols(self):
+        col = next((c for c in self.meta['columns'] if c['name'] == 'symbol'), None)
+        return list(col['categories']) if col and col['kind'] == 'categorical' else []
+
+
+def _column_meta(name, series):
+    if isinstance(series.dtype, pd.CategoricalDtype) or not (
+            pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)):
+        return {'name': name, 'kind': 'categorical', 'dtype': str(CODE_DTYPE), 'categories': []}
+    dtype = series.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        dtype = np.dtype('datetime64[ns]')
+    return {'name': name, 'kind': 'plain', 'dtype': str(np.dtype(dtype))}
+
+
+def _encode(series, categories):
+    """Codes of series' values in categories, extending categories in place."""
+    cat = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    labels = cat.cat.categories.astype(str)
+    index = pd.Index(categories, dtype=object)
+    mapping = index.get_indexer(labels)
+    new = labels[mapping < 0]
+    if len(new):
+        categories.extend(new.tolist())
+        if len(categories) > np.iinfo(CODE_DTYPE).max:
+            raise ValueError("Too many distinct values for a categorical store column")
+        mapping = pd.Index(categories, dtype=object).get_indexer(labels)
+    codes = cat.cat.codes.to_numpy()
+    # Missing values keep code -1
+    out = np.where(codes >= 0, mapping[np.maximum(codes, 0)], -1)
+    return out.astype(CODE_DTYPE)
+
+
+def _write_meta(path, meta):
+    tmp = os.path.join(path, 'meta.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, 'meta.json'))
+
+
+def build_from_cache(path, symbols, interval, cache, progress=None):
+    """
+    Build a store at path from a KlineCache, one symbol at a time so only
+    one symbol's history is in memory. Returns the store.
+    """
+    from solusd_pull import FRAME_COLUMNS, _date_column, _symbol_column
+
+    store = ColumnStore.create(path, interval)
+    for i, symbol in enumerate(symbols):
+        df = cache.load(symbol, interval)
+        if df is None or df.empty:
+            continue
+        df = df.copy()
+        df['bid'] = np.nan
+        df['ask'] = np.nan
+        df['symbol'] = _symbol_column(symbol, len(df))
+        df['date'] = _date_column(df['open_time'])
+        store.append(df[FRAME_COLUMNS])
+        if progress is not None:
+            progress(i + 1, len(symbols), symbol)
+    return store
+
+
+def main():
+    from solusd_cache import DEFAULT_CACHE_DIR, KlineCache
+
+    parser = argparse.ArgumentParser(description="Memory-mapped kline stores for the viewer.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='build a store from the Parquet cache')
+    build.add_argument('path')
+    build.add_argument('--interval', default='1m')
+    build.add_argument('--symbols', nargs='*', help='default: every symbol cached for the interval')
+    build.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    info = sub.add_parser('info', help='describe a store')
+    info.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        cache = KlineCache(args.cache_dir)
+        symbols = args.symbols or cache.symbols(args.interval)
+        store = build_from_cache(args.path, symbols, args.interval, cache,
+                                 progress=lambda i, n, s: print(f"[{i}/{n}] {s}"))
+        print(f"{len(store):,} rows in {args.path}")
+    else:
+        store = ColumnStore(args.path)
+        size = sum(os.path.getsize(store._file(c)) for c in store.columns if os.path.exists(store._file(c)))
+        print(json.dumps({'rows': len(store), 'interval': store.interval, 'columns': store.columns,
+                          'symbols': store.symbols(), 'bytes': size}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Live kline and best bid/ask ingestion over Binance WebSocket streams.
+
+BinanceStream runs an asyncio client on a background thread, subscribes
+to the combined <symbol>@kline_<interval> and <symbol>@bookTicker
+streams, and writes every message into a preallocated KlineRing per
+symbol. Nothing is pushed per message: consumers call drain() at their
+own pace (DataFrameGUI polls a few times per second) and get one small
+DataFrame with just the candles that changed since the last drain.
+
+Requires the optional `websockets` package.
+"""
+import asyncio
+import json
+import random
+import threading
+
+import numpy as np
+import pandas as pd
+
+from solusd_pull import FRAME_COLUMNS, _date_column
+from solusd_view import DATA_VERSION
+
+STREAM_URL = 'wss://stream.binance.us:9443/stream'
+# Columns a LiveFrame rewrites in place (symbol, date and open_time identify the candle)
+LIVE_COLUMNS = [c for c in FRAME_COLUMNS if c not in ('symbol', 'date', 'open_time')]
+
+# Ring buffer layout; same fields and order as the /klines payload.
+RING_DTYPE = np.dtype([
+    ('open_time', 'i8'), ('open', 'f8'), ('high', 'f8'), ('low', 'f8'), ('close', 'f8'),
+    ('volume', 'f8'), ('close_time', 'i8'), ('quote_asset_volume', 'f8'), ('num_trades', 'i4'),
+    ('taker_buy_base', 'f8'), ('taker_buy_quote', 'f8'),
+])
+
+
+class KlineRing:
+    """
+    Fixed-capacity ring of candles for one symbol. Updates to the open
+    candle overwrite the newest slot; a later open_time advances the ring,
+    overwriting the oldest candle once full.
+    """
+
+    def __init__(self, capacity=10_000):
+        self.data = np.zeros(capacity, dtype=RING_DTYPE)
+        self.capacity = capacity
+        self.count = 0  # Total candles ever appended
+        self.dirty_from = None  # Oldest `count` index touched since last drain
+
+    def _slot(self, i):
+        return i % self.capacity
+
+    def upsert(self, row):
+        if self.count:
+            last = self.data[self._slot(self.count - 1)]
+            if row[0] == last['open_time']:
+                self.data[self._slot(self.count - 1)] = row
+                self._touch(self.count - 1)
+                return
+            if row[0] < last['open_time']:
+                return  # Late message for a candle we already moved past
+        self.data[self._slot(self.count)] = row
+        self.count += 1
+        self._touch(self.count - 1)
+
+    def _touch(self, i):
+        if self.dirty_from is None or i < self.dirty_from:
+            self.dirty_from = i
+
+    def take_dirty(self):
+        """Return the touched candles (oldest first) and clear the mark."""
+        if self.dirty_from is None:
+            return self.data[:0]
+        start = max(self.dirty_from, self.count - self.capacity)
+        self.dirty_from = None
+        return self.data[[self._slot(i) for i in range(start, self.count)]]
+
+    def tail(self, n=None):
+        n = min(self.count, self.capacity) if n is None else min(n, self.count, self.capacity)
+        return self.data[[self._slot(i) for i in range(self.count - n, self.count)]]
+
+
+def _kline_row(k):
+    return (int(k['t']), float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v']),
+            int(k['T']), float(k['q']), int(k['n']), float(k['V']), float(k['Q']))
+
+
+def ring_to_df(records, symbol, bid=np.nan, ask=np.nan):
+    """Ring records -> DataFrame with the get_binance_data schema."""
+    df = pd.DataFrame({
+        'open_time': records['open_time'].astype('datetime64[ms]').astype('datetime64[ns]'),
+        'open': records['open'],
+        'high': records['high'],
+        'low': records['low'],
+        'close': records['close'],
+        'volume': records['volume'],
+        'close_time': records['close_time'].astype('datetime64[ms]').astype('datetime64[ns]'),
+        'quote_asset_volume': records['quote_asset_volume'],
+        'num_trades': records['num_trades'],
+        'taker_buy_base': records['taker_buy_base'],
+        'taker_buy_quote': records['taker_buy_quote'],
+        'ignore': np.zeros(len(records), dtype=np.int8),
+    })
+    df['date'] = _date_column(df['open_time'])
+    df['volatility'] = df['high'] - df['low']
+    df['bid'] = bid
+    df['ask'] = ask
+    df['symbol'] = symbol
+    return df[FRAME_COLUMNS]
+
+
+class BinanceStream:
+    """
+    Background WebSocket subscriber for kline and bookTicker streams of
+    many symbols. Call start(), then drain() periodically; stop() when done.
+    Reconnects with exponential backoff and jitter if the socket drops.
+    """
+
+    def __init__(self, symbols, interval='1m', capacity=10_000, url=STREAM_URL):
+        self.symbols = [s.upper() for s in symbols]
+        self.interval = interval
+        self.url = url
+        self.rings = {s: KlineRing(capacity) for s in self.symbols}
+        self.quotes = {}  # symbol -> (bid, ask)
+        self._quotes_dirty = set()
+        self.messages = 0
+        self.error = None
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._stopping = None
+        self._ws = None
+
+    @property
+    def stream_url(self):
+        names = []
+        for s in self.symbols:
+            names.append(f'{s.lower()}@kline_{self.interval}')
+            names.append(f'{s.lower()}@bookTicker')
+        return f"{self.url}?streams={'/'.join(names)}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='solusd-stream', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        if self._loop is not None and self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._request_stop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _request_stop(self):
+        self._stopping.set()
+        if self._ws is not None:
+            asyncio.ensure_future(self._ws.close())
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        import websockets  # Optional dependency, only needed for live mode
+
+        self._stopping = asyncio.Event()
+        delay = 1.0
+        while not self._stopping.is_set():
+            try:
+                async with websockets.connect(self.stream_url, max_queue=None) as ws:
+                    self._ws = ws
+                    delay = 1.0
+                    async for raw in ws:
+                        self.handle_message(raw)
+            except Exception as e:
+                self.error = e
+            finally:
+                self._ws = None
+            if self._stopping.is_set():
+                break
+            try:
+                await asyncio.wait_for(self._stopping.wait(), delay * (0.5 + random.random()))
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, 60.0)
+
+    def handle_message(self, raw):
+        msg = json.loads(raw)
+        data = msg.get('data', msg)
+        with self._lock:
+            self.messages += 1
+            if data.get('e') == 'kline':
+                ring = self.rings.get(data['s'])
+                if ring is not None:
+                    ring.upsert(_kline_row(data['k']))
+            elif 'b' in data and 'a' in data:
+                self.quotes[data['s']] = (float(data['b']), float(data['a']))
+                self._quotes_dirty.add(data['s'])
+
+    def drain(self):
+        """
+        Candles changed since the previous drain, as one DataFrame with the
+        get_binance_data schema (bid/ask = latest quote), plus a dict of
+        symbols whose quote changed -> (bid, ask). Returns (None, quotes)
+        when no candle changed.
+        """
+        with self._lock:
+            parts = []
+            for symbol, ring in self.rings.items():
+                records = ring.take_dirty()
+                if len(records):
+                    parts.append((symbol, records.copy()))
+            quotes = {s: self.quotes[s] for s in self._quotes_dirty}
+            self._quotes_dirty.clear()
+            latest = dict(self.quotes)
+        frames = [ring_to_df(r, s, *latest.get(s, (np.nan, np.nan))) for s, r in parts]
+        return (pd.concat(frames, ignore_index=True) if frames else None), quotes
+
+
+class LiveFrame:
+    """
+    Applies drained stream deltas to a get_binance_data frame. Updates to
+    each symbol's newest candle (and its quote) are written straight into
+    the frame's LIVE_COLUMNS arrays, which the LiveFrame owns: they are
+    copied once, and again whenever the frame is replaced, so a tick costs
+    the cells it changes rather than a copy of every touched column.
+    Newer candles are appended, keeping the categorical symbol/date
+    columns.
+
+    Whatever holds the frame sees the in-place writes, so anything derived
+    from LIVE_COLUMNS (e.g. FilterEngine indexes) must be invalidated
+    after a tick that did not replace the frame; every such write bumps
+    the frame's attrs[DATA_VERSION].
+    """
+
+    def __init__(self, df):
+        self.df = self._own(df)
+        self.latest = {}
+        if len(df):
+            pos = df.groupby('symbol', observed=True)['open_time'].idxmax()
+            self.latest = {sym: (df['open_time'].iat[p], p) for sym, p in pos.items()}
+
+    def _own(self, df):
+        """df rebuilt on private copies of its numpy-backed LIVE_COLUMNS."""
+        self._arrays = {c: df[c].to_numpy(copy=True) for c in LIVE_COLUMNS
+                        if c in df.columns and isinstance(df[c].dtype, np.dtype)}
+        owned = pd.DataFrame({c: self._arrays.get(c, df[c]) for c in df.columns}, index=df.index, copy=False)
+        owned.attrs = dict(df.attrs)
+        return owned
+
+    def _owned(self, df):
+        # pandas may consolidate a frame's blocks into new arrays, after
+        # which writes to ours would no longer reach it
+        return all(np.may_share_memory(df[c].to_numpy(), a) for c, a in self._arrays.items())
+
+    def apply(self, delta, quotes=None):
+        """
+        Returns (frame, replaced). replaced is True when the frame is a new
+        object (rows were added, so row positions beyond the old frame now
+        exist); otherwise the old frame was updated in place.
+        """
+        df = self.df
+        replaced = not self._owned(df)
+        if replaced:
+            df = self._own(df)
+        if delta is not None and len(delta):
+            keep_update, update_pos, new_rows = [], [], []
+            for i, (sym, t) in enumerate(zip(delta['symbol'], delta['open_time'])):
+                last = self.latest.get(sym)
+                if last is not None and t == last[0]:
+                    keep_update.append(i)
+                    update_pos.append(last[1])
+                elif last is None or t > last[0]:
+                    new_rows.append(i)
+            if update_pos:
+                changed = delta.iloc[keep_update]
+                for col in LIVE_COLUMNS:
+                    # Column by column so every column keeps its dtype
+                    self._write(df, col, update_pos, changed[col].to_numpy())
+            if new_rows:
+                df = self._own(self._append(df, delta.iloc[new_rows]))
+                replaced = True
+        for sym, (bid, ask) in (quotes or {}).items():
+            last = self.latest.get(sym)
+            if last is not None:
+                self._write(df, 'bid', last[1], bid)
+                self._write(df, 'ask', last[1], ask)
+        self.df = df
+        return df, replaced
+
+    def _write(self, df, col, pos, values):
+        array = self._arrays.get(col)
+        if array is not None:
+            array[pos] = values
+        else:  # Not numpy-backed; pandas copies the column
+            df.iloc[pos, df.columns.get_loc(col)] = values
+        df.attrs[DATA_VERSION] = df.attrs.get(DATA_VERSION, 0) + 1
+
+    def _append(self, df, new):
+        new = new.copy()
+        for col in ('symbol', 'date'):
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                missing = pd.Index(new[col].astype(str).unique()).difference(df[col].cat.categories)
+                if len(missing):
+                    df[col] = df[col].cat.add_categories(missing)
+                new[col] = pd.Categorical(new[col].astype(str), categories=df[col].cat.categories)
+        start = len(df)
+        # Derived columns the stream does not carry (e.g. indicators) start as NaN
+        df = pd.concat([df, new.reindex(columns=df.columns)], ignore_index=True)
+        for offset, (sym, t) in enumerate(zip(new['symbol'], new['open_time'])):
+            last = self.latest.get(sym)
+            if last is None or t > last[0]:
+                self.latest[sym] = (t, start + offset)
+        return df
@@ -0,0 +1,142 @@
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task by Task.check() once the task was cancelled."""
+
+
+class Task:
+    """
+    Handle passed as the first argument to every scheduled function.
+    Long-running functions should call check() between steps and may report
+    progress(fraction, message); both are safe to call from the worker.
+    """
+
+    def __init__(self, scheduler, key, generation):
+        self.key = key
+        self.generation = generation
+        self._scheduler = scheduler
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise TaskCancelled()
+
+    def progress(self, fraction, message=None):
+        self.check()
+        self._scheduler._queue.put(('progress', self, (fraction, message)))
+
+
+class TaskScheduler:
+    """
+    Runs functions on a worker pool and delivers their results back on the
+    Tk main thread by polling a queue with root.after.
+
+    Tasks are submitted under a key ("view", "pivot", "export", ...). A
+    new submission under the same key cancels the previous one, and
+    results from a superseded or cancelled task are dropped. That way a
+    burst of filter edits only ever applies the last one.
+    """
+
+    def __init__(self, root, max_workers=4, poll_ms=30):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='solusd-task')
+        self._queue = queue.Queue()
+        self._counter = itertools.count(1)
+        self._active = {}  # key -> (Task, callbacks)
+        self._closed = False
+        self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, key, fn, *args, on_done=None, on_error=None, on_progress=None, on_finish=None):
+        """
+        Run fn(task, *args) in the background. on_done(result),
+        on_error(exc) and on_progress(fraction, message) are called on the
+        Tk thread. on_finish() runs after any outcome, including a
+        cancellation, but not when the task was superseded by a newer one.
+        """
+        previous = self._active.get(key)
+        if previous is not None:
+            previous[0].cancel()
+        task = Task(self, key, next(self._counter))
+        self._active[key] = (task, (on_done, on_error, on_progress, on_finish))
+        self._pool.submit(self._run, task, fn, args)
+        return task
+
+    def _run(self, task, fn, args):
+        if task.cancelled:
+            self._queue.put(('cancelled', task, None))
+            return
+        try:
+            result = fn(task, *args)
+        except TaskCancelled:
+            self._queue.put(('cancelled', task, None))
+        except Exception as e:
+            self._queue.put(('error', task, e))
+        else:
+            self._queue.put(('done', task, result))
+
+    def cancel(self, key=None):
+        """
+        Cancel the task running under key, or every task if key is None.
+        Its on_finish callback runs immediately; whatever the worker
+        returns later is discarded.
+        """
+        keys = list(self._active) if key is None else [key]
+        for k in keys:
+            entry = self._active.pop(k, None)
+            if entry is None:
+                continue
+            entry[0].cancel()
+            on_finish = entry[1][3]
+            if on_finish is not None:
+                on_finish()
+
+    def busy(self):
+        return bool(self._active)
+
+    def shutdown(self):
+        for task, _ in self._active.values():
+            task.cancel()
+        self._active.clear()
+        self._closed = True  # Stops polling; the window may outlive the scheduler
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self):
+        try:
+            while True:
+                kind, task, payload = self._queue.get_nowait()
+                entry = self._active.get(task.key)
+                if entry is None or entry[0] is not task:
+                    continue  # Superseded by a newer submission
+                on_done, on_error, on_progress, on_finish = entry[1]
+                if kind == 'progress':
+                    if on_progress is not None and not task.cancelled:
+                        on_progress(*payload)
+                    continue
+                del self._active[task.key]
+                if kind == 'done' and not task.cancelled and on_done is not None:
+                    on_done(payload)
+                elif kind == 'error' and not task.cancelled and on_error is not None:
+                    on_error(payload)
+                if on_finish is not None:
+                    on_finish()
+        except queue.Empty:
+            pass
+        finally:
+            if self._closed:
+                return
+            try:
+                self.root.after(self.poll_ms, self._poll)
+            except Exception:
+                pass  # Window destroyed
@@ -0,0 +1,101 @@
+import pandas as pd
+
+# df.attrs key counting in-place writes to a frame (LiveFrame ticks);
+# caches keyed on a frame's identity include it
+DATA_VERSION = 'data_version'
+
+
+def display_array(series):
+    """
+    The array format_rows reads for a column. Categoricals stay as codes
+    plus categories, so a large (e.g. memory-mapped) frame is never turned
+    into a full-length object array just to show a screenful of it.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.array
+    return series.to_numpy()
+
+
+def format_rows(arrays, rows, start, stop):
+    """
+    Display tuples for view positions start:stop. arrays holds one array
+    per displayed column from display_array (None renders as blank); rows
+    are the view's row positions, or None for every row in order.
+    """
+    cols = []
+    take = slice(start, stop) if rows is None else rows[start:stop]
+    for arr in arrays:
+        if arr is None:
+            cols.append([""] * (stop - start))
+            continue
+        part = arr[take]
+        if part.dtype.kind == "M":
+            cols.append(pd.DatetimeIndex(part).astype(str).tolist())
+        else:
+            cols.append(part.tolist())
+    return list(zip(*cols))
+
+
+class ViewModel:
+    """
+    What the table currently shows, without materializing it: a base
+    frame, the row positions on screen (filtered and/or sorted; None for
+    every row in order) and the column order.
+
+    Export, charts and pivots read typed columns straight from the base
+    frame through these positions instead of going through the Treeview's
+    display strings. Instances are never modified in place, so a worker
+    thread can keep using the one it was handed while the UI moves on.
+    """
+
+    def __init__(self, df, rows=None, columns=None):
+        self.df = df
+        self.rows = rows
+        self.columns = list(df.columns) if columns is None else list(columns)
+
+    def __len__(self):
+        return len(self.df) if self.rows is None else len(self.rows)
+
+    def with_rows(self, rows):
+        return ViewModel(self.df, rows, self.columns)
+
+    def with_columns(self, columns):
+        return ViewModel(self.df, self.rows, columns)
+
+    def with_frame(self, df):
+        """Same rows and columns over a frame with new values (e.g. a live update)."""
+        return ViewModel(df, self.rows, self.columns)
+
+    def dtype(self, col):
+        return self.df[col].dtype
+
+    def column(self, col):
+        """One column of the view as a typed NumPy array."""
+        values = self.df[col].to_numpy()
+        return values if self.rows is None else values[self.rows]
+
+    def value(self, position, col):
+        """Typed value of the cell at a position in the view."""
+        row = position if self.rows is None else self.rows[position]
+        return self.df[col].iat[row]
+
+    def frame(self, columns=None):
+        """
+        The view as a DataFrame with only the requested columns (default:
+        the displayed ones, in display order). Unfiltered, unsorted views
+        share the base frame's data.
+        """
+        df = self.df[self.columns if columns is None else list(columns)]
+        if self.rows is None:
+            return df
+        return df.take(self.rows)
+
+    def chunks(self, chunk_rows=100_000, columns=None):
+        """Yield the view as consecutive frames of at most chunk_rows rows."""
+        df = self.df[self.columns if columns is None else list(columns)]
+        for start in range(0, len(self), chunk_rows):
+            stop = min(start + chunk_rows, len(self))
+            if self.rows is None:
+                yield df.iloc[start:stop]
+            else:
+                yield df.take(self.rows[start:stop])
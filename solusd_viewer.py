@@ -4,13 +4,27 @@ try:
     import tkinter as tk
     from tkinter import ttk, simpledialog, messagebox
     import customtkinter
-    import matplotlib
-    matplotlib.use("TkAgg")  # Ensure Tkinter backend for matplotlib
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    import matplotlib.pyplot as plt
-    from solusd_pull import get_binance_data  # Import the function to fetch data
+    from solusd_analytics import METRICS, analyze
+    from solusd_backtest import DEFAULT_FEE, PANEL_COLUMNS, RULES, Panel, backtest, make_rule, parse_grid, sweep
+    from solusd_pull import INTERVAL_MS, BinanceClient, get_binance_data, merge_symbols
+    from solusd_bars import bar_label, get_trade_bars, parse_size
+    from solusd_cache import DEFAULT_CACHE_DIR, KlineCache
+    from solusd_store import ColumnStore
+    from solusd_remote import DataClient, RemoteFrame, RemotePivotEngine, RemoteRows, RemoteView, engines_for
+    from solusd_tasks import TaskScheduler
+    from solusd_filters import Bins, Include, Exclude, Like, Range
+    from solusd_history import Snapshot, Stage, ViewHistory, ViewState, materialize
+    from solusd_view import ViewModel, display_array, format_rows
+    from solusd_export import EXPORT_FORMATS, export_view
+    from solusd_stream import LIVE_COLUMNS, BinanceStream, LiveFrame
+    from solusd_pivot import AGGREGATIONS, BUCKETS, PivotEngine, PivotSpec
+    from solusd_indicators import DEFAULT_PERIODS, IndicatorEngine, parse_indicator
     import tkinter.filedialog as filedialog
     import functools  # <-- Add this import
+    import argparse
+    import logging
+    import os
+    import time
 except ImportError as e:
     print(f"Missing dependency: {e}. Please install the required package and try again.")
     raise
@@ -19,30 +33,531 @@ except ImportError as e:
 customtkinter.set_default_color_theme("dark-blue")  # Set the customtkinter theme
 customtkinter.set_appearance_mode("dark")
 
+# Opt-in latency log for UI operations: --profile [PATH] or SOLUSD_PROFILE=1|PATH
+PROFILE_LOG = logging.getLogger("solusd.profile")
+
+
+def enable_profiling(path=None):
+    """Log per-operation latency to path (appending), or to stderr."""
+    handler = logging.FileHandler(path) if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    PROFILE_LOG.addHandler(handler)
+    PROFILE_LOG.setLevel(logging.INFO)
+
+
+def profiled(method):
+    """Log how long each call of a UI-thread method takes when profiling is on."""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not PROFILE_LOG.isEnabledFor(logging.INFO):
+            return method(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            PROFILE_LOG.info("%s %.1f ms", method.__qualname__, (time.perf_counter() - start) * 1000)
+    return wrapper
+
+
+class VirtualTable:
+    """
+    Treeview that only materializes the rows in the viewport.
+
+    The Treeview holds one item per visible line; scrolling rewrites those
+    items' values from the DataFrame's NumPy column arrays instead of
+    inserting an item per row, so redraw cost depends on the viewport
+    height, not on the number of rows. A few rows above and below the
+    viewport are formatted ahead so small scrolls reuse them. An optional
+    array of row positions (a filtered and/or sorted view) is applied per
+    window, so the frame itself is never reordered or copied. Rows of a
+    data server's view (RemoteRows) are fetched a block at a time instead.
+    """
+
+    def __init__(self, master, columns, buffer=20, **tree_kwargs):
+        self.frame = ttk.Frame(master)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show='headings', **tree_kwargs)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill=tk.BOTH, expand=True)
+        self.columns = list(columns)
+        self.buffer = buffer
+        self.top = 0
+        self.n_rows = 0
+        self.rows = None
+        self._arrays = []
+        self._block = (0, 0, [])  # (start, stop, formatted rows)
+        self.tree.bind("<Configure>", lambda e: self.refresh())
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible_rows()))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible_rows()))
+
+    def set_data(self, df, columns=None, rows=None):
+        if columns is not None:
+            self.columns = list(columns)
+        self.rows = rows
+        if isinstance(rows, RemoteRows):
+            self._arrays = [col if col in df.columns else None for col in self.columns]
+        else:
+            self._arrays = [display_array(df[col]) if col in df.columns else None for col in self.columns]
+        self.n_rows = len(df) if rows is None else len(rows)
+        self.top = 0
+        self._block = (0, 0, [])
+        self.refresh()
+
+    def reload(self, df):
+        """Re-read column arrays from df (same rows, new values), keeping the scroll position."""
+        self._arrays = [display_array(df[col]) if col in df.columns else None for col in self.columns]
+        self._block = (0, 0, [])
+        self.refresh()
+
+    def visible_rows(self):
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return int(self.tree.cget("height") or 10)
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # The heading row takes about one row height.
+        return max(1, height // row_height - 1)
+
+    def _rows(self, start, stop):
+        b_start, b_stop, rows = self._block
+        if start < b_start or stop > b_stop:
+            b_start = max(0, start - self.buffer)
+            b_stop = min(self.n_rows, stop + self.buffer)
+            if isinstance(self.rows, RemoteRows):
+                page = self.rows.page(b_start, b_stop, [c for c in self._arrays if c is not None])
+                arrays = [None if c is None else display_array(page[c]) for c in self._arrays]
+                rows = format_rows(arrays, None, 0, len(page))
+            else:
+                rows = format_rows(self._arrays, self.rows, b_start, b_stop)
+            self._block = (b_start, b_stop, rows)
+        return rows[start - b_start:stop - b_start]
+
+    @profiled
+    def refresh(self):
+        visible = self.visible_rows()
+        self.top = max(0, min(self.top, self.n_rows - visible))
+        rows = self._rows(self.top, min(self.n_rows, self.top + visible))
+        items = self.tree.get_children()
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+            items = items[:len(rows)]
+        for item, values in zip(items, rows):
+            self.tree.item(item, values=values)
+        for values in rows[len(items):]:
+            self.tree.insert('', tk.END, values=values)
+        if self.n_rows:
+            self.scrollbar.set(self.top / self.n_rows, min(1.0, (self.top + visible) / self.n_rows))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def row_index(self, item):
+        """Position in the data of a visible Treeview item."""
+        return self.top + self.tree.index(item)
+
+    def scroll(self, n):
+        self.top += n
+        self.refresh()
+        return "break"
+
+    def _on_wheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, *args):
+        visible = self.visible_rows()
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * self.n_rows)
+        elif args[0] == "scroll":
+            step = visible if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self.refresh()
+
+
 class DataFrameGUI:
-    def __init__(self, df):
+    def __init__(self, df=None, loader=None, interval='1d', fetch=None, fetch_cached=None,
+                 symbols=(), known_symbols=(), master=None, title="Crypto Data"):
+        # loader: optional callable returning a DataFrame; it runs in the
+        # background so the window shows up before the data arrives.
+        # interval: kline interval of the data, used by live streaming.
+        # fetch(symbols): loads symbols on demand from the symbol picker;
+        # fetch_cached(symbols), if given, serves them from the local cache
+        # first so they show up before the network refresh completes.
+        # symbols: loaded through fetch right after the window appears.
+        # master: open as a window of another viewer (e.g. for backtest
+        # results), sharing its event loop instead of running one.
+        self.interval = interval
+        self.fetch = fetch
+        self.fetch_cached = fetch_cached
+        self.known_symbols = list(dict.fromkeys(list(symbols) + list(known_symbols)))
+        self._fresh = set()  # Symbols loaded from the network (not just the cache)
+        self.stream = None
+        self.chart = None  # Reused ChartWindow
+        self.indicator_engine = IndicatorEngine(interval)  # Memoized per symbol
+        self.indicators = []  # Indicator columns kept up to date on live refreshes
+        self.pivots = PivotEngine()  # Cached pivot results, shared by pivot windows
+        self.history = ViewHistory()  # Undo/redo steps, with recent views cached
+        self._pending_history = None  # A loaded session waiting for its symbols
+        self._stages, self._pivot = (), None  # Stages below the shown frame; the pivot that made it
         self.original_df = df  # Store a reference to the original DataFrame
         self.df = df
-        self.unique_values_cache = {}  # Cache for unique values
-        self.root = customtkinter.CTk()  # Use CTk window for colorful UI
-        self.root.title("Crypto Data")
+        if master is None:
+            self.root = customtkinter.CTk()  # Use CTk window for colorful UI
+        else:
+            self.root = customtkinter.CTkToplevel(master)
+        self.root.title(title)
         if isinstance(df, pd.DataFrame) and not df.empty:
             self.columns = list(df.columns)
+        elif loader is not None or fetch is not None:
+            self.original_df = self.df = pd.DataFrame()
+            self.columns = []
         else:
             messagebox.showerror("Error", "Invalid or empty DataFrame provided.")
             self.root.destroy()
             return
+        self.tasks = TaskScheduler(self.root)
+        self._running = {}  # task key -> status message
+        # Stacked filters over self.df and its cached sort permutations
+        self.filters, self.sorter = engines_for(self.df)
+        self.sort_specs = []  # [(column, ascending), ...]
+        self._shift_click = False
         self.dragged_col = None
         self.create_widgets()
         self.update_filter_values()  # Ensure filter values are initialized
         self.populate_tree()
+        if loader is not None:
+            self.run_task("load", "Fetching data", lambda task: loader(), on_done=self.load_dataframe)
+        if symbols and fetch is not None:
+            self.root.after_idle(self.load_symbols, list(symbols))
+        if master is not None:
+            self.root.protocol("WM_DELETE_WINDOW", self.close)
+            return
         self.root.mainloop()
+        self.stop_stream()
+        self.tasks.shutdown()
+
+    def close(self):
+        """Close a window opened with a master (the main window ends with its mainloop)."""
+        self.stop_stream()
+        self.tasks.shutdown()
+        self.root.destroy()
+
+    def load_dataframe(self, df):
+        # df: a DataFrame, or a RemoteFrame held by a data server (--server)
+        if df is None or df.empty:
+            messagebox.showerror("Error", "Failed to fetch data or received empty DataFrame.")
+            return
+        if self.original_df.empty:
+            self.history.clear()  # Nothing worth undoing back to
+        else:
+            self.history.forget_views()  # Earlier steps replay on the new data
+        self.original_df = df
+        self.df = df
+        self._stages, self._pivot = (), None
+        self.indicators = []
+        self.indicator_engine.forget()
+        self.set_columns(list(df.columns))
+        self.reset_filters()
+        self.populate_tree()
+
+    # --- On-demand symbol loading ---
+
+    def load_selected_symbols(self):
+        text = self.symbol_var.get().upper().replace(",", " ")
+        symbols = [s for s in text.split() if s]
+        if not symbols:
+            messagebox.showerror("Error", "Enter one or more symbols, e.g. SOLUSDT.")
+            return
+        self.load_symbols(symbols)
+
+    def load_symbols(self, symbols):
+        """
+        Add symbols to the table in the background: from the cache first
+        when possible, then refreshed over the network.
+        """
+        if self.fetch is None:
+            messagebox.showerror("Error", "This viewer was started without a data source.")
+            return
+        label = ", ".join(symbols)
+        self._fresh.difference_update(symbols)
+        if self.fetch_cached is not None:
+            self.run_task(f"cache:{label}", f"Reading {label} from cache", self._read_cached, symbols,
+                          on_done=functools.partial(self._merge_symbols, symbols, False))
+        self.run_task(f"load:{label}", f"Fetching {label}", lambda task: self.fetch(symbols),
+                      on_done=functools.partial(self._merge_symbols, symbols, True))
+
+    def _read_cached(self, task, symbols):
+        # Best effort: the network fetch that follows reports real errors.
+        try:
+            return self.fetch_cached(symbols)
+        except Exception:
+            return None
+
+    def _merge_symbols(self, symbols, fresh, df):
+        if not fresh and self._fresh.issuperset(symbols):
+            return  # The network result already arrived
+        if fresh:
+            self._fresh.update(symbols)
+        if df is None or df.empty:
+            if fresh:
+                messagebox.showerror("Error", f"No data returned for {', '.join(symbols)}.")
+            return
+        errors = df.attrs.get('errors', {})
+        if fresh and errors:
+            messagebox.showwarning("Warning", "\n".join(f"{s}: {e}" for s, e in errors.items()))
+        for s in symbols:
+            if s not in self.known_symbols and s not in errors:
+                self.known_symbols.append(s)
+        self.symbol_menu.configure(values=self.known_symbols)
+        if self.original_df.empty:
+            self.load_dataframe(df)
+        else:
+            viewing_base = self.df is self.original_df
+            if isinstance(df, RemoteFrame):
+                merged = df  # The server loaded every symbol shown so far
+            else:
+                merged = merge_symbols(self.original_df, df)
+                if self.indicators:
+                    merged = merged.assign(**self.indicator_engine.columns(merged, self.indicators))
+            self.original_df = merged
+            self.history.forget_views()
+            if viewing_base:
+                self.df = merged
+                self.reapply_view()
+        if fresh and self._pending_history is not None:
+            history, self._pending_history = self._pending_history, None
+            self._use_history(history)
+
+    def run_task(self, key, message, fn, *args, on_done=None):
+        """
+        Run fn(task, *args) off the Tk thread under key; a newer task with
+        the same key supersedes this one. Errors are shown in a message box.
+        """
+        self._running[key] = message
+        started = time.perf_counter()
+        self.progress_bar.configure(mode="indeterminate")
+        self.progress_bar.start()
+        self._update_status()
+        self.tasks.submit(
+            key, fn, *args,
+            on_done=on_done,
+            on_error=lambda e: messagebox.showerror("Error", f"{message} failed: {e}"),
+            on_progress=self._on_task_progress,
+            on_finish=lambda: self._on_task_finished(key, message, started),
+        )
+
+    def _on_task_progress(self, fraction, message=None):
+        self.progress_bar.stop()
+        self.progress_bar.configure(mode="determinate")
+        self.progress_bar.set(fraction)
+        if message:
+            self.status_label.configure(text=message)
+
+    def _on_task_finished(self, key, message=None, started=None):
+        if started is not None:
+            # Submit to result applied on screen (or cancelled), i.e. what the user waited
+            PROFILE_LOG.info("task %s (%s) %.1f ms", key, message, (time.perf_counter() - started) * 1000)
+        self._running.pop(key, None)
+        if not self._running:
+            self.progress_bar.stop()
+            self.progress_bar.configure(mode="determinate")
+            self.progress_bar.set(0)
+        self._update_status()
+
+    def _update_status(self):
+        if self._running:
+            self.status_label.configure(text=", ".join(self._running.values()) + "...")
+        else:
+            self.status_label.configure(text="Ready")
+
+    def cancel_tasks(self):
+        self.tasks.cancel()
+
+    # --- Live streaming ---
+
+    def toggle_stream(self):
+        if self.stream is not None:
+            self.stop_stream()
+            return
+        if self.original_df.empty or 'symbol' not in self.original_df.columns:
+            messagebox.showerror("Error", "Load kline data before going live.")
+            return
+        if isinstance(self.original_df, RemoteFrame):
+            messagebox.showerror("Error", "Live mode is not available when browsing a data server.")
+            return
+        try:
+            import websockets  # noqa: F401  (optional dependency)
+        except ImportError:
+            messagebox.showerror("Error", "Live mode needs the 'websockets' package.")
+            return
+        if self.interval not in INTERVAL_MS:
+            messagebox.showerror("Error", f"Live mode streams exchange klines; {self.interval} are built from trades.")
+            return
+        symbols = [str(s) for s in pd.unique(self.original_df['symbol'])]
+        self.attach_stream(BinanceStream(symbols, self.interval).start())
+
+    def attach_stream(self, stream, refresh_hz=4):
+        """
+        Merge updates from a started BinanceStream into the table at most
+        refresh_hz times per second, however fast messages arrive.
+        """
+        self.stream = stream
+        self._live_frame()
+        self._stream_ms = max(1, int(1000 / refresh_hz))
+        self.live_btn.configure(text="Stop Live")
+        self.root.after(self._stream_ms, self._poll_stream)
+
+    def stop_stream(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream = None
+            self.live_btn.configure(text="Go Live")
+
+    def _live_frame(self):
+        """Hand original_df to a new LiveFrame; the table moves to the frame it writes into."""
+        viewing_base = self.df is self.original_df
+        self.live = LiveFrame(self.original_df)
+        self.original_df = self.live.df
+        self.history.forget_views()
+        if viewing_base:
+            self.df = self.original_df
+            self.reapply_view()
+
+    @profiled
+    def _poll_stream(self):
+        if self.stream is None:
+            return
+        delta, quotes = self.stream.drain()
+        if delta is not None or quotes:
+            if self.live.df is not self.original_df:
+                self._live_frame()  # Data was reloaded
+            viewing_base = self.df is self.original_df
+            df, replaced = self.live.apply(delta, quotes)
+            if delta is not None and self.indicators:
+                # Memoized: only each symbol's newest candles are recomputed
+                for name, values in self.indicator_engine.columns(df, self.indicators).items():
+                    df[name] = values
+            self.original_df = df
+            self.history.forget_views()
+            self.pivots.clear()
+            if viewing_base:
+                self.df = df
+                if replaced:
+                    # New candles: indexes are rebuilt and filters/sort re-run
+                    self.reapply_view()
+                else:
+                    # Same rows, values rewritten in place: drop the indexes
+                    # over them, and re-run the filters/sort only if they read one
+                    changed = set(LIVE_COLUMNS).union(i.name for i in self.indicators)
+                    self.filters.invalidate(changed)
+                    used = {p.column for p in self.filters.predicates} | {c for c, _ in self.sort_specs}
+                    if used & changed:
+                        self.reapply_view(reuse=True)
+                    else:
+                        self.view = self.view.with_frame(df)
+                        self.table.reload(df)
+        self.root.after(self._stream_ms, self._poll_stream)
+
+    # --- Indicators ---
+
+    def add_indicator(self):
+        try:
+            indicator = parse_indicator(self.indicator_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if isinstance(self.original_df, RemoteFrame):
+            messagebox.showerror("Error", "Indicators are not available when browsing a data server.")
+            return
+        missing = [c for c in ('open_time',) + tuple(indicator.inputs) if c not in self.original_df.columns]
+        if missing:
+            messagebox.showerror("Error", f"{indicator} needs the kline columns; missing: {', '.join(missing)}.")
+            return
+        df, engine = self.original_df, self.indicator_engine
+        self.run_task("indicators", f"Computing {indicator}", lambda task: engine.columns(df, [indicator]),
+                      on_done=functools.partial(self._on_indicator, df, indicator))
+
+    def _on_indicator(self, df, indicator, values):
+        if df is not self.original_df:
+            # Live candles arrived meanwhile; the memo makes this a tail update
+            values = self.indicator_engine.columns(self.original_df, [indicator])
+        if indicator.name not in [i.name for i in self.indicators]:
+            self.indicators.append(indicator)
+        viewing_base = self.df is self.original_df
+        self.original_df = self.original_df.assign(**values)
+        self.history.forget_views()
+        if viewing_base:
+            self.df = self.original_df
+            if indicator.name not in self.columns:
+                self.set_columns(self.columns + [indicator.name])
+            self.reapply_view()
+
+    def reapply_view(self, reuse=False):
+        """
+        Re-run the current filters and sort over self.df, on rebuilt
+        filter/sort caches or, with reuse, on the current ones (after the
+        columns rewritten in place were invalidated).
+        """
+        predicates, specs = list(self.filters.predicates), list(self.sort_specs)
+        if reuse:
+            engine, sorter = self.filters, self.sorter
+        else:
+            engine, sorter = engines_for(self.df)
+            self.filters, self.sorter = engine, sorter
+
+        def run(task):
+            steps = []
+            rows = engine.all_rows
+            for predicate in predicates:
+                task.check()
+                rows = engine.evaluate(predicate, rows)
+                steps.append((predicate, rows))
+            return steps, sorter.order(specs, rows)
+
+        def done(result):
+            if engine is not self.filters:
+                return
+            steps, ordered = result
+            engine.clear()
+            for predicate, rows in steps:
+                engine.push(predicate, rows)
+            self.sort_specs = specs
+            self.populate_tree(self.df, ordered)
+            self.update_filter_values()
+
+        self.run_task("view", "Refreshing view", run, on_done=done)
+
+    def set_columns(self, columns):
+        """Point the table headings and all column pickers at a new column list."""
+        self.columns = columns
+        self.tree['columns'] = self.columns
+        for col in self.columns:
+            self.tree.heading(col, text=col, command=functools.partial(self.sort_by_column, col))
+            self.tree.column(col, width=100)
+        self.filter_col_menu.configure(values=self.columns)
+        self.col_menu.configure(values=self.columns)
+        for listbox in (self.x_listbox, self.y_listbox):
+            listbox.delete(0, tk.END)
+            for col in self.columns:
+                listbox.insert(tk.END, col)
+            listbox.configure(height=max(1, min(6, len(self.columns))))
 
 
     def create_widgets(self):
         # Frame for column controls
         col_frame = customtkinter.CTkFrame(self.root, fg_color="#1111A9")
         col_frame.pack(fill="x", padx=5, pady=5)
+
+        # --- Symbol picker ---
+        self.symbol_var = tk.StringVar()
+        self.symbol_menu = customtkinter.CTkComboBox(
+            col_frame, variable=self.symbol_var, values=self.known_symbols, width=110, fg_color="#050552"
+        )
+        self.symbol_menu.pack(side="left", padx=2)
+        customtkinter.CTkButton(
+            col_frame, text="Load Symbol", width=90, fg_color="#1976D2", hover_color="#0D47A1",
+            command=self.load_selected_symbols
+        ).pack(side="left", padx=2)
         
         #Export to Excel button
 
@@ -78,22 +593,50 @@ class DataFrameGUI:
         self.filter_mode_menu = customtkinter.CTkComboBox(
             col_frame,
             variable=self.filter_mode_var,
-            values=["Include", "Exclude", "Is Like"],
+            values=["Include", "Exclude", "Is Like", "Range"],
             width=80,
             fg_color="#333366",
             command=self.update_filter_mode
         )
         self.filter_mode_menu.pack(side="left", padx=2)
 
-        # Multi-select Listbox for include/exclude
+        # Min/max entries for "Range"
+        self.range_frame = customtkinter.CTkFrame(col_frame, fg_color="transparent")
+        self.range_min_entry = customtkinter.CTkEntry(
+            self.range_frame, width=70, fg_color="#333366", placeholder_text="min"
+        )
+        self.range_min_entry.pack(side="left", padx=1)
+        self.range_max_entry = customtkinter.CTkEntry(
+            self.range_frame, width=70, fg_color="#333366", placeholder_text="max"
+        )
+        self.range_max_entry.pack(side="left", padx=1)
+
+        # Pick list for include/exclude: a searchable page of the column's
+        # values (most frequent first), or histogram bins for numeric columns
+        self.pick_frame = customtkinter.CTkFrame(col_frame, fg_color="transparent")
+        self.pick_frame.pack(side="left", padx=2)
+        self.filter_search_entry = customtkinter.CTkEntry(
+            self.pick_frame, width=120, fg_color="#333366", placeholder_text="search"
+        )
+        self.filter_search_entry.pack(side="top", fill="x")
+        self.filter_search_entry.bind("<KeyRelease>", lambda e: self.update_filter_values())
         self.filter_val_listbox = tk.Listbox(
-            col_frame,
+            self.pick_frame,
             selectmode="multiple",
             exportselection=0,
             height=5,
-            width=15
+            width=22
         )
-        self.filter_val_listbox.pack(side="left", padx=2)
+        self.filter_val_listbox.pack(side="top")
+        pager = customtkinter.CTkFrame(self.pick_frame, fg_color="transparent")
+        pager.pack(side="top", fill="x")
+        customtkinter.CTkButton(pager, text="<", width=24, fg_color="#444444",
+                                command=lambda: self.page_filter_values(-1)).pack(side="left")
+        self.pick_page_label = customtkinter.CTkLabel(pager, text="", text_color="#00FF00")
+        self.pick_page_label.pack(side="left", expand=True)
+        customtkinter.CTkButton(pager, text=">", width=24, fg_color="#444444",
+                                command=lambda: self.page_filter_values(1)).pack(side="left")
+        self._pick = ([], 0, 0, False)  # (values or bins shown, offset, total matches, binned)
 
         # Entry for "Is Like"
         self.islike_entry = customtkinter.CTkEntry(
@@ -116,6 +659,16 @@ class DataFrameGUI:
             command=self.clear_filter
         )
         clear_filter_btn.pack(side="left", padx=2)
+        pop_filter_btn = customtkinter.CTkButton(
+            col_frame,
+            text="Remove Last Filter",
+            fg_color="#444444",
+            hover_color="#222222",
+            command=self.remove_last_filter
+        )
+        pop_filter_btn.pack(side="left", padx=2)
+        self.filter_desc_label = customtkinter.CTkLabel(col_frame, text="", text_color="#00FF00")
+        self.filter_desc_label.pack(side="left", padx=2)
         # --- End filter controls ---
 
         customtkinter.CTkLabel(col_frame, text="Move Column:", text_color="#FFCC00").pack(side="left")
@@ -149,15 +702,53 @@ class DataFrameGUI:
         )
         unpivot_btn.pack(side="left", padx=10)
 
+        # --- View history ---
+        self.undo_btn = customtkinter.CTkButton(
+            col_frame, text="Undo", width=50, fg_color="#444444", hover_color="#222222", command=self.undo
+        )
+        self.undo_btn.pack(side="left", padx=2)
+        self.redo_btn = customtkinter.CTkButton(
+            col_frame, text="Redo", width=50, fg_color="#444444", hover_color="#222222", command=self.redo
+        )
+        self.redo_btn.pack(side="left", padx=2)
+        customtkinter.CTkButton(
+            col_frame, text="Save Session", width=90, fg_color="#444444", hover_color="#222222",
+            command=self.save_session
+        ).pack(side="left", padx=2)
+        customtkinter.CTkButton(
+            col_frame, text="Load Session", width=90, fg_color="#444444", hover_color="#222222",
+            command=self.load_session
+        ).pack(side="left", padx=2)
+        self.root.bind("<Control-z>", self.undo)
+        self.root.bind("<Control-y>", self.redo)
+
+        self.live_btn = customtkinter.CTkButton(
+            col_frame, text="Go Live", fg_color="#882222", hover_color="#551111", command=self.toggle_stream
+        )
+        self.live_btn.pack(side="left", padx=10)
+
+        # Indicator picker: a preset or e.g. "EMA 50"
+        self.indicator_var = tk.StringVar(value="SMA 20")
+        customtkinter.CTkComboBox(
+            col_frame,
+            variable=self.indicator_var,
+            values=[f"{name} {n}" for name, n in DEFAULT_PERIODS.items()],
+            width=90,
+            fg_color="#333366"
+        ).pack(side="left", padx=2)
+        customtkinter.CTkButton(
+            col_frame, text="Add Indicator", fg_color="#225533", hover_color="#113322", command=self.add_indicator
+        ).pack(side="left", padx=2)
+
         # --- Add graph controls ---
         customtkinter.CTkLabel(col_frame, text="X Axis (select one or more):", text_color="#FFCC00").pack(side="left", padx=(20, 2))
-        self.x_listbox = tk.Listbox(col_frame, selectmode="multiple", exportselection=0, height=min(6, len(self.columns)), width=12)
+        self.x_listbox = tk.Listbox(col_frame, selectmode="multiple", exportselection=0, height=max(1, min(6, len(self.columns))), width=12)
         for col in self.columns:
             self.x_listbox.insert(tk.END, col)
         self.x_listbox.pack(side="left", padx=2)
 
         customtkinter.CTkLabel(col_frame, text="Y Axis (select one or more):", text_color="#FFCC00").pack(side="left")
-        self.y_listbox = tk.Listbox(col_frame, selectmode="multiple", exportselection=0, height=min(6, len(self.columns)), width=12)
+        self.y_listbox = tk.Listbox(col_frame, selectmode="multiple", exportselection=0, height=max(1, min(6, len(self.columns))), width=12)
         for col in self.columns:
             self.y_listbox.insert(tk.END, col)
         self.y_listbox.pack(side="left", padx=2)
@@ -170,16 +761,41 @@ class DataFrameGUI:
             col_frame, text="Bar Chart", fg_color="#225533", hover_color="#113322", command=lambda: self.plot_graph("bar")
         )
         bar_btn.pack(side="left", padx=2)
+        candle_btn = customtkinter.CTkButton(
+            col_frame, text="Candles", fg_color="#225533", hover_color="#113322", command=lambda: self.plot_candles("candlestick")
+        )
+        candle_btn.pack(side="left", padx=2)
+        ohlc_btn = customtkinter.CTkButton(
+            col_frame, text="OHLC", fg_color="#225533", hover_color="#113322", command=lambda: self.plot_candles("ohlc")
+        )
+        ohlc_btn.pack(side="left", padx=2)
+        analytics_btn = customtkinter.CTkButton(
+            col_frame, text="Analytics", fg_color="#225533", hover_color="#113322", command=self.open_analytics
+        )
+        analytics_btn.pack(side="left", padx=2)
+        backtest_btn = customtkinter.CTkButton(
+            col_frame, text="Backtest", fg_color="#225533", hover_color="#113322", command=self.open_backtest
+        )
+        backtest_btn.pack(side="left", padx=2)
         # --- End graph controls ---
 
+        # --- Status bar for background tasks ---
+        status_frame = customtkinter.CTkFrame(self.root)
+        status_frame.pack(side="bottom", fill="x", padx=5, pady=(0, 5))
+        self.status_label = customtkinter.CTkLabel(status_frame, text="Ready", anchor="w")
+        self.status_label.pack(side="left", padx=5, fill="x", expand=True)
+        self.progress_bar = customtkinter.CTkProgressBar(status_frame, width=200)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(side="left", padx=5)
+        customtkinter.CTkButton(
+            status_frame, text="Cancel", width=70, fg_color="#444444", hover_color="#222222", command=self.cancel_tasks
+        ).pack(side="left", padx=5)
+
         # Data table (still ttk for best compatibility)
         self.frame = ttk.Frame(self.root)
         self.frame.pack(fill=tk.BOTH, expand=True)
-        self.tree = ttk.Treeview(
-            self.frame,
-            columns=self.columns,
-            show='headings'
-        )
+        self.table = VirtualTable(self.frame, self.columns)
+        self.tree = self.table.tree
         for col in self.columns:
             self.tree.heading(
                 col,
@@ -187,11 +803,13 @@ class DataFrameGUI:
                 command=functools.partial(self.sort_by_column, col)
             )
             self.tree.column(col, width=100)
-        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.table.frame.pack(fill=tk.BOTH, expand=True)
         # Add right-click menu for export
         self.tree_menu = tk.Menu(self.tree, tearoff=0)
         self.tree_menu.add_command(label="Export as CSV", command=self.export_current_view_to_csv)
         self.tree_menu.add_command(label="Export as Excel", command=self.export_current_view_to_excel)
+        self.tree_menu.add_command(label="Export as Parquet", command=lambda: self.export_current_view("parquet"))
+        self.tree_menu.add_command(label="Export as Feather", command=lambda: self.export_current_view("feather"))
         self.tree.bind("<Button-3>", self.show_tree_menu)  # Right-click
 
         # Track sort order for each column
@@ -204,25 +822,41 @@ class DataFrameGUI:
 
     def sort_by_column(self, col):
         # Toggle sort order for the column
-        self._sort_orders[col] = not self._sort_orders[col]
+        self._sort_orders[col] = not self._sort_orders.get(col, False)
         ascending = self._sort_orders[col]
-        try:
-            # Try numeric sort first
-            sorted_df = self.df.copy()
-            sorted_df[col] = pd.to_numeric(sorted_df[col], errors='ignore')
-            sorted_df = sorted_df.sort_values(by=col, ascending=ascending, kind='mergesort')
-        except Exception:
-            # Fallback to string sort
-            sorted_df = self.df.astype({col: str}).sort_values(by=col, ascending=ascending, kind='mergesort')
-        self.populate_tree(sorted_df)
+        if self._shift_click:
+            # Shift-click adds (or flips) a secondary sort key
+            specs = [spec for spec in self.sort_specs if spec[0] != col]
+            if len(specs) < len(self.sort_specs):
+                specs = [(c, ascending if c == col else a) for c, a in self.sort_specs]
+            else:
+                specs.append((col, ascending))
+        else:
+            specs = [(col, ascending)]
+        self.sort_specs = specs
+        # Sorted permutations are cached per column by SortCache, so this
+        # only costs an argsort the first time a column is sorted.
+        sorter, rows = self.sorter, self.filters.rows
+        label = ", ".join(c for c, _ in specs)
+        self.run_task("view", f"Sorting by {label}", lambda task: sorter.order(specs, rows),
+                      on_done=functools.partial(self._on_sorted, sorter))
+
+    def _on_sorted(self, sorter, rows):
+        if sorter is self.sorter:
+            self.populate_tree(self.df, rows)
 
-    def populate_tree(self, df=None):
+    @profiled
+    def populate_tree(self, df=None, rows=None):
+        # rows: optional positions into df (filtered/sorted view) to show
         if df is None:
             df = self.df
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        for _, row in df.iterrows():
-            self.tree.insert('', tk.END, values=[row[col] for col in self.columns])
+        if isinstance(df, RemoteFrame):
+            rows = df.rows if rows is None else rows
+            self.view = RemoteView(df, rows, self.columns)
+        else:
+            self.view = ViewModel(df, rows, self.columns)
+        self.table.set_data(df, self.columns, rows)
+        self._record()
 
     def move_column(self):
         col = self.col_var.get()
@@ -232,38 +866,150 @@ class DataFrameGUI:
             messagebox.showerror("Error", "Invalid input for position. Please enter a numeric value representing the column's new position.")
             return
         if col in self.columns and 0 <= pos < len(self.columns):
-            self.columns.remove(col)
-            self.columns.insert(pos, col)
+            columns = list(self.columns)
+            columns.remove(col)
+            columns.insert(pos, col)
             # Reconfigure treeview columns
-            self.tree['columns'] = self.columns
-            for colname in self.columns:
-                self.tree.heading(colname, text=colname)
-                self.tree.column(colname, width=100)
-            self.populate_tree()
+            self.set_columns(columns)
+            self.populate_tree(self.view.df, self.view.rows)
         else:
             messagebox.showerror("Error", "Invalid column or position.")
 
     def open_pivot_window(self):
-        PivotWindow(self.df, self.columns, self.on_pivot_done)
+        # Pivots of a data server's view run (and are cached) on the server
+        engine = RemotePivotEngine() if isinstance(self.view, RemoteView) else self.pivots
+        PivotWindow(self.view, functools.partial(self.on_pivot_done, self.current_state()), self.run_task, engine)
 
-    def on_pivot_done(self, pivot_df):
+    def _pivot_rows(self, df, rows, spec, task=None):
+        # Pivot stages replayed from the history
+        if isinstance(df, RemoteFrame):
+            return RemotePivotEngine().pivot(RemoteView(df, rows), spec, task)
+        return self.pivots.pivot(ViewModel(df, rows), spec, task)
+
+    def on_pivot_done(self, source, spec, pivot_df):
+        # source: the ViewState the pivot window was opened on
+        self._stages, self._pivot = source.stages, spec
         self.df = pivot_df
-        self.columns = list(pivot_df.columns)
-        self.tree['columns'] = self.columns
-        for col in self.columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=100)
+        self.set_columns(list(pivot_df.columns))
+        self.reset_filters()
         self.populate_tree()
 
     def unpivot(self):
+        self._stages, self._pivot = (), None
         self.df = self.original_df
-        self.columns = list(self.df.columns)
-        self.tree['columns'] = self.columns
-        for col in self.columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=100)
+        self.set_columns(list(self.df.columns))
+        self.reset_filters()
         self.populate_tree()
 
+    # --- View history ---
+
+    def current_state(self):
+        stage = Stage(self._pivot, self.filters.predicates, self.sort_specs, self.columns)
+        return ViewState(self._stages + (stage,))
+
+    def _record(self):
+        # Every table change lands here through populate_tree; restoring a
+        # step records the same state again, which only refreshes its cache entry.
+        snapshot = Snapshot(self.view.df, self.filters, self.sorter, self.filters.steps, self.view.rows)
+        self.history.record(self.current_state(), snapshot)
+        self.undo_btn.configure(state="normal" if self.history.can_undo() else "disabled")
+        self.redo_btn.configure(state="normal" if self.history.can_redo() else "disabled")
+
+    def undo(self, event=None):
+        state = self.history.undo()
+        if state is not None:
+            self.restore_state(state)
+
+    def redo(self, event=None):
+        state = self.history.redo()
+        if state is not None:
+            self.restore_state(state)
+
+    def restore_state(self, state):
+        """Show a history step: at once if its view is cached, else replayed in the background."""
+        self.tasks.cancel("view")
+        snapshot = self.history.recall(state)
+        if snapshot is not None:
+            self._show_state(state, snapshot)
+            return
+        history, base, pivot = self.history, self.original_df, self._pivot_rows
+        self.run_task("view", "Restoring view", lambda task: materialize(state, base, pivot, history, task),
+                      on_done=functools.partial(self._on_restored, base, state))
+
+    def _on_restored(self, base, state, snapshot):
+        if base is not self.original_df:
+            self.restore_state(state)  # The data changed meanwhile; replay on the new one
+        else:
+            self._show_state(state, snapshot)
+
+    def _show_state(self, state, snapshot):
+        if state is not self.history.current:
+            return  # Stepped elsewhere meanwhile
+        snapshot.restore()
+        self.df, self.filters, self.sorter = snapshot.df, snapshot.engine, snapshot.sorter
+        self._stages, self._pivot = state.stages[:-1], state.top.pivot
+        self.sort_specs = list(state.top.sort)
+        self._sort_orders.update(self.sort_specs)
+        columns = [c for c in state.top.columns if c in snapshot.df.columns]
+        self.set_columns(columns or list(snapshot.df.columns))
+        self.filter_desc_label.configure(text=self.filters.describe())
+        self.populate_tree(self.df, snapshot.rows)
+        self.update_filter_values()
+
+    def _loaded_symbols(self):
+        df = self.original_df
+        if isinstance(df, RemoteFrame):
+            return list(df.symbols)
+        if 'symbol' not in df.columns:
+            return []
+        return [str(s) for s in pd.unique(df['symbol'])]
+
+    def save_session(self):
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json", filetypes=[("Viewer session", "*.json")], title="Save session"
+        )
+        if file_path:
+            self.history.save(file_path, interval=self.interval, symbols=self._loaded_symbols())
+
+    def load_session(self):
+        """
+        Replace the history with a saved session and show its current step,
+        loading the session's symbols first if they are not in the table.
+        """
+        file_path = filedialog.askopenfilename(filetypes=[("Viewer session", "*.json")], title="Load session")
+        if not file_path:
+            return
+        history = ViewHistory(self.history.budget)
+        try:
+            session = history.load(file_path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            messagebox.showerror("Error", f"Could not load the session: {e}")
+            return
+        if session.get('interval', self.interval) != self.interval:
+            messagebox.showwarning("Warning", f"The session was saved over {session['interval']} candles; "
+                                              f"this table has {self.interval}.")
+        missing = [s for s in session.get('symbols', []) if s not in self._loaded_symbols()]
+        if missing and self.fetch is not None:
+            self._pending_history = history  # Shown once the symbols arrive (_merge_symbols)
+            self.load_symbols(missing)
+            return
+        self._use_history(history)
+
+    def _use_history(self, history):
+        self.history = history
+        self.restore_state(history.current)
+
+    def _chart(self):
+        # matplotlib is only imported once the first chart is opened.
+        from solusd_chart import ChartWindow
+
+        # Reuse the open chart window (and its figure) instead of stacking new ones.
+        if self.chart is None or not self.chart.exists():
+            self.chart = ChartWindow(self.root)
+        else:
+            self.chart.lift()
+        return self.chart
+
     def plot_graph(self, chart_type="line"):
         # Get selected x and y columns
         x_indices = self.x_listbox.curselection()
@@ -271,76 +1017,173 @@ class DataFrameGUI:
         x_cols = [self.columns[i] for i in x_indices]
         y_cols = [self.columns[i] for i in y_indices]
 
-        # Use filtered data if available, else self.df
-        plot_df = self.df.copy()
-        if len(self.tree.get_children()) != len(self.df):
-            rows = []
-            for item in self.tree.get_children():
-                values = self.tree.item(item)["values"]
-                rows.append(values)
-            plot_df = pd.DataFrame(rows, columns=self.columns)
-            for col in plot_df.columns:
-                if not pd.api.types.is_numeric_dtype(plot_df[col]):
-                    try:
-                        plot_df[col] = pd.to_numeric(plot_df[col], errors="coerce")
-                    except Exception as e:
-                        messagebox.showerror("Error", f"Failed to convert column '{col}' to numeric: {e}")
-                        return
-
-        if x_cols and y_cols and not plot_df.empty:
-            # Convert X and Y columns to numeric if possible
-            for col in x_cols + y_cols:
-                plot_df[col] = pd.to_numeric(plot_df[col], errors="ignore")
-
-            fig, ax = plt.subplots(figsize=(10, 5))
-            for y_col in y_cols:
-                for x_col in x_cols:
-                    if x_col in plot_df.columns and y_col in plot_df.columns:
-                        # Only plot if y_col is numeric
-                        if pd.api.types.is_numeric_dtype(plot_df[y_col]) and pd.api.types.is_numeric_dtype(plot_df[x_col]):
-                            if chart_type == "line":
-                                ax.plot(plot_df[x_col], plot_df[y_col], marker='o', label=f"{y_col} vs {x_col}")
-                            elif chart_type == "bar":
-                                ax.bar(plot_df[x_col], plot_df[y_col], label=f"{y_col} vs {x_col}")
-                        else:
-                            messagebox.showerror("Error", f"Column '{y_col}' or '{x_col}' is not numeric and cannot be plotted.")
-                            return
-            ax.set_xlabel(", ".join(x_cols))
-            ax.set_ylabel(", ".join(y_cols))
-            ax.set_title(f"{' & '.join(y_cols)} vs {' & '.join(x_cols)}")
-            ax.legend(loc='best')
-            ax.grid(True)
-            fig.tight_layout()
-
-            # --- Show in new Tkinter window ---
-            graph_win = customtkinter.CTkToplevel(self.root)
-            graph_win.title("Chart")
-            canvas = FigureCanvasTkAgg(fig, master=graph_win)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill="both", expand=True)
-            close_btn = customtkinter.CTkButton(graph_win, text="Close", command=graph_win.destroy)
-            close_btn.pack(pady=5)
-        else:
+        view = self.view
+        if not (x_cols and y_cols and len(view)):
             messagebox.showerror("Error", "Please select at least one X and one Y column for the graph, and ensure there is data to plot.")
+            return
+        # Columns are already typed (float64, int, datetime64); no per-plot conversion.
+        for col in x_cols + y_cols:
+            dtype = view.dtype(col)
+            numeric = pd.api.types.is_numeric_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype)
+            if not (numeric or (col in x_cols and pd.api.types.is_datetime64_any_dtype(dtype))):
+                messagebox.showerror("Error", f"Column '{col}' is not numeric and cannot be plotted.")
+                return
+        x_is_date = any(pd.api.types.is_datetime64_any_dtype(view.dtype(c)) for c in x_cols)
+        if x_is_date and not all(pd.api.types.is_datetime64_any_dtype(view.dtype(c)) for c in x_cols):
+            messagebox.showerror("Error", "Cannot mix date and numeric X columns in one chart.")
+            return
+        series = [
+            (f"{y_col} vs {x_col}", view.column(x_col), view.column(y_col))
+            for y_col in y_cols for x_col in x_cols
+        ]
+        self._chart().show_lines(
+            series, kind=chart_type, xlabel=", ".join(x_cols), ylabel=", ".join(y_cols),
+            title=f"{' & '.join(y_cols)} vs {' & '.join(x_cols)}", x_is_date=x_is_date,
+        )
 
-    def update_filter_values(self, event=None):
+    def plot_candles(self, style="candlestick"):
+        """Candlestick or OHLC chart of the current view (one symbol at a time)."""
+        view = self.view
+        needed = ['open_time', 'open', 'high', 'low', 'close']
+        missing = [c for c in needed if c not in view.df.columns]
+        if missing:
+            messagebox.showerror("Error", f"Candle charts need the kline columns; missing: {', '.join(missing)}.")
+            return
+        if not len(view):
+            messagebox.showerror("Error", "There is no data to plot.")
+            return
+        title = "Candles"
+        if 'symbol' in view.df.columns:
+            symbols = pd.unique(view.column('symbol'))
+            if len(symbols) > 1:
+                messagebox.showerror("Error", "The view holds several symbols; filter it to one symbol first.")
+                return
+            title = str(symbols[0])
+        t, o, h, l, c = (view.column(col) for col in needed)
+        self._chart().show_candles(t, o, h, l, c, style=style, title=f"{title} ({self.interval})")
+
+    def open_analytics(self):
+        """Correlation, covariance, spread and beta heatmaps across the symbols in the view."""
+        view = self.view
+        missing = [c for c in ('open_time', 'symbol', 'close') if c not in view.df.columns]
+        if missing:
+            messagebox.showerror("Error", f"Analytics needs the kline columns; missing: {', '.join(missing)}.")
+            return
+        window = simpledialog.askinteger(
+            "Analytics", "Rolling window (candles):", initialvalue=30, minvalue=2, parent=self.root
+        )
+        if window is None:
+            return
+        self.run_task(
+            "analytics", "Computing analytics",
+            lambda task: analyze(view.frame(['open_time', 'symbol', 'close']), window, task=task),
+            on_done=self._show_analytics
+        )
+
+    def _show_analytics(self, result):
+        from solusd_chart import HeatmapWindow  # Deferred matplotlib import
+
+        HeatmapWindow(self.root, result, METRICS)
+
+    def open_backtest(self):
+        """Sweep a trading rule's parameters over the symbols in the view."""
+        missing = [c for c in ('open_time', 'symbol', 'high', 'low', 'close') if c not in self.view.df.columns]
+        if missing:
+            messagebox.showerror("Error", f"Backtests need the kline columns; missing: {', '.join(missing)}.")
+            return
+        BacktestWindow(self.view, self.run_task, self._show_backtest)
+
+    def _show_backtest(self, label, results, equity):
+        # The sweep opens as its own table; the best set's equity goes to the chart
+        DataFrameGUI(df=results, master=self.root, interval=self.interval, title=f"Backtest: {label}")
+        series = [(col, equity['open_time'].to_numpy(), equity[col].to_numpy()) for col in equity.columns[1:]]
+        self._chart().show_lines(series, xlabel="open_time", ylabel="equity", title=f"Best: {results.attrs['best']}",
+                                 x_is_date=True)
+
+    # --- Filter pick list ---
+
+    PICK_PAGE = 200  # Values per pick list page
+    PICK_BINS = 50  # Histogram bins for numeric and datetime columns
+
+    def update_filter_values(self, event=None, offset=0):
+        """
+        Show a page of the filter column's values among the rows currently in
+        view, with their counts, from the column's value index. Numeric and
+        datetime columns show histogram bins instead. Called again whenever
+        the view changes, so the counts follow the filters.
+        """
         col = self.filter_col_var.get()
-        if col in self.df.columns:
-            if col not in self.unique_values_cache:
-                self.unique_values_cache[col] = self.df[col].dropna().astype(str).unique()
-            unique_vals = self.unique_values_cache[col]
-            self.filter_val_listbox.delete(0, tk.END)
-            for val in unique_vals:
-                self.filter_val_listbox.insert(tk.END, val)
+        if col not in self.df.columns:
+            self._show_pick_page(self.filters, col, 0, ([], [], [], 0, False))
+            return
+        engine, rows = self.filters, self.filters.rows
+        prefix = self.filter_search_entry.get().strip()
+        page, bins = self.PICK_PAGE, self.PICK_BINS
+
+        def run(task):
+            index = engine.index(col)
+            if index.numeric:
+                edges, counts = index.histogram(rows, bins)
+                if pd.api.types.is_datetime64_any_dtype(edges):
+                    exact = shown = list(edges.astype(str))
+                else:
+                    exact, shown = [str(float(e)) for e in edges], [f"{e:.6g}" for e in edges]
+                keep = [i for i, n in enumerate(counts) if n]
+                return ([(exact[i], exact[i + 1]) for i in keep], [f"{shown[i]} .. {shown[i + 1]}" for i in keep],
+                        [counts[i] for i in keep], len(keep), True)
+            labels, counts, total = index.pick(rows, prefix, offset, page)
+            return list(labels), list(labels), list(counts), total, False
+
+        self.run_task("values", f"Indexing {col}", run,
+                      on_done=functools.partial(self._show_pick_page, engine, col, offset))
+
+    def _show_pick_page(self, engine, col, offset, result):
+        if engine is not self.filters or col != self.filter_col_var.get():
+            return  # The view or the column changed meanwhile
+        values, labels, counts, total, binned = result
+        self._pick = (values, offset, total, binned)
+        self.filter_val_listbox.delete(0, tk.END)
+        for label, n in zip(labels, counts):
+            self.filter_val_listbox.insert(tk.END, f"{label}  ({n:,})")
+        if binned or total <= len(values):
+            self.pick_page_label.configure(text=f"{total:,} {'bins' if binned else 'values'}")
+        else:
+            self.pick_page_label.configure(text=f"{offset + 1:,}-{offset + len(values):,} of {total:,}")
+
+    def page_filter_values(self, step):
+        _, offset, total, binned = self._pick
+        offset += step * self.PICK_PAGE
+        if binned or not 0 <= offset < total:
+            return
+        self.update_filter_values(offset=offset)
+
+    def _picked_bins(self):
+        # Picked histogram bins as half-open ranges, adjacent ones merged.
+        # The top bin also holds the column's maximum, so it has no upper bound.
+        values, ranges = self._pick[0], []
+        for i in self.filter_val_listbox.curselection():
+            if i >= len(values):
+                continue
+            lo, hi = values[i]
+            hi = None if i == len(values) - 1 else hi
+            if ranges and ranges[-1][1] == lo:
+                ranges[-1][1] = hi
+            else:
+                ranges.append([lo, hi])
+        return ranges
+
+    def _picked_values(self):
+        values = self._pick[0]
+        return [values[i] for i in self.filter_val_listbox.curselection() if i < len(values)]
 
     def update_filter_mode(self, event=None):
         mode = self.filter_mode_var.get()
-        if mode == "Is Like":
-            self.filter_val_listbox.pack_forget()
-            self.islike_entry.pack(side="left", padx=2)
-        else:
-            self.islike_entry.pack_forget()
-            self.filter_val_listbox.pack(side="left", padx=2)
+        widgets = {"Is Like": self.islike_entry, "Range": self.range_frame}
+        active = widgets.get(mode, self.pick_frame)
+        for widget in (self.pick_frame, self.islike_entry, self.range_frame):
+            if widget is not active:
+                widget.pack_forget()
+        active.pack(side="left", padx=2, after=self.filter_mode_menu)
 
     def apply_filter(self):
         col = self.filter_col_var.get()
@@ -349,50 +1192,102 @@ class DataFrameGUI:
             messagebox.showerror("Error", "Please select a column to filter.")
             return
 
+        binned = self._pick[3]
         if mode == "Include":
-            selected_indices = self.filter_val_listbox.curselection()
-            if not selected_indices:
+            picked = self._picked_values()
+            if not picked:
                 messagebox.showerror("Error", "Select at least one value to include.")
                 return
-            selected_vals = [self.filter_val_listbox.get(i) for i in selected_indices]
-            filtered_df = self.df[self.df[col].astype(str).isin(selected_vals)]
-            self.populate_tree(filtered_df)
+            predicate = Bins(col, self._picked_bins()) if binned else Include(col, picked)
         elif mode == "Exclude":
-            selected_indices = self.filter_val_listbox.curselection()
-            if not selected_indices:
+            picked = self._picked_values()
+            if not picked:
                 messagebox.showerror("Error", "Select at least one value to exclude.")
                 return
-            selected_vals = [self.filter_val_listbox.get(i) for i in selected_indices]
-            filtered_df = self.df[~self.df[col].astype(str).isin(selected_vals)]
-            self.populate_tree(filtered_df)
+            if binned:
+                messagebox.showerror("Error", f"'{col}' is shown as ranges; use Include or Range to filter it.")
+                return
+            predicate = Exclude(col, picked)
         elif mode == "Is Like":
             keyword = self.islike_entry.get()
             if not keyword:
                 messagebox.showerror("Error", "Enter a keyword for 'Is Like' filter.")
                 return
-            filtered_df = self.df[self.df[col].astype(str).str.contains(keyword, case=False, na=False)]
-            self.populate_tree(filtered_df)
+            predicate = Like(col, keyword)
+        elif mode == "Range":
+            lo, hi = self.range_min_entry.get().strip(), self.range_max_entry.get().strip()
+            if not lo and not hi:
+                messagebox.showerror("Error", "Enter a minimum and/or maximum for 'Range' filter.")
+                return
+            predicate = Range(col, lo, hi)
         else:
             messagebox.showerror("Error", "Unknown filter mode.")
+            return
 
-    def clear_filter(self):
-        self.df = self.original_df.copy()
+        # Each filter narrows the current result; it is evaluated against
+        # the rows that passed the filters before it only.
+        engine, sorter, specs = self.filters, self.sorter, self.sort_specs
+
+        def run(task):
+            rows = engine.evaluate(predicate)
+            task.check()
+            return rows, sorter.order(specs, rows)
+
+        self.run_task("view", f"Filtering {col}", run,
+                      on_done=functools.partial(self._on_filtered, engine, predicate))
+
+    def _on_filtered(self, engine, predicate, result):
+        if engine is not self.filters:
+            return  # The table was reloaded or pivoted meanwhile
+        rows, ordered = result
+        engine.push(predicate, rows)
+        self.filter_desc_label.configure(text=self.filters.describe())
+        self.populate_tree(self.df, ordered)
+        self.update_filter_values()
+
+    def show_filtered(self):
+        self.filter_desc_label.configure(text=self.filters.describe())
+        # The filter engine's rows are known; sorting them may take a while
+        sorter, rows, specs = self.sorter, self.filters.rows, self.sort_specs
+        self.run_task("view", "Sorting filtered rows", lambda task: sorter.order(specs, rows),
+                      on_done=functools.partial(self._on_sorted, sorter))
+
+    def remove_last_filter(self):
+        self.tasks.cancel("view")
+        self.filters.pop()
+        self.show_filtered()
+        self.update_filter_values()
+
+    def reset_filters(self):
+        # Indexes and sort permutations belong to self.df; rebuild both
+        self.filters, self.sorter = engines_for(self.df)
+        self.sort_specs = []
+        self.filter_desc_label.configure(text="")
         self.update_filter_values()
+
+    def clear_filter(self):
+        self.tasks.cancel("view")
+        self._stages, self._pivot = (), None
+        self.df = self.original_df
+        self.reset_filters()
         self.populate_tree(self.df)
 
     def on_tree_cell_click(self, event):
         # Identify the region and column
         region = self.tree.identify("region", event.x, event.y)
+        if region == "heading":
+            # Let the heading's sort command run; remember shift for multi-column sorts
+            self._shift_click = bool(event.state & 0x0001)
+            return None
         if region == "cell":
             row_id = self.tree.identify_row(event.y)
             col_id = self.tree.identify_column(event.x)
             col_index = int(col_id.replace("#", "")) - 1
             if row_id and 0 <= col_index < len(self.columns):
                 col_name = self.columns[col_index]
-                item = self.tree.item(row_id)
-                cell_value = item["values"][col_index]
+                cell_value = self.view.value(self.table.row_index(row_id), col_name)
                 # You can now do something with (row_id, col_name, cell_value)
-                print(f"Clicked cell: Row={row_id}, Column={col_name}, Value={cell_value}")
+                print(f"Clicked cell: Row={self.table.row_index(row_id)}, Column={col_name}, Value={cell_value}")
                 # Optional: visually highlight the cell (requires custom drawing)
         # Prevent row selection highlight
         return "break"
@@ -403,55 +1298,37 @@ class DataFrameGUI:
         finally:
             self.tree_menu.grab_release()
 
-    def export_current_view_to_csv(self):
-        # Gather data from current table view
-        rows = []
-        for item in self.tree.get_children():
-            values = self.tree.item(item)["values"]
-            rows.append(values)
-        export_df = pd.DataFrame(rows, columns=self.columns)
-        # Ask user for file path
+    def export_current_view(self, fmt):
+        """Stream the current view to a file in the background (cancellable)."""
+        label, ext = EXPORT_FORMATS[fmt]
         file_path = filedialog.asksaveasfilename(
-            defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv")],
-            title="Save table as CSV"
+            defaultextension=ext,
+            filetypes=[(label, f"*{ext}")],
+            title=f"Save table as {label.split()[0]}"
         )
         if file_path:
-            try:
-                export_df.to_csv(file_path, index=False)
-                messagebox.showinfo("Export Successful", f"Table exported to:\n{file_path}")
-            except Exception as e:
-                messagebox.showerror("Export Failed", f"Could not export CSV:\n{e}")
-        # (Export to Excel button moved to right-click menu)
+            view = self.view
+            self.run_task(
+                "export", f"Exporting {label.split()[0]}", lambda task: export_view(view, file_path, fmt, task),
+                on_done=lambda n: messagebox.showinfo("Export Successful", f"{n:,} rows exported to:\n{file_path}")
+            )
+
+    def export_current_view_to_csv(self):
+        self.export_current_view("csv")
 
     def export_current_view_to_excel(self):
-        # Gather data from current table view
-        rows = []
-        for item in self.tree.get_children():
-            values = self.tree.item(item)["values"]
-            rows.append(values)
-        export_df = pd.DataFrame(rows, columns=self.columns)
-        # Ask user for file path
-        file_path = filedialog.asksaveasfilename(
-            defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx")],
-            title="Save table as Excel"
-        )
-        if file_path:
-            try:
-                export_df.to_excel(file_path, index=False)
-                messagebox.showinfo("Export Successful", f"Table exported to:\n{file_path}")
-            except Exception as e:
-                messagebox.showerror("Export Failed", f"Could not export Excel file:\n{e}")
+        self.export_current_view("excel")
 
 class PivotWindow:
     
-    def __init__(self, df, columns, on_pivot_done):
-        self.df = df
-        self.columns = columns
+    def __init__(self, view, on_pivot_done, run_task, engine):
+        self.view = view  # ViewModel of the table: pivots respect its filters
+        self.engine = engine  # PivotEngine with cached results
+        self.columns = columns = view.columns
         self.on_pivot_done = on_pivot_done
+        self.run_task = run_task  # DataFrameGUI.run_task, for background groupbys
         self.win = customtkinter.CTkToplevel()
-        self.win.title("Custom Pivot and Sum")
+        self.win.title("Custom Pivot")
 
         # Multi-select for groupby columns
         customtkinter.CTkLabel(self.win, text="Group by (Index):", text_color="#FFCC00").grid(row=0, column=0, padx=5, pady=5)
@@ -469,7 +1346,7 @@ class PivotWindow:
         # Multi-select for sum value columns
         customtkinter.CTkLabel(
             self.win,
-            text="Sum Values:",
+            text="Values:",
             text_color="#FFCC00"
         ).grid(row=1, column=0, padx=5, pady=5)
         self.value_listbox = tk.Listbox(
@@ -490,11 +1367,24 @@ class PivotWindow:
             pady=5
         )
 
+        # Aggregation, optional open_time bucket and optional wide column
+        options = customtkinter.CTkFrame(self.win, fg_color="transparent")
+        options.grid(row=2, column=0, columnspan=2, padx=5, pady=5)
+        customtkinter.CTkLabel(options, text="Aggregate:", text_color="#FFCC00").pack(side="left", padx=2)
+        self.agg_var = tk.StringVar(value="sum")
+        customtkinter.CTkComboBox(options, variable=self.agg_var, values=AGGREGATIONS, width=80).pack(side="left", padx=2)
+        customtkinter.CTkLabel(options, text="Time bucket:", text_color="#FFCC00").pack(side="left", padx=2)
+        self.bucket_var = tk.StringVar(value="")
+        customtkinter.CTkComboBox(options, variable=self.bucket_var, values=[""] + BUCKETS, width=70).pack(side="left", padx=2)
+        customtkinter.CTkLabel(options, text="Columns from:", text_color="#FFCC00").pack(side="left", padx=2)
+        self.wide_var = tk.StringVar(value="")
+        customtkinter.CTkComboBox(options, variable=self.wide_var, values=[""] + list(columns), width=100).pack(side="left", padx=2)
+
         pivot_btn = customtkinter.CTkButton(self.win,
-            text="Pivot & Sum",
+            text="Pivot",
             fg_color="#90ee90",
             command=self.do_pivot)
-        pivot_btn.grid(row=2,
+        pivot_btn.grid(row=3,
             column=0,
             columnspan=2,
             pady=10)
@@ -502,52 +1392,194 @@ class PivotWindow:
         self.result_tree = None
 
     def do_pivot(self):
-        # Get selected indices for groupby and sum columns
-        index_indices = self.index_listbox.curselection()
-        value_indices = self.value_listbox.curselection()
-        index_cols = [self.columns[i] for i in index_indices]
-        value_cols = [self.columns[i] for i in value_indices]
-        if index_cols and value_cols:
-            missing_index_cols = [col for col in index_cols if col not in self.df.columns]
-            missing_value_cols = [col for col in value_cols if col not in self.df.columns]
-
-            if missing_index_cols or missing_value_cols:
-                messagebox.showerror(
-                    "Error",
-                    f"Invalid columns selected.\nMissing groupby columns: {missing_index_cols}\nMissing sum columns: {missing_value_cols}"
-                )
-                return
+        # Get selected indices for groupby and value columns
+        index_cols = [self.columns[i] for i in self.index_listbox.curselection()]
+        value_cols = [self.columns[i] for i in self.value_listbox.curselection()]
+        spec = PivotSpec(index_cols, value_cols, self.agg_var.get(), self.bucket_var.get(), self.wide_var.get())
+        try:
+            spec.validate(self.view.df)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        view, engine = self.view, self.engine
+        self.run_task(
+            "pivot", f"Pivoting {spec}",
+            lambda task: engine.pivot(view, spec, task),
+            on_done=functools.partial(self.show_result, spec)
+        )
+
+    def show_result(self, spec, pivot_df):
+        if not self.win.winfo_exists():
+            return
+        if self.result_tree:
+            self.result_tree.frame.destroy()
+        self.result_tree = VirtualTable(self.win, list(pivot_df.columns), height=10)
+        for col in pivot_df.columns:
+            self.result_tree.tree.heading(col, text=col)
+            self.result_tree.tree.column(col, width=120)
+        self.result_tree.frame.grid(row=4, column=0, columnspan=2, padx=5, pady=5)
+        self.result_tree.set_data(pivot_df)
+        self.on_pivot_done(spec, pivot_df)
+
+class BacktestWindow:
+    """Rule, parameter grid and costs for a sweep over a view (see solusd_backtest)."""
+
+    GRIDS = {
+        'crossover': "fast=5:50:5 slow=20:200:20 ma=EMA,SMA",
+        'threshold': "n=7:21:7 lower=20:35:5 upper=65:80:5",
+        'breakout': "n=10:200:10",
+    }
+
+    def __init__(self, view, run_task, on_done):
+        self.view = view
+        self.run_task = run_task
+        self.on_done = on_done  # on_done(label, sweep results, best equity curves)
+        self.win = customtkinter.CTkToplevel()
+        self.win.title("Backtest")
+        customtkinter.CTkLabel(self.win, text="Rule:", text_color="#FFCC00").grid(row=0, column=0, padx=5, pady=5)
+        self.rule_var = tk.StringVar(value="crossover")
+        customtkinter.CTkComboBox(self.win, variable=self.rule_var, values=list(RULES), width=120,
+                                  command=self.update_grid).grid(row=0, column=1, padx=5, pady=5, sticky="w")
+        customtkinter.CTkLabel(self.win, text="Parameters:", text_color="#FFCC00").grid(row=1, column=0, padx=5, pady=5)
+        self.grid_entry = customtkinter.CTkEntry(self.win, width=320, fg_color="#333366")
+        self.grid_entry.grid(row=1, column=1, padx=5, pady=5)
+        customtkinter.CTkLabel(self.win, text="Fee:", text_color="#FFCC00").grid(row=2, column=0, padx=5, pady=5)
+        self.fee_entry = customtkinter.CTkEntry(self.win, width=80, fg_color="#333366")
+        self.fee_entry.insert(0, str(DEFAULT_FEE))
+        self.fee_entry.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+        customtkinter.CTkLabel(self.win, text="Spread without quote:", text_color="#FFCC00").grid(row=3, column=0, padx=5, pady=5)
+        self.spread_entry = customtkinter.CTkEntry(self.win, width=80, fg_color="#333366", placeholder_text="0")
+        self.spread_entry.grid(row=3, column=1, padx=5, pady=5, sticky="w")
+        self.short_var = tk.BooleanVar(value=False)
+        customtkinter.CTkCheckBox(self.win, text="Allow shorts", variable=self.short_var).grid(
+            row=4, column=1, padx=5, pady=5, sticky="w")
+        customtkinter.CTkButton(self.win, text="Run", fg_color="#90ee90", text_color="#000000",
+                                command=self.do_run).grid(row=5, column=0, columnspan=2, pady=10)
+        self.update_grid()
+
+    def update_grid(self, event=None):
+        self.grid_entry.delete(0, tk.END)
+        self.grid_entry.insert(0, self.GRIDS.get(self.rule_var.get(), ""))
+
+    def do_run(self):
+        rule = self.rule_var.get()
+        try:
+            if rule not in RULES:
+                raise ValueError(f"Unknown rule '{rule}'.")
+            grid = parse_grid(self.grid_entry.get().split())
+            fee = float(self.fee_entry.get() or 0)
+            spread = float(self.spread_entry.get()) if self.spread_entry.get().strip() else None
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        short, view = self.short_var.get(), self.view
+        columns = ['open_time', 'symbol'] + [c for c in PANEL_COLUMNS if c in view.df.columns]
+
+        def run(task):
+            panel = Panel.from_frame(view.frame(columns))
+            task.check()
+            results = sweep(None, rule, grid, fee, spread, short, task=task, panel=panel)
+            best = make_rule(rule, short=short, **results.iloc[0][list(grid)].to_dict())
+            results.attrs['best'] = str(best)
+            return results, backtest(None, best, fee, spread, panel=panel).equity()
+
+        label = f"{rule} ({', '.join(grid)})"
+        self.run_task("backtest", f"Backtesting {label}", run,
+                      on_done=lambda result: self.on_done(label, *result))
 
-            try:
-                pivot_df = self.df.groupby(index_cols)[value_cols].sum().reset_index()
-                if self.result_tree:
-                    self.result_tree.destroy()
-                self.result_tree = ttk.Treeview(
-                    self.win,
-                    columns=list(pivot_df.columns),
-                    show='headings')
-                for col in pivot_df.columns:
-                    self.result_tree.heading(col, text=col)
-                    self.result_tree.column(col, width=120)
-                for _, row in pivot_df.iterrows():
-                    self.result_tree.insert(
-                        '', tk.END, values=list(row)
-                    )
-                self.result_tree.grid(row=3, column=0, columnspan=2, padx=5, pady=5)
-                self.on_pivot_done(pivot_df)
-            except Exception as e:
-                messagebox.showerror("Error", f"Pivot failed: {e}")
-        else:
-            messagebox.showerror("Error", "Please select at least one groupby and one sum column.")
 
 #Add main statement to test the GUI
 
+DEFAULT_SYMBOLS = ['SOLUSDT', 'BTCUSDT', 'ETCUSDT', 'JUPUSDT', 'ETHUSDT', 'XRPUSDT']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Browse Binance US kline data.")
+    parser.add_argument("--symbols", nargs="*", default=DEFAULT_SYMBOLS,
+                        help="symbols to load at startup (default: %(default)s)")
+    parser.add_argument("--interval", default="1d", help="kline interval, e.g. 1m, 1h, 1d")
+    parser.add_argument("--limit", type=int, default=365, help="candles per symbol")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Parquet cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="always fetch from the API")
+    parser.add_argument("--offline", action="store_true", help="serve from the cache only, no network")
+    parser.add_argument("--bars", metavar="KIND:SIZE",
+                        help="build bars from aggregated trades instead of loading klines, "
+                             "e.g. time:45s, tick:500, volume:1000 or dollar:1e6")
+    parser.add_argument("--since", default="1D",
+                        help="with --bars: trades to load, as a duration back from now (6h, 7D) or a date")
+    parser.add_argument("--store", metavar="PATH",
+                        help="browse a memory-mapped store (see solusd_store.py) instead of fetching")
+    parser.add_argument("--server", metavar="URL",
+                        help="browse through a data server (see solusd_server.py), e.g. http://127.0.0.1:8765")
+    parser.add_argument("--profile", nargs="?", const="", default=os.environ.get("SOLUSD_PROFILE"),
+                        metavar="PATH", help="log UI operation latency to PATH (default: stderr)")
+    args = parser.parse_args(argv)
+    if args.profile is not None:
+        enable_profiling(None if args.profile in ("", "1") else args.profile)
+
+    if args.store:
+        # Columns are mapped, not read: pages load as the table touches them.
+        store = ColumnStore(args.store)
+        DataFrameGUI(df=store.frame(), interval=store.interval or args.interval)
+        return
+
+    if args.server:
+        # The server loads, filters, sorts and pivots; the table fetches the rows it shows.
+        remote = DataClient(args.server)
+        loaded = []
+
+        def fetch(symbols):
+            wanted = list(dict.fromkeys(loaded + symbols))
+            frame = remote.load(wanted, args.interval, args.limit)
+            loaded[:] = [s for s in frame.symbols if s in wanted]
+            return frame
+
+        DataFrameGUI(interval=args.interval, fetch=fetch, symbols=[s.upper() for s in args.symbols])
+        remote.close()
+        return
+
+    cache = None if args.no_cache else KlineCache(args.cache_dir)
+    if args.offline and cache is None:
+        parser.error("--offline needs the cache")
+
+    # One client for every load: pooled connections, one weight budget, and
+    # overlapping loads of the same symbols share their requests.
+    client = BinanceClient()
+    interval = args.interval
+    known_symbols = cache.symbols(args.interval) if cache is not None else ()
+
+    def fetch(symbols, offline=args.offline):
+        return get_binance_data(symbols, args.interval, args.limit, cache=cache, offline=offline, client=client)
+
+    if args.bars:
+        kind, _, size = args.bars.partition(":")
+        try:
+            parse_size(kind, size)
+            try:
+                start = pd.Timestamp.now('UTC').tz_localize(None) - pd.Timedelta(args.since)
+            except ValueError:
+                start = pd.Timestamp(args.since)
+        except ValueError as e:
+            parser.error(str(e))
+        interval = bar_label(kind, size)
+        known_symbols = ()
+
+        def fetch(symbols, offline=args.offline):
+            return get_trade_bars(symbols, kind, size, start=start, cache_dir=args.cache_dir,
+                                  client=client, offline=offline)
+
+    # The window appears straight away; symbols load in the background,
+    # cached ones first.
+    DataFrameGUI(
+        interval=interval,
+        fetch=fetch,
+        # Trade stores always live in the cache directory
+        fetch_cached=functools.partial(fetch, offline=True) if (cache is not None or args.bars) and not args.offline else None,
+        symbols=[s.upper() for s in args.symbols],
+        known_symbols=known_symbols,
+    )
+    client.close()
+
+
 if __name__ == "__main__":
-    try:
-        df = get_binance_data(['SOLUSDT', 'BTCUSDT', 'ETCUSDT', 'JUPUSDT', 'ETHUSDT', 'XRPUSDT'], '1d', 365)  # Fetch data for SOLUSDT
-        if df is not None and not df.empty:
-            DataFrameGUI(df)
-        else:
-            messagebox.showerror("Error", "Failed to fetch data or received empty DataFrame.")
-    except Exception as e:
-        messagebox.showerror("Error", f"An error occurred while fetching data: {e}")
+    main()